@@ -0,0 +1,148 @@
+"""backfill_structured_job_inputs
+
+Converts legacy "[model] {json} | prompt" rows into prompt / generation_params / model_ref.
+Runs online: each chunk commits on its own, so it holds no long transaction or table lock
+and can be re-run safely (only rows with generation_params IS NULL are touched).
+
+Revision ID: 2a08dc55c4eb
+Revises: bdab4260aa70
+Create Date: 2026-10-16 09:05:00.000000
+
+"""
+import json
+import uuid
+from alembic import op, context
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2a08dc55c4eb'
+down_revision = 'bdab4260aa70'
+branch_labels = None
+depends_on = None
+
+CHUNK_SIZE = 1000
+
+jobs = sa.table(
+    'jobs',
+    sa.column('id', sa.String),
+    sa.column('prompt', sa.Text),
+    sa.column('model_id', postgresql.UUID(as_uuid=True)),
+    sa.column('model_ref', sa.String),
+    sa.column('generation_params', postgresql.JSONB),
+)
+
+
+def _parse_legacy(raw_text):
+    # Frozen copy of the old runner parser; migrations must not import app code.
+    model_identifier = None
+    params = {}
+    prompt_text = raw_text or ""
+
+    if prompt_text == "[Deleted]":
+        return None, {}, prompt_text
+
+    if prompt_text.startswith("["):
+        end_sq = prompt_text.find("]")
+        if end_sq != -1:
+            model_identifier = prompt_text[1:end_sq].strip()
+            rest = prompt_text[end_sq + 1:].strip()
+            if "|" in rest:
+                json_str, prompt_text = [p.strip() for p in rest.split("|", 1)]
+                if json_str.startswith("{"):
+                    try:
+                        params = json.loads(json_str)
+                    except ValueError:
+                        pass
+            else:
+                prompt_text = rest
+    return model_identifier, params, prompt_text
+
+
+def upgrade() -> None:
+    if context.is_offline_mode():
+        # Data backfill needs a live connection; offline SQL only carries schema changes.
+        return
+
+    update_stmt = (
+        sa.update(jobs)
+        .where(jobs.c.id == sa.bindparam('job_id'))
+        .values(
+            prompt=sa.bindparam('new_prompt'),
+            generation_params=sa.bindparam('new_params', type_=postgresql.JSONB),
+            model_ref=sa.bindparam('new_model_ref'),
+        )
+    )
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        last_id = ""
+        while True:
+            rows = conn.execute(
+                sa.select(jobs.c.id, jobs.c.prompt, jobs.c.model_id)
+                .where(jobs.c.generation_params.is_(None))
+                .where(jobs.c.id > last_id)
+                .order_by(jobs.c.id)
+                .limit(CHUNK_SIZE)
+            ).fetchall()
+            if not rows:
+                break
+
+            batch = []
+            for job_id, prompt, model_id in rows:
+                model_identifier, params, prompt_text = _parse_legacy(prompt)
+                model_ref = None
+                if model_identifier:
+                    try:
+                        uuid.UUID(model_identifier)
+                    except ValueError:
+                        model_ref = model_identifier  # e.g. "flux-pro"
+                batch.append({
+                    'job_id': job_id,
+                    'new_prompt': prompt_text,
+                    'new_params': params if isinstance(params, dict) else {},
+                    'new_model_ref': model_ref,
+                })
+
+            conn.execute(update_stmt, batch)
+            last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    # Converted rows stay readable by the legacy parser only if re-encoded.
+    if context.is_offline_mode():
+        return
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        last_id = ""
+        while True:
+            rows = conn.execute(
+                sa.select(jobs.c.id, jobs.c.prompt, jobs.c.model_id, jobs.c.model_ref, jobs.c.generation_params)
+                .where(jobs.c.generation_params.is_not(None))
+                .where(jobs.c.id > last_id)
+                .order_by(jobs.c.id)
+                .limit(CHUNK_SIZE)
+            ).fetchall()
+            if not rows:
+                break
+
+            batch = []
+            for job_id, prompt, model_id, model_ref, params in rows:
+                model_identifier = str(model_id) if model_id else (model_ref or "flux")
+                if prompt == "[Deleted]":
+                    encoded = prompt
+                elif params:
+                    encoded = f"[{model_identifier}] {json.dumps(params)} | {prompt}"
+                else:
+                    encoded = f"[{model_identifier}] {prompt}"
+                batch.append({'job_id': job_id, 'new_prompt': encoded})
+
+            conn.execute(
+                sa.update(jobs)
+                .where(jobs.c.id == sa.bindparam('job_id'))
+                # SQL NULL, not JSON 'null', so the upgrade picks these rows up again
+                .values(prompt=sa.bindparam('new_prompt'), generation_params=sa.null()),
+                batch
+            )
+            last_id = rows[-1][0]
@@ -0,0 +1,27 @@
+"""add_provider_rate_limits
+
+Per-key submission rate limit (token bucket) on provider_configs; NULL means unlimited.
+
+Revision ID: 3c5e7a9b1d2f
+Revises: 2a08dc55c4eb
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '3c5e7a9b1d2f'
+down_revision = '2a08dc55c4eb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('provider_configs', sa.Column('rate_limit_per_second', sa.Float(), nullable=True))
+    op.add_column('provider_configs', sa.Column('rate_limit_burst', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('provider_configs', 'rate_limit_burst')
+    op.drop_column('provider_configs', 'rate_limit_per_second')
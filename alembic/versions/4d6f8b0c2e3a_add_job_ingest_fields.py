@@ -0,0 +1,29 @@
+"""add_job_ingest_fields
+
+Output ingest runs on its own Celery queue; the job records its state and timing.
+
+Revision ID: 4d6f8b0c2e3a
+Revises: 3c5e7a9b1d2f
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '4d6f8b0c2e3a'
+down_revision = '3c5e7a9b1d2f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('jobs', sa.Column('ingest_status', sa.String(), nullable=True))
+    op.add_column('jobs', sa.Column('ingested_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('jobs', sa.Column('ingest_seconds', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('jobs', 'ingest_seconds')
+    op.drop_column('jobs', 'ingested_at')
+    op.drop_column('jobs', 'ingest_status')
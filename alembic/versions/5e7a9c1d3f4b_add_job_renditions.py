@@ -0,0 +1,26 @@
+"""add_job_renditions
+
+Downscaled WebP/AVIF copies of image outputs, made at ingest.
+
+Revision ID: 5e7a9c1d3f4b
+Revises: 4d6f8b0c2e3a
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '5e7a9c1d3f4b'
+down_revision = '4d6f8b0c2e3a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('jobs', sa.Column('renditions', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('jobs', 'renditions')
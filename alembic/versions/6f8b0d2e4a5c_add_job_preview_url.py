@@ -0,0 +1,25 @@
+"""add_job_preview_url
+
+Video ingest stores a short preview loop next to the poster (cover_image_url).
+
+Revision ID: 6f8b0d2e4a5c
+Revises: 5e7a9c1d3f4b
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '6f8b0d2e4a5c'
+down_revision = '5e7a9c1d3f4b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('jobs', sa.Column('preview_url', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('jobs', 'preview_url')
@@ -0,0 +1,31 @@
+"""materialize_user_balance
+
+users.balance becomes the authoritative running total of ledger_entries.amount.
+Backfills it from the ledger (earlier writers updated it inconsistently) and indexes
+ledger_entries.user_id for the per-user reconciler sums.
+
+Revision ID: 7a9c1e3f5b6d
+Revises: 6f8b0d2e4a5c
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '7a9c1e3f5b6d'
+down_revision = '6f8b0d2e4a5c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_ledger_entries_user_id', 'ledger_entries', ['user_id'])
+    op.execute(
+        "UPDATE users SET balance = COALESCE("
+        "(SELECT SUM(amount) FROM ledger_entries WHERE ledger_entries.user_id = users.id), 0)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ledger_entries_user_id', table_name='ledger_entries')
@@ -0,0 +1,42 @@
+"""structured_job_inputs
+
+Revision ID: bdab4260aa70
+Revises: m7n8o9p0q1r2
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'bdab4260aa70'
+down_revision = 'm7n8o9p0q1r2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('jobs', sa.Column('model_ref', sa.String(), nullable=True))
+    op.create_index(op.f('ix_jobs_model_id'), 'jobs', ['model_id'], unique=False)
+
+    # JSON -> JSONB so params can be indexed and filtered (e.g. generation_params @> '{"aspect_ratio": "16:9"}')
+    op.alter_column(
+        'jobs', 'generation_params',
+        type_=postgresql.JSONB(astext_type=sa.Text()),
+        postgresql_using='generation_params::jsonb',
+        existing_nullable=True
+    )
+    op.create_index('ix_jobs_generation_params', 'jobs', ['generation_params'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_generation_params', table_name='jobs')
+    op.alter_column(
+        'jobs', 'generation_params',
+        type_=sa.JSON(),
+        postgresql_using='generation_params::json',
+        existing_nullable=True
+    )
+    op.drop_index(op.f('ix_jobs_model_id'), table_name='jobs')
+    op.drop_column('jobs', 'model_ref')
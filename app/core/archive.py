@@ -0,0 +1,170 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+from botocore.exceptions import ClientError
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.core.storage import S3Storage, storage
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PREFIX = "deleted/"
+CHECKPOINT_PREFIX = "archive:checkpoint"
+CHECKPOINT_TTL_SECONDS = 7 * 24 * 3600
+MAX_DELETE_BATCH = 1000  # S3 DeleteObjects limit
+
+
+@dataclass
+class BatchResult:
+    index: int
+    keys: int
+    copied: int = 0
+    deleted: int = 0
+    missing: int = 0  # Source already gone (e.g. archived before a crash)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class ArchiveReport:
+    archive_id: Optional[str]
+    total: int
+    resumed_from: int = 0  # First batch processed in this run
+    batches: List[BatchResult] = field(default_factory=list)
+
+    @property
+    def archived(self) -> int:
+        return sum(b.deleted for b in self.batches)
+
+    @property
+    def failed(self) -> int:
+        return sum(len(b.errors) for b in self.batches)
+
+
+class BulkArchiver:
+    """
+    Moves many objects under ARCHIVE_PREFIX.
+    - Keys are processed in sorted batches of up to 1000: copies run concurrently on a
+      bounded pool, then the copied originals are removed with one DeleteObjects call.
+    - With an ``archive_id``, the next batch index is checkpointed in Redis after each batch,
+      so a rerun after a crash resumes there (copy and delete are idempotent, so redoing
+      the interrupted batch is safe). The checkpoint is tied to the exact key set and is
+      kept after a run with failures.
+    """
+
+    def __init__(self, store: S3Storage, concurrency: int = 16, batch_size: int = MAX_DELETE_BATCH):
+        self.store = store
+        self.concurrency = concurrency
+        self.batch_size = min(batch_size, MAX_DELETE_BATCH)
+
+    def archive(self, keys: Iterable[str], archive_id: Optional[str] = None) -> ArchiveReport:
+        keys = sorted({k for k in keys if k})
+        batches = [keys[i:i + self.batch_size] for i in range(0, len(keys), self.batch_size)]
+        fingerprint = hashlib.sha1("\n".join(keys).encode()).hexdigest()[:16]
+        start = self._load_checkpoint(archive_id, fingerprint)
+        report = ArchiveReport(archive_id=archive_id, total=len(keys), resumed_from=start)
+        if start:
+            logger.info(f"Resuming archive {archive_id} at batch {start}/{len(batches)}")
+
+        # The checkpoint only advances past fully archived batches, so a rerun retries failures
+        advancing = True
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="s3-archive") as pool:
+            for index in range(start, len(batches)):
+                result = self._archive_batch(pool, index, batches[index])
+                report.batches.append(result)
+                logger.info(
+                    f"Archive {archive_id or '-'} batch {index + 1}/{len(batches)}: "
+                    f"{result.deleted} archived, {result.missing} missing, {len(result.errors)} failed"
+                )
+                advancing = advancing and not result.errors
+                if advancing:
+                    self._save_checkpoint(archive_id, fingerprint, index + 1)
+
+        if advancing:
+            self._clear_checkpoint(archive_id)
+        return report
+
+    def _archive_batch(self, pool: ThreadPoolExecutor, index: int, keys: List[str]) -> BatchResult:
+        result = BatchResult(index=index, keys=len(keys))
+        copied = []
+        for key, outcome in zip(keys, pool.map(self._copy, keys)):
+            if outcome is None:
+                copied.append(key)
+            elif outcome == "missing":
+                result.missing += 1
+            else:
+                result.errors[key] = outcome
+        result.copied = len(copied)
+
+        if copied:
+            try:
+                resp = self.store.client().delete_objects(
+                    Bucket=self.store.bucket,
+                    Delete={"Objects": [{"Key": k} for k in copied], "Quiet": True},
+                )
+                failed = {e["Key"]: e.get("Message") or e.get("Code", "error") for e in resp.get("Errors", [])}
+            except Exception as e:
+                failed = {k: str(e) for k in copied}
+            result.errors.update(failed)
+            result.deleted = len(copied) - len(failed)
+        return result
+
+    def _copy(self, key: str) -> Optional[str]:
+        """None on success, "missing" if the source is gone, else the error message."""
+        try:
+            self.store.client().copy_object(
+                CopySource={"Bucket": self.store.bucket, "Key": key},
+                Bucket=self.store.bucket,
+                Key=f"{ARCHIVE_PREFIX}{key}",
+            )
+            return None
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return "missing"
+            return str(e)
+        except Exception as e:
+            return str(e)
+
+    # --- Checkpoints (Redis, optional) ---
+
+    @staticmethod
+    def _load_checkpoint(archive_id: Optional[str], fingerprint: str) -> int:
+        client = get_redis() if archive_id else None
+        if client is None:
+            return 0
+        try:
+            saved = client.hgetall(f"{CHECKPOINT_PREFIX}:{archive_id}")
+        except Exception as e:
+            logger.warning(f"Archive checkpoint read failed: {e}")
+            return 0
+        if not saved or saved.get(b"fingerprint", b"").decode() != fingerprint:
+            return 0
+        return int(saved.get(b"next_batch", 0))
+
+    @staticmethod
+    def _save_checkpoint(archive_id: Optional[str], fingerprint: str, next_batch: int):
+        client = get_redis() if archive_id else None
+        if client is None:
+            return
+        try:
+            key = f"{CHECKPOINT_PREFIX}:{archive_id}"
+            pipe = client.pipeline(transaction=False)
+            pipe.hset(key, mapping={"fingerprint": fingerprint, "next_batch": next_batch})
+            pipe.expire(key, CHECKPOINT_TTL_SECONDS)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Archive checkpoint write failed: {e}")
+
+    @staticmethod
+    def _clear_checkpoint(archive_id: Optional[str]):
+        client = get_redis() if archive_id else None
+        if client is None:
+            return
+        try:
+            client.delete(f"{CHECKPOINT_PREFIX}:{archive_id}")
+        except Exception as e:
+            logger.warning(f"Archive checkpoint cleanup failed: {e}")
+
+
+bulk_archiver = BulkArchiver(storage, concurrency=settings.S3_ARCHIVE_CONCURRENCY)
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import PostgresDsn, RedisDsn, computed_field
-from typing import Optional
+from typing import Optional, Dict, List
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_ignore_empty=True, extra="ignore")
@@ -58,6 +58,123 @@ class Settings(BaseSettings):
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_SOCKET_TIMEOUT: float = 2.0
+
+    # Catalog UI Spec Cache
+    CATALOG_SPEC_CACHE_SIZE: int = 512  # In-process LRU entries
+    CATALOG_SPEC_CACHE_REDIS: bool = False  # Shared tier across web/worker processes
+    CATALOG_SPEC_CACHE_TTL_SECONDS: int = 60 * 60 * 24
+
+    # Catalog Snapshot (GET /api/models)
+    CATALOG_SNAPSHOT_REDIS_TTL_SECONDS: int = 60 * 60 * 24
+    CATALOG_SNAPSHOT_FALLBACK_TTL_SECONDS: int = 30  # Local rebuild interval when Redis is down
+
+    # Outbound HTTP (provider APIs) - pooled, keep-alive clients
+    HTTP2_ENABLED: bool = True  # Requires the 'h2' package (httpx[http2])
+    HTTP_POOL_MAX_CONNECTIONS: int = 100
+    HTTP_POOL_MAX_KEEPALIVE: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    HTTP_DEFAULT_TIMEOUT_SECONDS: float = 30.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP_POOL_TIMEOUT_SECONDS: float = 10.0  # Wait for a free pooled connection
+
+    # Job Queues (Celery routing by owner type and model type; see app/tasks/worker.py)
+    JOB_QUEUE_ROUTING_ENABLED: bool = True  # False: all jobs on Celery's default queue
+    JOB_QUEUE_PREFIX: str = "jobs"  # Queues are "<prefix>.<user|guest>.<image|video>"
+    JOB_QUEUE_MODEL_ROUTES: Dict[str, str] = {}  # Model id or model_ref -> dedicated queue
+    # Worker tuning per queue, applied to a worker started with WORKER_QUEUE=<queue>
+    JOB_QUEUE_WORKERS: Dict[str, Dict[str, int]] = {
+        "jobs.user.image": {"concurrency": 8, "prefetch": 1},
+        "jobs.user.video": {"concurrency": 4, "prefetch": 1},
+        "jobs.guest.image": {"concurrency": 2, "prefetch": 1},
+        "jobs.guest.video": {"concurrency": 1, "prefetch": 1},
+        "ingest": {"concurrency": 4, "prefetch": 1},
+    }
+
+    # Output ingest (download provider output, transform, upload to S3) off the webhook path
+    INGEST_QUEUE: str = "ingest"
+    INGEST_DOWNLOAD_TIMEOUT_SECONDS: float = 120.0
+    INGEST_MAX_RETRIES: int = 3
+    # Streaming S3 multipart transfer (video outputs); memory per transfer stays under the ceiling
+    TRANSFER_PART_SIZE_MB: int = 8  # S3 minimum is 5
+    TRANSFER_MAX_MEMORY_MB: int = 32  # Part being filled + parts uploading concurrently
+    TRANSFER_CHECKSUM: bool = True  # SHA-256 per part (verified by S3) and for the whole object
+    TRANSFER_PART_RETRIES: int = 3
+    # Stored image originals (app/domain/providers/normalization/image_transform.py)
+    IMAGE_OUTPUT_FORMAT: str = "jpeg"  # "jpeg" (progressive) | "webp"; images with alpha use WebP
+    IMAGE_JPEG_QUALITY: int = 85
+    IMAGE_WEBP_QUALITY: int = 82
+    IMAGE_MAX_DIMENSION: int = 4096  # Longer side; larger originals are downscaled
+    IMAGE_PASSTHROUGH_MAX_KB: int = 512  # Web-format originals up to this size are stored untouched
+    IMAGE_MIN_SAVINGS: float = 0.1  # Keep the original unless re-encoding saves at least this fraction
+    # Image renditions made at ingest (app/domain/jobs/renditions.py); feeds serve the smallest fit
+    IMAGE_RENDITIONS_ENABLED: bool = True
+    IMAGE_RENDITION_WIDTHS: List[int] = [256, 512, 1024]
+    IMAGE_RENDITION_FORMATS: List[str] = ["webp", "avif"]  # Formats the Pillow build lacks are skipped
+    IMAGE_RENDITION_QUALITY: Dict[str, int] = {"webp": 80, "avif": 55, "jpeg": 82}
+    IMAGE_TILE_WIDTH: int = 512  # Default feed tile width (?tile= overrides)
+    # Video ingest (app/domain/jobs/video.py): probe, poster frame and preview loop via ffmpeg
+    VIDEO_INGEST_ENABLED: bool = True
+    VIDEO_POSTER_AT_SECONDS: float = 1.0  # Clamped to mid-video for shorter clips
+    VIDEO_POSTER_WIDTH: int = 1280
+    VIDEO_POSTER_FORMAT: str = "jpeg"  # "jpeg" | "webp"
+    VIDEO_PREVIEW_SECONDS: float = 4.0  # 0 disables the preview loop
+    VIDEO_PREVIEW_WIDTH: int = 480
+    VIDEO_PREVIEW_FPS: int = 15
+    VIDEO_PREVIEW_CRF: int = 32
+    VIDEO_FFMPEG_TIMEOUT_SECONDS: float = 120.0
+    VIDEO_FASTSTART_ENABLED: bool = True  # Remux so the moov atom comes first (download completes before upload)
+    VIDEO_HLS_ENABLED: bool = False  # Also publish an HLS playlist for long/large videos
+    VIDEO_HLS_MIN_DURATION_SECONDS: float = 30.0  # Either threshold selects HLS
+    VIDEO_HLS_MIN_SIZE_MB: int = 50
+    VIDEO_HLS_SEGMENT_SECONDS: float = 6.0
+    # Media process pool (app/core/media_pool.py): image codecs off the event loop and the GIL
+    MEDIA_POOL_WORKERS: int = 2  # Per web/ingest process; 0 runs media work inline (threads in the web tier)
+    MEDIA_POOL_MAX_QUEUE: int = 16  # Tasks queued or running before callers wait or are rejected
+    MEDIA_POOL_QUEUE_WAIT_SECONDS: float = 10.0  # Blocking callers wait this long for a slot; async callers never wait
+    MEDIA_POOL_TASK_TIMEOUT_SECONDS: float = 60.0
+    MEDIA_POOL_START_METHOD: str = "forkserver"  # Never "fork" from a process running threads or an event loop
+
+    # Job Executor
+    JOB_EXECUTOR_MODE: str = "sync"  # "sync": process_job (one job per process), "async": event-loop executor
+    JOB_EXECUTOR_QUEUE: str = "jobs_async"  # Async executor queue when routing is off; routed jobs use "<queue>.async"
+    JOB_EXECUTOR_MAX_IN_FLIGHT: int = 50  # Concurrent submissions per executor process
+
+    # Job retries (exponential backoff with jitter, per-provider retry budget)
+    JOB_RETRY_BASE_SECONDS: float = 5.0
+    JOB_RETRY_MAX_SECONDS: float = 300.0
+    JOB_RETRY_BUDGET_RATIO: float = 0.2  # Retries allowed per submission attempt in a window
+    JOB_RETRY_BUDGET_MIN: int = 10  # Retries always allowed per window (low traffic)
+    JOB_RETRY_BUDGET_WINDOW_SECONDS: int = 60
+
+    # Running-job reconciler (replaces provider polling in GET /api/jobs/{id})
+    JOB_RECONCILE_INTERVAL_SECONDS: int = 15
+    JOB_RECONCILE_BATCH_SIZE: int = 500  # Running jobs polled per run (oldest first)
+    JOB_RECONCILE_CONCURRENCY: int = 10  # Concurrent provider requests
+    JOB_RECONCILE_MIN_AGE_SECONDS: int = 10  # Skip jobs submitted moments ago
+    JOB_RECONCILE_WEBHOOK_GRACE_SECONDS: int = 60  # Finalize only when the webhook is this late
+
+    # Materialized user balance (User.balance) checked against the ledger
+    BALANCE_RECONCILE_INTERVAL_SECONDS: int = 3600
+    BALANCE_RECONCILE_CHUNK_SIZE: int = 1000  # Users per statement/transaction
+    BALANCE_RECONCILE_REPAIR: bool = False  # Rewrite mismatched balances from the ledger (otherwise only reported)
+
+    # Job events (SSE /api/jobs/stream via Redis pub/sub)
+    JOB_EVENTS_HEARTBEAT_SECONDS: int = 15
+    JOB_EVENTS_RETRY_MS: int = 3000  # Client reconnect delay
+    JOB_EVENTS_MAX_PENDING: int = 100  # Undelivered jobs per connection before a reset
+    JOB_EVENTS_MAX_LOG_CHARS: int = 2000  # Log tail carried per event
+    JOB_EVENTS_REPLAY_SIZE: int = 200  # Events kept per owner for Last-Event-ID resume
+    JOB_EVENTS_REPLAY_TTL_SECONDS: int = 3600
+
+    # Provider prediction lookups (coalesced in-process, shared via Redis)
+    PREDICTION_CACHE_RUNNING_TTL_SECONDS: float = 1.5
+    PREDICTION_CACHE_TERMINAL_TTL_SECONDS: float = 3600.0
+
+    # Provider service cache (workers); admin CRUD pushes invalidations via Redis pub/sub
+    PROVIDER_CACHE_TTL_SECONDS: int = 300
+    # Throttled jobs reserve a submission slot at most this far ahead; beyond it they re-check
+    PROVIDER_RATE_LIMIT_MAX_RESERVE_SECONDS: int = 300
 
     # Stripe / Billing (SMPK placeholder)
     STRIPE_SECRET_KEY: Optional[str] = None
@@ -72,6 +189,16 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: Optional[str] = None
     AWS_REGION: str = "us-east-1"
     AWS_BUCKET_NAME: Optional[str] = None
+    # Shared S3 client (app/core/storage.py)
+    S3_MAX_POOL_CONNECTIONS: int = 32  # Also the size of the storage thread pool
+    S3_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    S3_READ_TIMEOUT_SECONDS: float = 60.0
+    S3_MAX_ATTEMPTS: int = 5  # botocore "standard" retry mode, includes the first attempt
+    S3_ARCHIVE_CONCURRENCY: int = 16  # Concurrent copies in bulk archiving (<= S3_MAX_POOL_CONNECTIONS)
+    # Presigned GET URLs (app/core/presign.py)
+    S3_PRESIGN_EXPIRES_SECONDS: int = 3600
+    S3_PRESIGN_REFRESH_MARGIN_SECONDS: int = 600  # Cached URLs are re-signed this long before expiry
+    S3_PRESIGN_CACHE_SIZE: int = 20000  # Entries per process (LRU)
 
     # Email / SMTP (mailU configuration)
     SMTP_HOST: str = "mail.dealvault.club"
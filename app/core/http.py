@@ -0,0 +1,185 @@
+import os
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Optional, Dict, Any
+import httpx
+from app.core.config import settings
+from app.core.monitoring import register_metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (installed via httpx[http2])
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class HttpClientManager:
+    """
+    Process-wide pooled HTTP clients for outbound provider calls.
+    - One sync client per process (Celery tasks, sync services).
+    - One async client per event loop (connections are bound to the loop that opened them).
+    Clients are dropped in forked children (Celery prefork, gunicorn) and re-created on first use,
+    so a child never reuses the parent's sockets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._sync_client: Optional[httpx.Client] = None
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self.stats = {"requests": 0, "connections_opened": 0, "clients_created": 0}
+
+    # --- Client Access ---
+
+    def get_sync_client(self) -> httpx.Client:
+        self._check_fork()
+        client = self._sync_client
+        if client is None or client.is_closed:
+            with self._lock:
+                client = self._sync_client
+                if client is None or client.is_closed:
+                    client = httpx.Client(
+                        http2=self._http2(),
+                        limits=self._limits(),
+                        timeout=self._timeout(),
+                        event_hooks={"request": [self._on_request_sync]},
+                    )
+                    self._sync_client = client
+                    self.stats["clients_created"] += 1
+        return client
+
+    def get_async_client(self) -> httpx.AsyncClient:
+        self._check_fork()
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=self._http2(),
+                limits=self._limits(),
+                timeout=self._timeout(),
+                event_hooks={"request": [self._on_request_async]},
+            )
+            self._async_clients[loop] = client
+            self.stats["clients_created"] += 1
+        return client
+
+    # --- Lifecycle ---
+
+    async def aclose(self):
+        """Closes the async client of the running loop and the sync client (app shutdown)."""
+        await self.aclose_loop_client()
+        self.close_sync()
+
+    async def aclose_loop_client(self):
+        """Closes the running loop's async client (short-lived loops, e.g. asyncio.run in a task)."""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    def close_sync(self):
+        with self._lock:
+            if self._sync_client is not None:
+                self._sync_client.close()
+                self._sync_client = None
+
+    def reset_after_fork(self):
+        # Do NOT close inherited clients: their sockets are shared with the parent.
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._sync_client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self.stats = {"requests": 0, "connections_opened": 0, "clients_created": 0}
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self.reset_after_fork()
+
+    # --- Metrics ---
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["http2"] = self._http2()
+        requests = stats["requests"]
+        stats["connection_reuse_ratio"] = round(1 - stats["connections_opened"] / requests, 4) if requests else 0.0
+        stats["sync_pool"] = self._pool_usage(self._sync_client)
+        stats["async_pools"] = [self._pool_usage(c) for c in list(self._async_clients.values())]
+        return stats
+
+    @staticmethod
+    def _pool_usage(client) -> Optional[Dict[str, int]]:
+        # httpcore does not expose pool state publicly; best effort only.
+        if client is None or client.is_closed:
+            return None
+        try:
+            connections = client._transport._pool.connections
+            idle = sum(1 for c in connections if c.is_idle())
+            return {"connections": len(connections), "idle": idle, "active": len(connections) - idle}
+        except Exception:
+            return None
+
+    def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            self.stats["connections_opened"] += 1
+
+    async def _trace_async(self, event_name: str, info: dict):
+        self._trace(event_name, info)
+
+    def _on_request_sync(self, request: httpx.Request):
+        self.stats["requests"] += 1
+        request.extensions.setdefault("trace", self._trace)
+
+    async def _on_request_async(self, request: httpx.Request):
+        self.stats["requests"] += 1
+        request.extensions.setdefault("trace", self._trace_async)
+
+    # --- Configuration ---
+
+    @staticmethod
+    def _http2() -> bool:
+        return settings.HTTP2_ENABLED and HTTP2_AVAILABLE
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+
+    @staticmethod
+    def _timeout() -> httpx.Timeout:
+        return httpx.Timeout(
+            settings.HTTP_DEFAULT_TIMEOUT_SECONDS,
+            connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+            pool=settings.HTTP_POOL_TIMEOUT_SECONDS,
+        )
+
+
+http_clients = HttpClientManager()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=http_clients.reset_after_fork)
+
+register_metrics("http_clients", http_clients.get_stats)
+
+
+def get_sync_client() -> httpx.Client:
+    return http_clients.get_sync_client()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    return http_clients.get_async_client()
+
+
+def request_timeout(seconds: float) -> httpx.Timeout:
+    """Per-call timeout that keeps the pooled connect/pool timeouts."""
+    return httpx.Timeout(
+        seconds,
+        connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+        pool=settings.HTTP_POOL_TIMEOUT_SECONDS,
+    )
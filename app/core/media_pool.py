@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+from app.core.config import settings
+from app.core.monitoring import register_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MediaPoolBusy(RuntimeError):
+    """The queue limit was reached (web callers answer 503, ingest tasks retry)."""
+
+
+def _init_worker():
+    # Interrupts go to the parent, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from PIL import Image
+    Image.init()  # Codec plugins registered once per worker, not on its first image
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class MediaPool:
+    """
+    Process pool for CPU-bound media work (image decode, resize, encode).
+    - Codecs run in worker processes, so they neither stall the web tier's event loop
+      nor hold the GIL against request and transfer threads.
+    - ``start`` spawns and warms every worker up front; otherwise workers start on first use.
+    - At most ``MEDIA_POOL_MAX_QUEUE`` tasks are queued or running. Blocking callers wait
+      up to MEDIA_POOL_QUEUE_WAIT_SECONDS for a slot (backpressure); async callers are
+      rejected at once with MediaPoolBusy instead of piling up requests.
+    - Every call has a timeout. A running task cannot be interrupted: it is abandoned and
+      keeps its slot until it ends, so a stuck codec still counts against the queue.
+    - A crashed worker (e.g. killed for memory) breaks the pool; it is rebuilt for the next task.
+    Tasks and arguments must be picklable (module-level functions, functools.partial).
+    With MEDIA_POOL_WORKERS=0, or in daemonic processes that cannot have children, work
+    runs in the caller (on a thread for async callers). Recreated after fork.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max(1, settings.MEDIA_POOL_MAX_QUEUE))
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "timeouts": 0, "rejected": 0,
+                      "waited": 0, "inline": 0, "in_flight": 0, "peak_in_flight": 0, "restarts": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.MEDIA_POOL_WORKERS > 0 and not multiprocessing.current_process().daemon
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Spawns and warms all workers. Blocking: async callers use ``asyncio.to_thread``."""
+        if not self.enabled:
+            return
+        try:
+            executor = self._pool()
+            warmups = [executor.submit(_ping) for _ in range(settings.MEDIA_POOL_WORKERS)]
+            pids = {f.result(timeout=settings.MEDIA_POOL_TASK_TIMEOUT_SECONDS) for f in warmups}
+            logger.info(f"Media pool started with {len(pids)} workers")
+        except Exception as e:
+            # Not fatal: the next task starts the pool again
+            logger.error(f"Media pool warm-up failed: {e}")
+            self.shutdown()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Entry Points ---
+
+    def call(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Blocking entry point (ingest tasks). Raises MediaPoolBusy or TimeoutError."""
+        if not self.enabled:
+            self._count("inline")
+            return fn(*args)
+        future = self.submit(fn, *args, wait=settings.MEDIA_POOL_QUEUE_WAIT_SECONDS)
+        try:
+            return future.result(timeout=self._timeout(timeout))
+        except TimeoutError:
+            if future.done():
+                raise  # Raised by the task itself
+            self._abandon(future)
+            raise
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Async entry point (web tier); never blocks the loop. Raises MediaPoolBusy or TimeoutError."""
+        if not self.enabled:
+            self._count("inline")
+            return await asyncio.to_thread(fn, *args)
+        future = self.submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self._timeout(timeout))
+        except TimeoutError:
+            if future.done() and not future.cancelled():
+                raise
+            self._abandon(future)
+            raise
+
+    def submit(self, fn: Callable, *args, wait: float = 0) -> Future:
+        """Queues a task, waiting up to ``wait`` seconds for a slot."""
+        executor = self._pool()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            if wait <= 0 or not slots.acquire(timeout=wait):
+                self._count("rejected")
+                raise MediaPoolBusy(f"Media pool queue full ({settings.MEDIA_POOL_MAX_QUEUE} tasks)")
+            self._count("waited")
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._discard(executor)
+            try:
+                executor = self._pool()
+                future = executor.submit(fn, *args)
+            except Exception:
+                slots.release()
+                raise
+        except Exception:
+            slots.release()
+            raise
+        with self._lock:
+            self.stats["submitted"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+        future.add_done_callback(lambda f: self._done(f, executor, slots))
+        return future
+
+    # --- Internals ---
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._pid != os.getpid():
+            with self._lock:
+                self._reset()
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=settings.MEDIA_POOL_WORKERS,
+                        mp_context=multiprocessing.get_context(settings.MEDIA_POOL_START_METHOD),
+                        initializer=_init_worker,
+                    )
+        return self._executor
+
+    def _done(self, future: Future, executor: ProcessPoolExecutor, slots: threading.BoundedSemaphore):
+        slots.release()
+        with self._lock:
+            self.stats["in_flight"] -= 1
+            if future.cancelled():
+                return
+            self.stats["completed" if future.exception() is None else "failed"] += 1
+        if isinstance(future.exception(), BrokenProcessPool):
+            logger.error("Media pool worker died, rebuilding the pool")
+            self._discard(executor)
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is not executor:
+                return  # Already replaced
+            self._executor = None
+            self.stats["restarts"] += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _abandon(self, future: Future):
+        future.cancel()  # Only takes effect while the task is still queued
+        self._count("timeouts")
+        logger.warning("Media task timed out")
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def _timeout(timeout: Optional[float]) -> float:
+        return timeout if timeout is not None else settings.MEDIA_POOL_TASK_TIMEOUT_SECONDS
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["enabled"] = self.enabled
+        stats["workers"] = settings.MEDIA_POOL_WORKERS
+        stats["max_queue"] = settings.MEDIA_POOL_MAX_QUEUE
+        stats["running"] = self._executor is not None
+        return stats
+
+
+media_pool = MediaPool()
+
+register_metrics("media_pool", media_pool.get_stats)
@@ -3,12 +3,28 @@ import collections
 import time
 import psutil
 from datetime import datetime
-from typing import Deque, List, Dict, Any
+from typing import Deque, List, Dict, Any, Callable
 
 # Global buffer to hold recent logs
 # Deque is thread-safe for appends and pops from opposite ends
 LOG_BUFFER: Deque[Dict[str, Any]] = collections.deque(maxlen=1000)
 
+# Named callables returning runtime counters (caches, pools, queues).
+# Counters are per-process; they describe the process serving the request.
+METRICS_SOURCES: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+def register_metrics(name: str, source: Callable[[], Dict[str, Any]]):
+    METRICS_SOURCES[name] = source
+
+def collect_metrics() -> Dict[str, Any]:
+    data = {}
+    for name, source in METRICS_SOURCES.items():
+        try:
+            data[name] = source()
+        except Exception as e:
+            data[name] = {"error": str(e)}
+    return data
+
 class LogBufferHandler(logging.Handler):
     """
     Custom logging handler that writes log records to an in-memory buffer.
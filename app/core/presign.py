@@ -0,0 +1,139 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+from app.core.config import settings
+from app.core.monitoring import register_metrics
+from app.core.storage import S3Storage, storage
+
+logger = logging.getLogger(__name__)
+
+SignKey = Tuple[str, Optional[str]]  # (object key, download filename)
+
+
+class PresignedUrlService:
+    """
+    Presigned GET URLs for stored results.
+    - Signing is local: the shared S3 client already holds resolved credentials, so a URL
+      costs an HMAC, not a client construction or a network call.
+    - Signed URLs are cached per (key, filename) and reused until ``refresh_margin``
+      seconds before they expire, so every URL handed out stays valid at least that long.
+    - ``sign_many`` serves listings (library, gallery, feeds) in one call.
+    Only objects in our bucket are signed; other URLs (e.g. provider outputs still pending
+    ingest) are returned unchanged. Reset after fork like the S3 client.
+    """
+
+    def __init__(self, store: S3Storage, expires_in: int = 3600, refresh_margin: int = 600,
+                 max_entries: int = 20000):
+        self.store = store
+        self.expires_in = expires_in
+        self.refresh_margin = min(refresh_margin, expires_in // 2)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._cache: "OrderedDict[SignKey, Tuple[str, float]]" = OrderedDict()
+        self.stats = {"hits": 0, "signed": 0, "errors": 0, "evicted": 0}
+
+    # --- Signing ---
+
+    def sign(self, key: str, filename: Optional[str] = None) -> str:
+        """Presigned GET URL for a key. Raises if signing fails."""
+        return self.sign_many([(key, filename)])[(key, filename)]
+
+    def sign_many(self, items: Iterable[SignKey]) -> Dict[SignKey, str]:
+        """Signs (key, filename) pairs, reusing cached URLs. Raises if any signing fails."""
+        if self._pid != os.getpid():
+            with self._lock:
+                self._reset()
+        now = time.time()
+        urls: Dict[SignKey, str] = {}
+        missing = []
+        with self._lock:
+            for item in items:
+                if item in urls:
+                    continue
+                cached = self._cache.get(item)
+                if cached is not None and cached[1] > now:
+                    self._cache.move_to_end(item)
+                    urls[item] = cached[0]
+                    self.stats["hits"] += 1
+                else:
+                    missing.append(item)
+
+        if not missing:
+            return urls
+        try:
+            signed = [(item, self.store.presigned_get(item[0], item[1], expires_in=self.expires_in))
+                      for item in missing]
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+
+        reuse_until = now + self.expires_in - self.refresh_margin
+        with self._lock:
+            for item, url in signed:
+                urls[item] = url
+                self._cache[item] = (url, reuse_until)
+                self._cache.move_to_end(item)
+            self.stats["signed"] += len(signed)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self.stats["evicted"] += 1
+        return urls
+
+    # --- Result URLs ---
+
+    def key_for(self, url: Optional[str]) -> Optional[str]:
+        """Object key if the URL points into our bucket, else None."""
+        if not url or not self.store.enabled:
+            return None
+        parsed = urlparse(url)
+        if not (parsed.hostname or "").startswith(f"{self.store.bucket}.s3."):
+            return None
+        return parsed.path.lstrip('/') or None
+
+    def sign_result_url(self, url: str, filename: Optional[str] = None) -> str:
+        """Signed URL for a stored result; foreign URLs are returned as is."""
+        key = self.key_for(url)
+        return self.sign(key, filename) if key else url
+
+    def sign_result_urls(self, urls: Iterable[Optional[str]]) -> Dict[str, str]:
+        """
+        Batch form for listings: {result_url: signed_url} for the URLs in our bucket.
+        Signing failures degrade to an empty mapping (clients keep the stored URL).
+        """
+        keys = {}
+        for url in urls:
+            key = self.key_for(url)
+            if key:
+                keys[url] = key
+        if not keys:
+            return {}
+        try:
+            signed = self.sign_many((key, None) for key in keys.values())
+        except Exception as e:
+            logger.error(f"Batch presign failed: {e}")
+            return {}
+        return {url: signed[(key, None)] for url, key in keys.items()}
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["entries"] = len(self._cache)
+        stats["expires_in"] = self.expires_in
+        return stats
+
+
+presigner = PresignedUrlService(
+    storage,
+    expires_in=settings.S3_PRESIGN_EXPIRES_SECONDS,
+    refresh_margin=settings.S3_PRESIGN_REFRESH_MARGIN_SECONDS,
+    max_entries=settings.S3_PRESIGN_CACHE_SIZE,
+)
+
+register_metrics("presign", presigner.get_stats)
@@ -0,0 +1,81 @@
+import os
+import asyncio
+import logging
+import weakref
+from typing import Optional
+import redis
+import redis.asyncio as aioredis
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Process-local clients. Redis connections must not be shared across a fork
+# (Celery prefork, gunicorn), so we remember which PID created them.
+# Async connections are also bound to the event loop that opened them, so there is one
+# async client per loop (tasks that asyncio.run() each time get a fresh one).
+_sync_client: Optional[redis.Redis] = None
+_sync_pid: Optional[int] = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = weakref.WeakKeyDictionary()
+_async_pid: Optional[int] = None
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """
+    Returns a process-wide sync Redis client, or None if Redis is not configured.
+    Callers must treat Redis as an optional tier and handle RedisError themselves.
+    """
+    global _sync_client, _sync_pid
+    if not settings.REDIS_URL:
+        return None
+    pid = os.getpid()
+    if _sync_client is None or _sync_pid != pid:
+        _sync_client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+        _sync_pid = pid
+    return _sync_client
+
+
+def get_async_redis() -> Optional[aioredis.Redis]:
+    """
+    Async counterpart of get_redis() for FastAPI handlers and async workers.
+    Must be called from a running event loop; the client belongs to that loop.
+    """
+    global _async_clients, _async_pid
+    if not settings.REDIS_URL:
+        return None
+    pid = os.getpid()
+    if _async_pid != pid:
+        _async_clients = weakref.WeakKeyDictionary()
+        _async_pid = pid
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = aioredis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def close_loop_redis():
+    """Closes the running loop's async client (short-lived loops, e.g. asyncio.run in a task)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to close async Redis client: {e}")
+
+
+async def close_redis():
+    """Closes process-wide clients (app shutdown)."""
+    global _sync_client
+    await close_loop_redis()
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
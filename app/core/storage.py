@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from app.core.config import settings
+from app.core.monitoring import register_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class S3Storage:
+    """
+    Owns the process-wide S3 client.
+    - One botocore client per process (clients are thread-safe; building one resolves
+      credentials and endpoints, which is what made per-call construction slow).
+    - Connection pool, retries and timeouts are configured here only (S3_* settings).
+    - Blocking calls from async code run on a dedicated bounded pool sized like the
+      connection pool, not on the loop's default executor.
+    Recreated after fork (Celery prefork, gunicorn), like the Redis and HTTP clients.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._client = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.stats = {"clients_created": 0, "async_calls": 0, "archived": 0, "archive_errors": 0}
+
+    # --- Client ---
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.AWS_ACCESS_KEY_ID and settings.AWS_BUCKET_NAME)
+
+    @property
+    def bucket(self) -> Optional[str]:
+        return settings.AWS_BUCKET_NAME
+
+    def client(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                self._reset()
+        client = self._client
+        if client is None:
+            with self._lock:
+                client = self._client
+                if client is None:
+                    client = self._client = self._create_client()
+                    self.stats["clients_created"] += 1
+        return client
+
+    @staticmethod
+    def _create_client():
+        config = Config(
+            region_name=settings.AWS_REGION,
+            max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+            connect_timeout=settings.S3_CONNECT_TIMEOUT_SECONDS,
+            read_timeout=settings.S3_READ_TIMEOUT_SECONDS,
+            retries={"max_attempts": settings.S3_MAX_ATTEMPTS, "mode": "standard"},
+            tcp_keepalive=True,
+        )
+        return boto3.session.Session().client(
+            's3',
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            config=config,
+        )
+
+    # --- Async Bridge ---
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Runs a blocking storage call from async code on the storage pool."""
+        self.stats["async_calls"] += 1
+        loop = asyncio.get_running_loop()
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs), loop=loop)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Schedules a blocking storage call (fire-and-forget callers may drop the future)."""
+        return self._pool().submit(fn, *args, **kwargs)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._pid != os.getpid():
+            with self._lock:
+                self._reset()
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.S3_MAX_POOL_CONNECTIONS, thread_name_prefix="s3"
+                    )
+        return self._executor
+
+    # --- Operations ---
+
+    def public_url(self, key: str) -> str:
+        return f"https://{self.bucket}.s3.{settings.AWS_REGION}.amazonaws.com/{key}"
+
+    @staticmethod
+    def key_from_url(url: str) -> str:
+        # format: https://bucket.s3.region.amazonaws.com/path/to/key
+        return urlparse(url).path.lstrip('/')
+
+    def put_bytes(self, key: str, body: bytes, content_type: str) -> str:
+        self.client().put_object(Bucket=self.bucket, Key=key, Body=body, ContentType=content_type)
+        return self.public_url(key)
+
+    def upload_fileobj(self, fileobj, key: str, content_type: Optional[str]) -> str:
+        extra = {'ContentType': content_type} if content_type else None
+        self.client().upload_fileobj(fileobj, self.bucket, key, ExtraArgs=extra)
+        return self.public_url(key)
+
+    def archive(self, key: str) -> bool:
+        """Moves an object under the 'deleted/' prefix. Returns False if it failed or was missing."""
+        s3 = self.client()
+        dest_key = f"deleted/{key}"
+        try:
+            s3.copy_object(CopySource={'Bucket': self.bucket, 'Key': key}, Bucket=self.bucket, Key=dest_key)
+            s3.delete_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            self.stats["archive_errors"] += 1
+            if e.response.get('Error', {}).get('Code') in ("404", "NoSuchKey"):
+                logger.warning(f"S3 object {key} not found for archiving")
+            else:
+                logger.error(f"Failed to archive S3 object {key}: {e}")
+            return False
+        except Exception as e:
+            self.stats["archive_errors"] += 1
+            logger.error(f"Failed to archive S3 object {key}: {e}")
+            return False
+        self.stats["archived"] += 1
+        return True
+
+    def presigned_get(self, key: str, filename: Optional[str] = None, expires_in: int = 3600) -> str:
+        params = {'Bucket': self.bucket, 'Key': key}
+        if filename:
+            params['ResponseContentDisposition'] = f'attachment; filename="{filename}"'
+        return self.client().generate_presigned_url('get_object', Params=params, ExpiresIn=expires_in)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["enabled"] = self.enabled
+        stats["client_ready"] = self._client is not None
+        stats["max_pool_connections"] = settings.S3_MAX_POOL_CONNECTIONS
+        return stats
+
+
+storage = S3Storage()
+
+register_metrics("storage", storage.get_stats)
@@ -13,10 +13,12 @@ class AnalyticsService:
         details: Optional[Dict[str, Any]] = None,
         user_id: Optional[str] = None,
         request: Optional[Request] = None,
-        guest_id: Optional[str] = None
+        guest_id: Optional[str] = None,
+        commit: bool = True
     ):
         """
         Logs a user action to the database.
+        With commit=False the row joins the caller's transaction (e.g. job creation).
         """
         path = None
         ip_address = None
@@ -45,6 +47,8 @@ class AnalyticsService:
         )
         
         db.add(activity)
+        if not commit:
+            return
         try:
             await db.commit()
         except Exception:
@@ -14,7 +14,7 @@ class LedgerEntry(Base):
     __tablename__ = "ledger_entries"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
     amount: Mapped[int] = mapped_column(Integer, nullable=False)  # Positive for topup, negative for spend
     currency: Mapped[str] = mapped_column(String, default="credits")
     reason: Mapped[str] = mapped_column(String, nullable=False)  # "topup", "job_cost", "refund"
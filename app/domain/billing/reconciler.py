@@ -0,0 +1,89 @@
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func, select, update
+from app.core.config import settings
+from app.core.monitoring import register_metrics
+from app.domain.billing.models import LedgerEntry
+from app.domain.users.models import User
+
+logger = logging.getLogger(__name__)
+
+
+def _chunk_statement(after: Optional[uuid.UUID], size: int):
+    """Balances and ledger totals of the next ``size`` users by id, read in one snapshot."""
+    users = select(User.id, User.balance).order_by(User.id).limit(size)
+    if after is not None:
+        users = users.where(User.id > after)
+    users = users.cte("chunk")
+    totals = (
+        select(LedgerEntry.user_id, func.sum(LedgerEntry.amount).label("total"))
+        .where(LedgerEntry.user_id.in_(select(users.c.id)))
+        .group_by(LedgerEntry.user_id)
+        .subquery()
+    )
+    return (
+        select(users.c.id, users.c.balance, func.coalesce(totals.c.total, 0).label("total"))
+        .outerjoin(totals, totals.c.user_id == users.c.id)
+        .order_by(users.c.id)
+    )
+
+
+def _repair_statement(user_id: uuid.UUID):
+    total = select(func.coalesce(func.sum(LedgerEntry.amount), 0)).where(LedgerEntry.user_id == user_id)
+    return update(User).where(User.id == user_id).values(balance=total.scalar_subquery())
+
+
+class BalanceReconciler:
+    """
+    Verifies the materialized User.balance against the ledger.
+    - Walks users by id in chunks; each chunk is one statement (balances and ledger sums
+      from the same snapshot), in its own short transaction.
+    - Mismatches are logged and counted. With ``repair`` they are rewritten from the ledger.
+    Balance reads never sum the ledger; this is the only place that does, off the request path.
+    """
+
+    def __init__(self, chunk_size: int = 1000, repair: bool = False):
+        self.chunk_size = chunk_size
+        self.repair = repair
+        self.stats = {"runs": 0, "checked": 0, "mismatched": 0, "repaired": 0, "last_run_ms": 0}
+
+    async def run_once(self, session_factory) -> Dict[str, Any]:
+        started = time.monotonic()
+        summary = {"checked": 0, "mismatched": 0, "repaired": 0}
+        after = None
+        while True:
+            async with session_factory() as db:
+                rows = (await db.execute(_chunk_statement(after, self.chunk_size))).all()
+                mismatched: List = [row for row in rows if row.balance != row.total]
+                for row in mismatched:
+                    logger.warning(f"Balance mismatch for user {row.id}: balance {row.balance}, ledger {row.total}")
+                    if self.repair:
+                        await db.execute(_repair_statement(row.id))
+                await db.commit()
+            summary["checked"] += len(rows)
+            summary["mismatched"] += len(mismatched)
+            if self.repair:
+                summary["repaired"] += len(mismatched)
+            if len(rows) < self.chunk_size:
+                break
+            after = rows[-1].id
+
+        self.stats["runs"] += 1
+        for k, v in summary.items():
+            self.stats[k] += v
+        self.stats["last_run_ms"] = int((time.monotonic() - started) * 1000)
+        logger.info(f"Reconciled user balances: {summary}")
+        return summary
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+
+balance_reconciler = BalanceReconciler(
+    chunk_size=settings.BALANCE_RECONCILE_CHUNK_SIZE,
+    repair=settings.BALANCE_RECONCILE_REPAIR,
+)
+
+register_metrics("balance_reconciler", balance_reconciler.get_stats)
@@ -1,31 +1,190 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
 from app.domain.billing.models import LedgerEntry
+from app.domain.jobs.models import Job
 from app.domain.users.models import User
+from app.domain.users.guest_models import GuestProfile
 import uuid
 
-async def get_user_balance(db: AsyncSession, user_id: uuid.UUID) -> int:
-    result = await db.execute(
-        select(func.sum(LedgerEntry.amount)).where(LedgerEntry.user_id == user_id)
+# User.balance is the materialized sum of the user's ledger entries. Every ledger row
+# is written through post_entry/post_entry_sync, which move the balance in the same
+# transaction; BalanceReconciler (billing/reconciler.py) verifies it periodically.
+# Guests have no ledger: GuestProfile.balance is their only record.
+#
+# Job credits: reserve_credits takes the cost with one conditional UPDATE (no read,
+# no lock held beyond the statement's transaction, never below zero); release_credits
+# gives it back. Neither commits. Failure paths go through fail_and_release, whose
+# conditional status change makes sure a job's credits are released at most once.
+
+
+def balance_statement(model, owner_id: uuid.UUID, delta: int, require: int | None = None):
+    """
+    Moves a User's or GuestProfile's balance by ``delta`` and returns the new balance.
+    With ``require``, only applies while the balance is at least that much (no row when
+    it is not). The row lock it takes orders concurrent writes to the same balance, so
+    ledger checkpoints computed from the returned value are exact.
+    """
+    stmt = update(model).where(model.id == owner_id)
+    if require is not None:
+        stmt = stmt.where(model.balance >= require)
+    return (
+        stmt.values(balance=model.balance + delta)
+        .returning(model.balance)
+        .execution_options(synchronize_session=False)
     )
-    balance = result.scalar()
-    return balance if balance else 0
 
-async def add_ledger_entry(
-    db: AsyncSession, 
-    user_id: uuid.UUID, 
-    amount: int, 
-    reason: str, 
-    external_id: str | None = None
-) -> LedgerEntry:
-    entry = LedgerEntry(
+
+def _show(session, model, owner_id: uuid.UUID, balance: int | None):
+    # A loaded object shows the balance the UPDATE returned, not a value recomputed in Python
+    obj = session.identity_map.get(identity_key(model, owner_id))
+    if obj is not None and balance is not None:
+        set_committed_value(obj, "balance", balance)
+
+
+def _stamp(entry: LedgerEntry, balance) -> LedgerEntry:
+    if balance is None:
+        raise ValueError(f"User {entry.user_id} not found")
+    entry.balance_after = balance
+    entry.balance_before = balance - entry.amount
+    return entry
+
+
+async def post_entry(db: AsyncSession, entry: LedgerEntry) -> LedgerEntry:
+    """Adds an unsaved ledger entry and applies it to User.balance. The caller commits."""
+    balance = (await db.execute(balance_statement(User, entry.user_id, entry.amount))).scalar_one_or_none()
+    _show(db, User, entry.user_id, balance)
+    db.add(_stamp(entry, balance))
+    return entry
+
+
+def post_entry_sync(session: Session, entry: LedgerEntry) -> LedgerEntry:
+    """post_entry for sync sessions (Celery runner)."""
+    balance = session.execute(balance_statement(User, entry.user_id, entry.amount)).scalar_one_or_none()
+    _show(session, User, entry.user_id, balance)
+    session.add(_stamp(entry, balance))
+    return entry
+
+
+async def reserve_credits(db: AsyncSession, owner: User | GuestProfile, cost: int, reason: str) -> bool:
+    """
+    Takes ``cost`` from a user's or guest's balance if it covers it, atomically.
+    Returns False (nothing written) when it does not. Users also get the ledger entry.
+    """
+    model = User if isinstance(owner, User) else GuestProfile
+    balance = (await db.execute(balance_statement(model, owner.id, -cost, require=cost))).scalar_one_or_none()
+    if balance is None:
+        return False
+    _show(db, model, owner.id, balance)
+    if model is User:
+        db.add(_stamp(_entry(owner.id, -cost, reason), balance))
+    return True
+
+
+def _release(job, reason: str):
+    """(model, owner id, ledger entry or None) of a job's refund."""
+    if job.user_id:
+        return User, job.user_id, _entry(job.user_id, job.cost_credits, reason,
+                                         external_id=f"refund_{job.id}", related_job_id=job.id)
+    return GuestProfile, job.guest_id, None
+
+
+async def release_credits(db: AsyncSession, job, reason: str) -> bool:
+    """
+    Gives a job's reserved credits back to its user or guest. Returns False if none were held.
+    Not idempotent: call it only from the job's terminal transition (see fail_and_release).
+    """
+    if job.cost_credits <= 0 or not (job.user_id or job.guest_id):
+        return False
+    model, owner_id, entry = _release(job, reason)
+    if entry is not None:
+        await post_entry(db, entry)
+        return True
+    balance = (await db.execute(balance_statement(model, owner_id, job.cost_credits))).scalar_one_or_none()
+    _show(db, model, owner_id, balance)
+    return balance is not None
+
+
+def release_credits_sync(session: Session, job, reason: str) -> bool:
+    """release_credits for sync sessions (Celery runner)."""
+    if job.cost_credits <= 0 or not (job.user_id or job.guest_id):
+        return False
+    model, owner_id, entry = _release(job, reason)
+    if entry is not None:
+        post_entry_sync(session, entry)
+        return True
+    balance = session.execute(balance_statement(model, owner_id, job.cost_credits)).scalar_one_or_none()
+    _show(session, model, owner_id, balance)
+    return balance is not None
+
+
+def _fail_statement(job_id: str, error_message: str):
+    """Marks a job failed unless it is already terminal (no row then)."""
+    return (
+        update(Job)
+        .where(Job.id == job_id, Job.status.not_in(("succeeded", "failed")))
+        .values(status="failed", error_message=error_message)
+        .returning(Job.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _mark_failed(job, error_message: str):
+    set_committed_value(job, "status", "failed")
+    set_committed_value(job, "error_message", error_message)
+
+
+async def fail_and_release(db: AsyncSession, job, error_message: str, reason: str) -> bool:
+    """
+    Fails a job and releases its credits, once: only the call that moves the job out of
+    a non-terminal status refunds. Returns False (nothing written) if it was already
+    terminal. The caller commits.
+    """
+    if (await db.execute(_fail_statement(job.id, error_message))).first() is None:
+        return False
+    _mark_failed(job, error_message)
+    await release_credits(db, job, reason)
+    return True
+
+
+def fail_and_release_sync(session: Session, job, error_message: str, reason: str) -> bool:
+    """fail_and_release for sync sessions (Celery runner)."""
+    if session.execute(_fail_statement(job.id, error_message)).first() is None:
+        return False
+    _mark_failed(job, error_message)
+    release_credits_sync(session, job, reason)
+    return True
+
+
+def _entry(user_id: uuid.UUID, amount: int, reason: str, external_id: str | None = None,
+           related_job_id: str | None = None) -> LedgerEntry:
+    return LedgerEntry(
         user_id=user_id,
         amount=amount,
         reason=reason,
         external_id=external_id,
+        related_job_id=related_job_id,
         currency="credits"
     )
-    db.add(entry)
+
+
+async def get_user_balance(db: AsyncSession, user_id: uuid.UUID) -> int:
+    """Primary-key read of the materialized balance, independent of ledger size."""
+    result = await db.execute(select(User.balance).where(User.id == user_id))
+    balance = result.scalar()
+    return balance if balance else 0
+
+async def add_ledger_entry(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    amount: int,
+    reason: str,
+    external_id: str | None = None,
+    related_job_id: str | None = None,
+) -> LedgerEntry:
+    entry = await post_entry(db, _entry(user_id, amount, reason, external_id, related_job_id))
     await db.commit()
     await db.refresh(entry)
     return entry
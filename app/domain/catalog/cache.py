@@ -0,0 +1,147 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, Dict, Any
+from app.core.config import settings
+from app.core.redis import get_redis, get_async_redis
+from app.core.monitoring import register_metrics
+from app.domain.catalog.schemas import ModelUISpec
+
+logger = logging.getLogger(__name__)
+
+SpecKey = Tuple[str, str, str]  # (model_id, schema_version_hash, user_tier)
+
+REDIS_PREFIX = "catalog:spec"
+
+
+class SpecCache:
+    """
+    Two-level cache for compiled UI specs.
+    L1: in-process LRU. L2 (optional): Redis, shared by web and worker processes.
+    Keys embed the schema version hash, so a changed schema/config never hits a stale entry.
+    Cached specs are shared objects and must be treated as read-only by callers.
+    """
+
+    def __init__(self, max_size: int = 512, use_redis: bool = False, redis_ttl: int = 86400):
+        self.max_size = max_size
+        self.use_redis = use_redis
+        self.redis_ttl = redis_ttl
+        self._local: "OrderedDict[SpecKey, ModelUISpec]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits_local": 0, "hits_redis": 0, "misses": 0, "invalidations": 0, "redis_errors": 0}
+
+    @staticmethod
+    def _redis_key(key: SpecKey) -> str:
+        model_id, version, tier = key
+        return f"{REDIS_PREFIX}:{model_id}:{version}:{tier}"
+
+    def get(self, key: SpecKey) -> Optional[ModelUISpec]:
+        with self._lock:
+            spec = self._local.get(key)
+            if spec is not None:
+                self._local.move_to_end(key)
+                self.stats["hits_local"] += 1
+                return spec
+
+        if self.use_redis:
+            raw = self._redis_call("get", self._redis_key(key))
+            if raw:
+                try:
+                    spec = ModelUISpec.model_validate_json(raw)
+                except Exception as e:
+                    logger.warning(f"Discarding undecodable cached spec {key}: {e}")
+                    spec = None
+                if spec is not None:
+                    self._store_local(key, spec)
+                    with self._lock:
+                        self.stats["hits_redis"] += 1
+                    return spec
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def set(self, key: SpecKey, spec: ModelUISpec):
+        self._store_local(key, spec)
+        if self.use_redis:
+            self._redis_call("set", self._redis_key(key), spec.model_dump_json(), ex=self.redis_ttl)
+
+    def invalidate_model(self, model_id: str):
+        """Drops every cached version/tier of a model (local + shared tier)."""
+        model_id = str(model_id)
+        self._drop_local(model_id)
+        if self.use_redis:
+            client = get_redis()
+            if client is None:
+                return
+            try:
+                keys = list(client.scan_iter(match=f"{REDIS_PREFIX}:{model_id}:*", count=100))
+                if keys:
+                    client.delete(*keys)
+            except Exception as e:
+                self._redis_failed(e)
+
+    async def invalidate_model_async(self, model_id: str):
+        """invalidate_model for async handlers, on the async Redis client."""
+        model_id = str(model_id)
+        self._drop_local(model_id)
+        if self.use_redis:
+            client = get_async_redis()
+            if client is None:
+                return
+            try:
+                keys = [key async for key in client.scan_iter(match=f"{REDIS_PREFIX}:{model_id}:*", count=100)]
+                if keys:
+                    await client.delete(*keys)
+            except Exception as e:
+                self._redis_failed(e)
+
+    def _drop_local(self, model_id: str):
+        with self._lock:
+            for key in [k for k in self._local if k[0] == model_id]:
+                del self._local[key]
+            self.stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self._local)
+        lookups = stats["hits_local"] + stats["hits_redis"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits_local"] + stats["hits_redis"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _store_local(self, key: SpecKey, spec: ModelUISpec):
+        with self._lock:
+            self._local[key] = spec
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_size:
+                self._local.popitem(last=False)
+
+    def _redis_call(self, method: str, *args, **kwargs):
+        client = get_redis()
+        if client is None:
+            return None
+        try:
+            return getattr(client, method)(*args, **kwargs)
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+
+    def _redis_failed(self, e: Exception):
+        # The shared tier is an optimization; never fail a request because of it.
+        with self._lock:
+            self.stats["redis_errors"] += 1
+        logger.warning(f"Spec cache Redis tier unavailable: {e}")
+
+
+spec_cache = SpecCache(
+    max_size=settings.CATALOG_SPEC_CACHE_SIZE,
+    use_redis=settings.CATALOG_SPEC_CACHE_REDIS,
+    redis_ttl=settings.CATALOG_SPEC_CACHE_TTL_SECONDS,
+)
+
+register_metrics("catalog_spec_cache", spec_cache.get_stats)
@@ -7,6 +7,18 @@ from app.domain.catalog.schema_converter import SchemaToUIConverter
 from app.domain.catalog.access_control import AccessControlService
 from app.domain.catalog.schema_utils import extract_input_properties
 
+def compute_schema_version_hash(raw_schema: Optional[Dict[str, Any]], ui_config: Optional[Dict[str, Any]]) -> str:
+    """
+    Stable hash of the inputs that determine a compiled UI spec.
+    Stored on AIModel.schema_version_hash and used as the spec cache version.
+    """
+    try:
+        s_str = json.dumps(raw_schema or {}, sort_keys=True, default=str)
+        c_str = json.dumps(ui_config or {}, sort_keys=True, default=str)
+        return hashlib.sha256((s_str + c_str).encode()).hexdigest()
+    except Exception:
+        return "unknown"
+
 class SchemaProcessingPipeline:
     """
     Coordinates the transformation of raw OpenAPI schemas into Access-Controlled UI Specifications.
@@ -90,13 +102,7 @@ class SchemaProcessingPipeline:
 
     def _calculate_hash(self, schema: Dict, config: Dict) -> str:
         """Generates a consistent hash of the inputs."""
-        try:
-            # Sort keys for consistency
-            s_str = json.dumps(schema, sort_keys=True, default=str)
-            c_str = json.dumps(config, sort_keys=True, default=str)
-            return hashlib.sha256((s_str + c_str).encode()).hexdigest()
-        except Exception:
-            return "unknown"
+        return compute_schema_version_hash(schema, config)
 
 
 
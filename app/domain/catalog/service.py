@@ -2,13 +2,48 @@
 from typing import List, Dict, Any, Optional
 from app.domain.catalog.schemas import UIParameter, ModelUISpec, ParameterGroup, UIParameterConfig, PricingRule, ParameterOption
 from app.domain.providers.models import AIModel
-from app.domain.catalog.pipeline import SchemaProcessingPipeline
+from app.domain.catalog.pipeline import SchemaProcessingPipeline, compute_schema_version_hash
+from app.domain.catalog.cache import SpecCache, spec_cache
 
 class CatalogService:
-    def __init__(self):
+    def __init__(self, cache: Optional[SpecCache] = spec_cache):
         self.pipeline = SchemaProcessingPipeline()
+        self.cache = cache
 
     def resolve_ui_spec(self, model: AIModel, user_tier: str = "starter") -> ModelUISpec:
+        """
+        Resolves the UI Spec of a persisted model, served from the spec cache when possible.
+        The returned spec may be shared with other callers: do not mutate it.
+        """
+        if self.cache is None or model.raw_schema_json is None:
+            return self._resolve_model(model, user_tier)
+
+        # Derived from the content every time: a stored hash goes stale on writes outside the admin paths
+        version = compute_schema_version_hash(model.raw_schema_json, model.ui_config)
+        key = (str(model.id), version, user_tier)
+
+        spec = self.cache.get(key)
+        if spec is None:
+            spec = self._resolve_model(model, user_tier)
+            self.cache.set(key, spec)
+        return spec
+
+    def invalidate_model(self, model: AIModel):
+        """
+        Call after changing raw_schema_json/ui_config. Refreshes the model's stored version
+        hash and drops its cached entries (lookups already miss: keys follow the content).
+        """
+        model.schema_version_hash = compute_schema_version_hash(model.raw_schema_json, model.ui_config)
+        if self.cache is not None:
+            self.cache.invalidate_model(str(model.id))
+
+    async def invalidate_model_async(self, model: AIModel):
+        """invalidate_model for async handlers (the Redis tier is never called on the loop's thread)."""
+        model.schema_version_hash = compute_schema_version_hash(model.raw_schema_json, model.ui_config)
+        if self.cache is not None:
+            await self.cache.invalidate_model_async(str(model.id))
+
+    def _resolve_model(self, model: AIModel, user_tier: str) -> ModelUISpec:
         return self.resolve_from_schema(
             model_id=str(model.id),
             raw_schema=model.raw_schema_json,
@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.core.config import settings
+from app.core.redis import get_async_redis
+from app.core.monitoring import register_metrics
+from app.domain.providers.models import AIModel
+from app.domain.catalog.service import CatalogService
+
+logger = logging.getLogger(__name__)
+
+REDIS_GENERATION_KEY = "catalog:snapshot:generation"
+REDIS_SNAPSHOT_PREFIX = "catalog:snapshot"
+
+# Fields dropped from the "lite" listing; fetched lazily via GET /api/models/{id}
+DETAIL_FIELDS = ("inputs", "defaults", "ui_config")
+
+
+def _etag(body: bytes) -> str:
+    # Strong validator: identical bytes <=> identical tag
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _dumps(data: Any) -> bytes:
+    return json.dumps(data, default=str, separators=(",", ":")).encode()
+
+
+@dataclass
+class CatalogSnapshot:
+    """
+    Pre-serialized public catalog. Bodies are immutable bytes served as-is.
+    """
+    generation: int
+    full: bytes
+    lite: bytes
+    models: Dict[str, bytes]
+    built_at: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        self.etags = {"full": _etag(self.full), "lite": _etag(self.lite)}
+        self.model_etags = {mid: _etag(body) for mid, body in self.models.items()}
+
+    def to_redis(self) -> Dict[str, bytes]:
+        data = {"full": self.full, "lite": self.lite}
+        for mid, body in self.models.items():
+            data[f"model:{mid}"] = body
+        return data
+
+    @classmethod
+    def from_redis(cls, generation: int, data: Dict[bytes, bytes]) -> "CatalogSnapshot":
+        models = {}
+        for k, v in data.items():
+            key = k.decode()
+            if key.startswith("model:"):
+                models[key[len("model:"):]] = v
+        return cls(generation=generation, full=data[b"full"], lite=data[b"lite"], models=models)
+
+
+def build_model_entry(model: AIModel, catalog: CatalogService) -> Dict[str, Any]:
+    """
+    Public catalog entry for a model (legacy 'inputs' format for frontend compatibility).
+    """
+    # Resolve full spec (assuming 'starter' tier for public list)
+    spec = catalog.resolve_ui_spec(model, user_tier="starter")
+
+    inputs = []
+    for p in spec.parameters:
+        inputs.append({
+            "name": p.id,
+            "type": p.type,
+            "description": p.description,
+            "default": p.default,
+            "required": p.required,
+            "min": p.min,
+            "max": p.max,
+            "enum": [opt.value for opt in p.options] if p.options else None,
+            "ui_group": p.group_id
+        })
+
+    # Extract defaults map
+    defaults = {p.id: p.default for p in spec.parameters if p.default is not None}
+
+    return {
+        "id": str(model.id),
+        "name": model.display_name,
+        "description": model.description,
+        "provider": model.provider,
+        "cover_image": model.cover_image_url,
+        "inputs": inputs,  # Authoritative inputs from CatalogService
+        "defaults": defaults,
+        "credits": model.credits_per_generation,
+        "capabilities": model.capabilities or [],
+        "ui_config": model.ui_config or {}
+    }
+
+
+class CatalogSnapshotStore:
+    """
+    Holds the materialized catalog for this process.
+    A generation counter in Redis tells every web process when admins changed the catalog;
+    the rebuilt snapshot itself is shared through Redis so only one process pays for the build.
+    Without Redis, the local snapshot is rebuilt after CATALOG_SNAPSHOT_FALLBACK_TTL_SECONDS.
+    """
+
+    def __init__(self, fallback_ttl: int = 30):
+        self.fallback_ttl = fallback_ttl
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._local_generation = 0
+        self._lock = asyncio.Lock()
+        self.stats = {"served": 0, "not_modified": 0, "rebuilds": 0, "redis_loads": 0}
+
+    async def get(self, db: AsyncSession) -> CatalogSnapshot:
+        generation = await self._current_generation()
+        snap = self._snapshot
+
+        if snap is not None and self._is_fresh(snap, generation):
+            return snap
+
+        async with self._lock:
+            snap = self._snapshot
+            if snap is not None and self._is_fresh(snap, generation):
+                return snap
+
+            if generation is not None:
+                snap = await self._load_shared(generation)
+            if snap is None:
+                snap = await self._build(db, generation if generation is not None else self._local_generation)
+                if generation is not None:
+                    await self._store_shared(snap)
+            self._snapshot = snap
+            return snap
+
+    async def rebuild(self, db: AsyncSession) -> CatalogSnapshot:
+        """
+        Called by admin model CRUD after commit. Bumps the generation and publishes the new snapshot.
+        """
+        async with self._lock:
+            generation = await self._bump_generation()
+            snap = await self._build(db, generation)
+            await self._store_shared(snap)
+            self._snapshot = snap
+            return snap
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        snap = self._snapshot
+        stats["generation"] = snap.generation if snap else None
+        stats["models"] = len(snap.models) if snap else 0
+        stats["bytes_full"] = len(snap.full) if snap else 0
+        stats["bytes_lite"] = len(snap.lite) if snap else 0
+        return stats
+
+    def _is_fresh(self, snap: CatalogSnapshot, generation: Optional[int]) -> bool:
+        if generation is None:
+            return snap.generation == self._local_generation and time.time() - snap.built_at < self.fallback_ttl
+        return snap.generation == generation
+
+    async def _build(self, db: AsyncSession, generation: int) -> CatalogSnapshot:
+        res = await db.execute(select(AIModel).where(AIModel.is_active == True))
+        models = res.scalars().all()
+
+        catalog = CatalogService()
+        entries: List[Dict[str, Any]] = []
+        for m in models:
+            try:
+                entries.append(build_model_entry(m, catalog))
+            except Exception as e:
+                # One broken schema must not take down the whole catalog
+                logger.error(f"Skipping model {m.id} in catalog snapshot: {e}")
+
+        lite = [{k: v for k, v in e.items() if k not in DETAIL_FIELDS} for e in entries]
+        self.stats["rebuilds"] += 1
+        return CatalogSnapshot(
+            generation=generation,
+            full=_dumps(entries),
+            lite=_dumps(lite),
+            models={e["id"]: _dumps(e) for e in entries},
+        )
+
+    async def _current_generation(self) -> Optional[int]:
+        client = get_async_redis()
+        if client is None:
+            return None
+        try:
+            value = await client.get(REDIS_GENERATION_KEY)
+            return int(value) if value else 0
+        except Exception as e:
+            logger.warning(f"Catalog snapshot generation unavailable: {e}")
+            return None
+
+    async def _bump_generation(self) -> int:
+        self._local_generation += 1
+        client = get_async_redis()
+        if client is None:
+            return self._local_generation
+        try:
+            return int(await client.incr(REDIS_GENERATION_KEY))
+        except Exception as e:
+            logger.warning(f"Failed to bump catalog snapshot generation: {e}")
+            return self._local_generation
+
+    async def _load_shared(self, generation: int) -> Optional[CatalogSnapshot]:
+        client = get_async_redis()
+        if client is None:
+            return None
+        try:
+            data = await client.hgetall(f"{REDIS_SNAPSHOT_PREFIX}:{generation}")
+            if not data or b"full" not in data:
+                return None
+            self.stats["redis_loads"] += 1
+            return CatalogSnapshot.from_redis(generation, data)
+        except Exception as e:
+            logger.warning(f"Failed to load shared catalog snapshot: {e}")
+            return None
+
+    async def _store_shared(self, snap: CatalogSnapshot):
+        client = get_async_redis()
+        if client is None:
+            return
+        key = f"{REDIS_SNAPSHOT_PREFIX}:{snap.generation}"
+        try:
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.delete(key)
+                pipe.hset(key, mapping=snap.to_redis())
+                # Old generations are only read by lagging processes; let them expire
+                pipe.expire(key, settings.CATALOG_SNAPSHOT_REDIS_TTL_SECONDS)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to store shared catalog snapshot: {e}")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 7232 If-None-Match comparison (weak comparison, as required for GET)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+catalog_snapshot = CatalogSnapshotStore(fallback_ttl=settings.CATALOG_SNAPSHOT_FALLBACK_TTL_SECONDS)
+
+register_metrics("catalog_snapshot", catalog_snapshot.get_stats)
@@ -0,0 +1,57 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.domain.jobs.models import Job
+from app.domain.billing.service import fail_and_release
+from app.domain.jobs.events import publish_job_event
+from app.domain.jobs.ingest import ingest_enabled, enqueue_ingest
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def complete_job(db: AsyncSession, job: Job, normalized: dict) -> bool:
+    """
+    Applies a terminal provider result (normalized prediction) to a job and commits.
+    Shared by the provider webhook and the reconciler (lost webhooks).
+    Returns False if the job was already terminal.
+    Only records the result; downloading/uploading the output runs on the ingest queue.
+    """
+    # Idempotency Check
+    if job.status in ["succeeded", "failed"]:
+        logger.info(f"Job {job.id} already {job.status}. Ignoring update.")
+        return False
+
+    status_ = normalized.get("status")
+    result_url = normalized.get("result_url")
+    error = normalized.get("error_message")
+
+    # Update Job
+    if status_ == "succeeded":
+        job.status = "succeeded"
+        job.progress = 100
+        if normalized.get("logs"):
+             job.logs = normalized["logs"]
+        
+        if result_url:
+            # Served from the provider until the ingest task has copied it to S3
+            job.result_url = result_url
+            if ingest_enabled():
+                job.ingest_status = "pending"
+            else:
+                logger.warning("AWS S3 credentials missing. Using remote URL.")
+        
+        await db.commit()
+        await publish_job_event(job)
+        if job.ingest_status == "pending":
+            enqueue_ingest(job.id, result_url)
+    
+    elif status_ in ["failed", "canceled"]:
+        # REFUND (user or guest), committed with the status change; a concurrent
+        # completion that got there first wins and nothing is refunded here
+        if not await fail_and_release(db, job, error or "Unknown error", reason=f"refund:{status_}"):
+            await db.rollback()
+            return False
+        logger.info(f"Failed job {job.id}, released {job.cost_credits} credits")
+        await db.commit()
+        await publish_job_event(job)
+
+    return True
+
@@ -0,0 +1,295 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+from app.core.config import settings
+from app.core.redis import get_redis, get_async_redis
+from app.core.monitoring import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub channel (live fan-out) and capped stream (resume via Last-Event-ID), per owner
+CHANNEL_PREFIX = "jobs:events"
+REPLAY_PREFIX = "jobs:events:log"
+
+EVENT_FIELDS = ("status", "progress", "result_url", "error_message", "width", "height")
+
+
+def owner_key(user_id=None, guest_id=None) -> Optional[str]:
+    if user_id:
+        return f"user:{user_id}"
+    if guest_id:
+        return f"guest:{guest_id}"
+    return None
+
+
+def job_event(job, **overrides) -> Dict[str, Any]:
+    """Event payload for a job's current state (log tail only, to bound event size)."""
+    event = {"job_id": str(job.id)}
+    for field in EVENT_FIELDS:
+        event[field] = getattr(job, field, None)
+    event["logs"] = _tail(getattr(job, "logs", None))
+    event.update(overrides)
+    return event
+
+
+def log_event(job_id: str, logs: Optional[str]) -> Dict[str, Any]:
+    """Partial event for a running job's logs; clients merge only the fields present."""
+    return {"job_id": str(job_id), "status": "running", "logs": _tail(logs)}
+
+
+def _tail(logs: Optional[str]) -> Optional[str]:
+    limit = settings.JOB_EVENTS_MAX_LOG_CHARS
+    if logs and len(logs) > limit:
+        return logs[-limit:]
+    return logs
+
+
+def _owner_of(job) -> Optional[str]:
+    return owner_key(getattr(job, "user_id", None), getattr(job, "guest_id", None))
+
+
+# --- Publishing (workers, webhooks, API) ---
+
+def publish_job_event_sync(job, **overrides):
+    """Publishes a job change from sync code (Celery runner). Never raises."""
+    owner = _owner_of(job)
+    client = get_redis()
+    if owner is None or client is None:
+        return
+    try:
+        event = job_event(job, **overrides)
+        data = json.dumps(event, default=str)
+        event_id = client.xadd(f"{REPLAY_PREFIX}:{owner}", {"data": data},
+                               maxlen=settings.JOB_EVENTS_REPLAY_SIZE, approximate=True)
+        pipe = client.pipeline(transaction=False)
+        pipe.expire(f"{REPLAY_PREFIX}:{owner}", settings.JOB_EVENTS_REPLAY_TTL_SECONDS)
+        pipe.publish(f"{CHANNEL_PREFIX}:{owner}", _envelope(event_id, data))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to publish job event: {e}")
+
+
+async def publish_job_event(job, **overrides):
+    """Async counterpart of publish_job_event_sync. Never raises."""
+    owner = _owner_of(job)
+    if owner is None:
+        return
+    await publish_events([(owner, job_event(job, **overrides))])
+
+
+async def publish_events(events: List[tuple]):
+    """Publishes (owner, event) pairs; used directly for bulk updates (reconciler)."""
+    client = get_async_redis()
+    if client is None or not events:
+        return
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            for owner, event in events:
+                pipe.xadd(f"{REPLAY_PREFIX}:{owner}", {"data": json.dumps(event, default=str)},
+                          maxlen=settings.JOB_EVENTS_REPLAY_SIZE, approximate=True)
+            ids = await pipe.execute()
+        async with client.pipeline(transaction=False) as pipe:
+            for (owner, event), event_id in zip(events, ids):
+                pipe.expire(f"{REPLAY_PREFIX}:{owner}", settings.JOB_EVENTS_REPLAY_TTL_SECONDS)
+                pipe.publish(f"{CHANNEL_PREFIX}:{owner}", _envelope(event_id, json.dumps(event, default=str)))
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to publish job events: {e}")
+
+
+def _envelope(event_id, data: str) -> str:
+    if isinstance(event_id, bytes):
+        event_id = event_id.decode()
+    return json.dumps({"id": event_id, "data": data})
+
+
+# --- Subscribing (SSE connections) ---
+
+class JobEventConnection:
+    """
+    One SSE client. Pending events are coalesced per job (latest state wins), so memory is
+    bounded by JOB_EVENTS_MAX_PENDING jobs, not by event rate. Exceeding it marks the
+    connection as overflowed; the client is told to reset and refetch.
+    """
+
+    def __init__(self, owner: str, max_pending: int):
+        self.owner = owner
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[str, tuple]" = OrderedDict()
+        self.overflowed = False
+        self._wakeup = asyncio.Event()
+
+    def push(self, event_id: str, data: str, job_id: str):
+        if self.overflowed:
+            return
+        self.pending.pop(job_id, None)
+        self.pending[job_id] = (event_id, data)
+        if len(self.pending) > self.max_pending:
+            self.pending.clear()
+            self.overflowed = True
+        self._wakeup.set()
+
+    async def wait(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def drain(self) -> List[tuple]:
+        items = list(self.pending.values())
+        self.pending.clear()
+        self._wakeup.clear()
+        return items
+
+
+class JobEventHub:
+    """
+    Per web process fan-out: one Redis pub/sub connection, subscribed only to channels of
+    owners that currently have an open stream.
+    """
+
+    def __init__(self):
+        self._connections: Dict[str, Set[JobEventConnection]] = {}
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.stats = {"connections": 0, "opened": 0, "delivered": 0, "replayed": 0, "overflows": 0}
+
+    async def connect(self, owner: str) -> JobEventConnection:
+        conn = JobEventConnection(owner, settings.JOB_EVENTS_MAX_PENDING)
+        async with self._lock:
+            await self._ensure_reader()
+            conns = self._connections.setdefault(owner, set())
+            if not conns:
+                await self._pubsub.subscribe(f"{CHANNEL_PREFIX}:{owner}")
+            conns.add(conn)
+        self.stats["connections"] += 1
+        self.stats["opened"] += 1
+        return conn
+
+    async def disconnect(self, conn: JobEventConnection):
+        async with self._lock:
+            conns = self._connections.get(conn.owner)
+            if conns is None:
+                return
+            conns.discard(conn)
+            self.stats["connections"] -= 1
+            if conn.overflowed:
+                self.stats["overflows"] += 1
+            if not conns:
+                del self._connections[conn.owner]
+                try:
+                    await self._pubsub.unsubscribe(f"{CHANNEL_PREFIX}:{conn.owner}")
+                except Exception as e:
+                    logger.warning(f"Job events unsubscribe failed: {e}")
+
+    async def replay(self, owner: str, last_event_id: str) -> Optional[List[tuple]]:
+        """Events after last_event_id, or None if they were trimmed (client must reset)."""
+        client = get_async_redis()
+        key = f"{REPLAY_PREFIX}:{owner}"
+        try:
+            first = await client.xrange(key, count=1)
+            if first and _stream_id_lt(last_event_id, first[0][0].decode()):
+                return None
+            entries = await client.xrange(key, min=f"({last_event_id}", count=settings.JOB_EVENTS_REPLAY_SIZE)
+        except Exception as e:
+            logger.warning(f"Job events replay failed: {e}")
+            return None
+        self.stats["replayed"] += len(entries)
+        return [(eid.decode(), fields[b"data"].decode()) for eid, fields in entries]
+
+    async def _ensure_reader(self):
+        if self._reader is not None and not self._reader.done():
+            return
+        client = get_async_redis()
+        if client is None:
+            raise RuntimeError("Redis is not configured")
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        # Resubscribe owners that were connected before a reader failure
+        for owner in self._connections:
+            await self._pubsub.subscribe(f"{CHANNEL_PREFIX}:{owner}")
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            while True:
+                if not self._pubsub.subscribed:
+                    await asyncio.sleep(0.5)
+                    continue
+                message = await self._pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                owner = message["channel"].decode()[len(CHANNEL_PREFIX) + 1:]
+                envelope = json.loads(message["data"])
+                job_id = json.loads(envelope["data"]).get("job_id")
+                for conn in list(self._connections.get(owner, ())):
+                    conn.push(envelope["id"], envelope["data"], job_id)
+                    self.stats["delivered"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Streams resume through Last-Event-ID once clients reconnect
+            logger.error(f"Job events reader stopped: {e}")
+            for conns in self._connections.values():
+                for conn in conns:
+                    conn.overflowed = True
+                    conn._wakeup.set()
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+            self._pubsub = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["owners"] = len(self._connections)
+        return stats
+
+
+def _stream_id_lt(a: str, b: str) -> bool:
+    try:
+        ams, aseq = (int(x) for x in a.split("-", 1))
+        bms, bseq = (int(x) for x in b.split("-", 1))
+    except ValueError:
+        return True
+    return (ams, aseq) < (bms, bseq)
+
+
+async def sse_stream(hub: JobEventHub, conn: JobEventConnection, request, backlog: Optional[List[tuple]]) -> AsyncIterator[str]:
+    """Formats events for text/event-stream; emits a comment heartbeat when idle."""
+    try:
+        yield f"retry: {settings.JOB_EVENTS_RETRY_MS}\n\n"
+        if backlog is None:
+            yield "event: reset\ndata: {}\n\n"
+        else:
+            for event_id, data in backlog:
+                yield f"id: {event_id}\nevent: job\ndata: {data}\n\n"
+
+        while True:
+            got = await conn.wait(settings.JOB_EVENTS_HEARTBEAT_SECONDS)
+            if await request.is_disconnected():
+                break
+            if not got:
+                yield ": ping\n\n"
+                continue
+            if conn.overflowed:
+                yield "event: reset\ndata: {}\n\n"
+                break
+            for event_id, data in conn.drain():
+                yield f"id: {event_id}\nevent: job\ndata: {data}\n\n"
+    finally:
+        await hub.disconnect(conn)
+
+
+job_event_hub = JobEventHub()
+
+register_metrics("job_events", job_event_hub.get_stats)
@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+from sqlalchemy import select
+from app.tasks.worker import celery_app
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal, engine
+from app.core.http import http_clients
+from app.core.redis import close_loop_redis
+from app.core.monitoring import register_metrics
+from app.domain.jobs.models import Job
+from app.domain.billing.service import fail_and_release
+from app.domain.providers.models import AIModel
+from app.domain.providers.cache import provider_services
+from app.domain.providers.rate_limit import rate_limiter, Admission
+from app.domain.jobs.events import publish_job_event
+from app.domain.jobs.retry_policy import retry_policy
+from app.domain.jobs.runner import (
+    _job_inputs,
+    _model_uuid,
+    _resolve_target,
+    _build_payload,
+    _webhook_url,
+    _awaiting_submission,
+    _skip_redelivery,
+    _submitted_statement,
+    _mark_submitted,
+    _discard_duplicate,
+    _refund_reason,
+    _skip_finished,
+    _throttle_state,
+    _reschedule_throttled,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class JobOutcome:
+    result: str
+    retry_exc: Optional[Exception] = None
+    countdown: float = 0.0
+    throttled: Optional[Admission] = None  # Rate limited: reschedule, do not retry
+
+
+class AsyncJobExecutor:
+    """
+    Runs job submissions as coroutines on one background event loop per process.
+    Celery threads (``--pool=threads``) hand jobs over and wait for the outcome, so a single
+    process keeps many submissions in flight over the shared async DB engine and pooled
+    HTTP client. At most ``max_in_flight`` run at once; the rest wait on the semaphore.
+    """
+
+    def __init__(self, max_in_flight: int = 50):
+        self.max_in_flight = max_in_flight
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {"submitted": 0, "failed": 0, "retried": 0, "throttled": 0, "in_flight": 0, "peak_in_flight": 0}
+
+    # --- Entry Points ---
+
+    def run(self, job_id: str, retries: int = 0, max_retries: int = 3,
+            throttled_since: Optional[float] = None, holds_slot: bool = False) -> JobOutcome:
+        """Blocking entry point for Celery task threads."""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(
+            self.execute(job_id, retries, max_retries, throttled_since, holds_slot), loop
+        )
+        return future.result()
+
+    async def execute(self, job_id: str, retries: int = 0, max_retries: int = 3,
+                      throttled_since: Optional[float] = None, holds_slot: bool = False) -> JobOutcome:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        async with self._semaphore:
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+            try:
+                outcome = await self._process(job_id, retries, max_retries, throttled_since, holds_slot)
+            finally:
+                self.stats["in_flight"] -= 1
+        if outcome.retry_exc is not None:
+            self.stats["retried"] += 1
+        elif outcome.throttled is not None:
+            self.stats["throttled"] += 1
+        elif outcome.result.startswith("Submitted"):
+            self.stats["submitted"] += 1
+        elif outcome.result == "Job Failed":
+            self.stats["failed"] += 1
+        return outcome
+
+    # --- Job Processing (mirrors runner.process_job) ---
+
+    async def _process(self, job_id: str, retries: int, max_retries: int,
+                       throttled_since: Optional[float], holds_slot: bool) -> JobOutcome:
+        async with AsyncSessionLocal() as session:
+            job = None
+            provider_id = None
+            try:
+                # 1. Fetch Job
+                job = (await session.execute(select(Job).where(Job.id == job_id))).scalar_one_or_none()
+                if not job:
+                    logger.error(f"Job {job_id} NOT FOUND in DB!")
+                    return JobOutcome("Job not found")
+                if not _awaiting_submission(job):
+                    # Redelivered (acks_late) after a submission or failure was already recorded
+                    return JobOutcome(_skip_redelivery(job))
+
+                # 2. Load Active Provider Configs (cached per process)
+                try:
+                    providers = await provider_services.load_async(session)
+                except Exception as e:
+                    logger.error(f"Failed to load provider configs: {e}")
+                    return JobOutcome(await _fail_job_async(session, job, f"Provider Config Error: {e}"))
+
+                # 3. Read User Input
+                model_identifier, raw_params, prompt_text = _job_inputs(job)
+
+                # 4. Resolve Model & Provider
+                ai_model = None
+                model_uuid = _model_uuid(model_identifier)
+                if model_uuid:
+                    ai_model = (await session.execute(select(AIModel).where(AIModel.id == model_uuid))).scalar_one_or_none()
+                provider_id, model_ref = _resolve_target(model_identifier, ai_model, raw_params)
+
+                # 5. Get Service
+                try:
+                    service = providers.get_service(provider_id)
+                except Exception as e:
+                    logger.error(f"Provider not available: {e}")
+                    return JobOutcome(await _fail_job_async(session, job, f"Provider Error: {e}"))
+
+                # 6. Normalize Payload
+                payload = _build_payload(service, ai_model, raw_params, prompt_text)
+
+                # 7. Rate Limit (throttled jobs are rescheduled, not retried)
+                if not holds_slot:
+                    admission = await rate_limiter.acquire_async(providers.rate_limit(provider_id))
+                    if admission.wait:
+                        await session.rollback()
+                        return JobOutcome("Throttled", throttled=admission)
+
+                # Give the DB connection back to the pool while we wait on the provider
+                await session.commit()
+
+                # 8. Execute
+                try:
+                    logger.info(f"Submitting job {job_id} to {provider_id} Ref: {model_ref}")
+                    await retry_policy.record_attempt_async(provider_id)
+                    provider_job_id = await _submit(service, model_ref, payload, _webhook_url(provider_id))
+
+                    claimed = await session.execute(_submitted_statement(job.id, provider_id, provider_job_id))
+                    if claimed.first() is None:
+                        await session.rollback()
+                        return JobOutcome(_discard_duplicate(job, provider_job_id))
+                    _mark_submitted(job, provider_id, provider_job_id)
+                    await session.commit()
+                    await publish_job_event(job)
+                    if throttled_since:
+                        await rate_limiter.record_wait_async(provider_id, throttled_since)
+                    return JobOutcome(f"Submitted: {provider_job_id}")
+
+                except Exception as e:
+                    logger.error(f"Submission Exception for job {job_id}: {e}")
+
+                    decision = await retry_policy.decide_async(e, provider_id, retries, max_retries)
+                    if not decision.retry:
+                        return JobOutcome(await _fail_job_async(session, job, decision.error))
+                    return JobOutcome("Retrying", retry_exc=e, countdown=decision.countdown)
+
+            except Exception as e:
+                logger.exception(f"Executor Crash for job {job_id}")
+                await session.rollback()
+                # Either retry (job untouched, credits still held) or fail and refund - never both
+                decision = await retry_policy.decide_async(e, provider_id, retries, max_retries)
+                if decision.retry or job is None:
+                    return JobOutcome("Retrying", retry_exc=e, countdown=decision.countdown)
+                await session.refresh(job)
+                return JobOutcome(await _fail_job_async(session, job, f"Worker Crash: {e}"))
+
+    # --- Lifecycle ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._pid != os.getpid():
+            # Forked child: the parent's loop thread does not exist here
+            self._reset()
+        loop = self._loop
+        if loop is None:
+            with self._lock:
+                loop = self._loop
+                if loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(target=loop.run_forever, name="job-executor", daemon=True)
+                    self._thread.start()
+                    self._loop = loop
+        return loop
+
+    def shutdown(self, timeout: float = 10.0):
+        """Closes the loop's HTTP and Redis clients and DB connections, then stops the loop thread."""
+        loop, thread = self._loop, self._thread
+        if loop is None or self._pid != os.getpid():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._aclose(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Job executor shutdown incomplete: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
+        self._loop = None
+        self._thread = None
+
+    @staticmethod
+    async def _aclose():
+        await http_clients.aclose()
+        await close_loop_redis()
+        await engine.dispose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["max_in_flight"] = self.max_in_flight
+        stats["running"] = self._loop is not None
+        return stats
+
+
+async def _submit(service, model_ref: str, payload: Dict[str, Any], webhook_url: Optional[str]) -> str:
+    submit = getattr(service, "submit_prediction_async", None)
+    if submit is not None:
+        return await submit(model_ref=model_ref, input_data=payload, webhook_url=webhook_url)
+    # Providers without an async client still run off the loop
+    return await asyncio.to_thread(
+        service.submit_prediction, model_ref=model_ref, input_data=payload, webhook_url=webhook_url
+    )
+
+
+async def _fail_job_async(session, job, error_msg):
+    logger.error(f"Failing job {job.id}: {error_msg}")
+    try:
+        if not await fail_and_release(session, job, error_msg, _refund_reason(job)):
+            await session.rollback()
+            return _skip_finished(job)
+        await session.commit()
+        await publish_job_event(job)
+    except Exception as e:
+        logger.error(f"Failed to fail job safely: {e}")
+    return "Job Failed"
+
+
+job_executor = AsyncJobExecutor(max_in_flight=settings.JOB_EXECUTOR_MAX_IN_FLIGHT)
+
+register_metrics("job_executor", job_executor.get_stats)
+
+
+@celery_app.task(bind=True, max_retries=3)
+def process_job_async(self, job_id: str):
+    """
+    Same contract as process_job, executed on the async executor.
+    Run on thread-pool workers: celery -A app.tasks.worker worker -Q jobs.user.image.async --pool=threads
+    (one per executor_queue(); jobs_async when routing is disabled)
+    """
+    throttled_since, holds_slot = _throttle_state(self.request)
+    outcome = job_executor.run(job_id, self.request.retries, self.max_retries, throttled_since, holds_slot)
+    if outcome.throttled is not None:
+        return _reschedule_throttled(self, job_id, outcome.throttled, throttled_since)
+    if outcome.retry_exc is not None:
+        raise self.retry(exc=outcome.retry_exc, countdown=outcome.countdown)
+    return outcome.result
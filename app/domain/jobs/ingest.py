@@ -0,0 +1,197 @@
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlalchemy import select, update
+from app.core.config import settings
+from app.core.http import get_sync_client, request_timeout
+from app.core.media_pool import media_pool
+from app.core.storage import storage
+from app.domain.jobs.models import Job
+from app.domain.jobs.events import publish_job_event_sync
+from app.domain.jobs.renditions import FORMATS, Rendition, process_image
+from app.domain.jobs.transfer import file_to_s3, stream_to_s3
+from app.domain.jobs.video import prepare_playback, probe, process_video, publish_hls
+from app.domain.providers.normalization.image_transform import image_engine
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestResult:
+    url: str
+    content_type: str
+    size: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+    kind: Optional[str] = None
+    sha256: Optional[str] = None
+    original_size: Optional[int] = None  # Provider bytes, when the stored body differs
+    renditions: List[Rendition] = field(default_factory=list)
+    duration: Optional[float] = None
+    cover_url: Optional[str] = None
+    preview_url: Optional[str] = None
+    hls: Optional[dict] = None
+
+
+def ingest_enabled() -> bool:
+    return storage.enabled
+
+
+def enqueue_ingest(job_id: str, source_url: str):
+    """Called by webhook handlers after the job's result has been committed. Never raises."""
+    from app.tasks.ingest_tasks import ingest_job_output
+    try:
+        ingest_job_output.apply_async(args=[job_id, source_url], queue=settings.INGEST_QUEUE)
+    except Exception as e:
+        # The job stays usable with the provider URL
+        logger.error(f"Failed to enqueue ingest for job {job_id}: {e}")
+
+
+def run_ingest(session, job_id: str, source_url: str) -> str:
+    """
+    Copies a job's provider output to S3 and points result_url at it.
+    The job row is not locked while downloading; the final UPDATE only applies if the
+    job is still pending ingest and not deleted, so duplicate deliveries are harmless.
+    If the job was deleted meanwhile, the objects just uploaded are archived.
+    """
+    job = session.execute(select(Job).where(Job.id == job_id)).scalar_one_or_none()
+    if job is None or job.ingest_status != "pending" or job.status == "deleted":
+        return "skipped"
+    kind = job.kind
+    session.commit()  # Release the connection during transfer
+
+    started = time.monotonic()
+    result = ingest_output(job_id, kind, source_url)
+    elapsed = round(time.monotonic() - started, 3)
+
+    values = {
+        "result_url": result.url,
+        "ingest_status": "done",
+        "ingested_at": datetime.now(timezone.utc),
+        "ingest_seconds": elapsed,
+    }
+    if result.width and result.height:
+        values.update(width=result.width, height=result.height)
+    if result.kind:
+        values["kind"] = result.kind
+    if result.renditions or result.hls:
+        values["renditions"] = [r.to_dict() for r in result.renditions] + ([result.hls] if result.hls else [])
+    if result.duration:
+        values["duration"] = max(1, round(result.duration))
+    if result.cover_url:
+        values["cover_image_url"] = result.cover_url
+    if result.preview_url:
+        values["preview_url"] = result.preview_url
+    res = session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.ingest_status == "pending", Job.status != "deleted")
+        .values(**values)
+    )
+    session.commit()
+    if not res.rowcount:
+        job = session.get(Job, job_id, populate_existing=True)
+        if job is None or job.status == "deleted":
+            # Deleted (or cascade-deleted with its user) mid-ingest: nothing references these
+            _archive_orphans(job_id, values)
+            return "cancelled"
+        return "skipped"  # Another delivery finished first; it wrote the same keys
+
+    job = session.get(Job, job_id, populate_existing=True)
+    publish_job_event_sync(job)
+    saved = f", {result.original_size - result.size} saved" if result.original_size else ""
+    logger.info(f"Ingested output of job {job_id} in {elapsed}s ({result.size} bytes{saved}"
+                f"{', sha256 ' + result.sha256 if result.sha256 else ''}): {result.url}")
+    return "ingested"
+
+
+def _archive_orphans(job_id: str, values: dict):
+    orphan = Job(result_url=values["result_url"], renditions=values.get("renditions"),
+                 cover_image_url=values.get("cover_image_url"), preview_url=values.get("preview_url"))
+    keys = [key for key in map(storage.key_from_url, orphan.output_urls()) if key]
+    logger.warning(f"Job {job_id} was deleted during ingest, archiving {len(keys)} uploaded objects")
+    for key in keys:
+        storage.archive(key)
+
+
+def mark_ingest_failed(session, job_id: str, error: str):
+    """Gives up on ingest; the job keeps serving the provider URL."""
+    logger.error(f"Ingest failed for job {job_id}: {error}")
+    session.execute(
+        update(Job).where(Job.id == job_id, Job.ingest_status == "pending").values(ingest_status="failed")
+    )
+    session.commit()
+
+
+def ingest_output(job_id: str, kind: str, source_url: str) -> IngestResult:
+    """Download, transform and upload one output. Raises on download/upload errors."""
+    client = get_sync_client()
+    timeout = request_timeout(settings.INGEST_DOWNLOAD_TIMEOUT_SECONDS)
+
+    if _is_video(kind, source_url):
+        return _ingest_video(job_id, source_url, client, timeout)
+
+    resp = client.get(source_url, follow_redirects=True, timeout=timeout)
+    resp.raise_for_status()
+    # Codecs run in the media pool; a full queue or timeout raises and the task retries
+    prepared, renditions = media_pool.call(process_image, job_id, resp.content, resp.headers.get("content-type"))
+    if prepared.width is not None:
+        image_engine.record(prepared)
+
+    key = f"generations/{job_id}.{prepared.ext}"
+    uploads = [storage.submit(storage.put_bytes, key, prepared.body, prepared.content_type)]
+    uploads += [storage.submit(storage.put_bytes, r.key, data, _content_type(r.format)) for r, data in renditions]
+    urls = [f.result() for f in uploads]  # Raises on the first failed upload (the task retries)
+    for (rendition, _), url in zip(renditions, urls[1:]):
+        rendition.url = url
+    return IngestResult(url=urls[0], content_type=prepared.content_type, size=len(prepared.body),
+                        width=prepared.width, height=prepared.height, original_size=prepared.original_size,
+                        renditions=[r for r, _ in renditions])
+
+
+def _ingest_video(job_id: str, source_url: str, client, timeout) -> IngestResult:
+    """
+    Videos never sit in memory as a whole: the download streams to a temp file (and,
+    without fast-start remux, straight into the multipart upload as well). The video
+    stage then works on the local copy. The temp directory goes away on exit.
+    """
+    key = f"generations/{job_id}.mp4"
+    s3 = storage.client()
+    with tempfile.TemporaryDirectory(prefix=f"ingest-{job_id}-") as workdir:
+        local_path = os.path.join(workdir, "source.mp4")
+        transfer = None
+        with client.stream("GET", source_url, follow_redirects=True, timeout=timeout) as resp, \
+                open(local_path, "wb") as local:
+            resp.raise_for_status()
+            if settings.VIDEO_FASTSTART_ENABLED:
+                # The index may trail the media data; remuxing needs the whole file first
+                for chunk in resp.iter_bytes(chunk_size=1024 * 1024):
+                    local.write(chunk)
+            else:
+                transfer = stream_to_s3(s3, resp, storage.bucket, key, "video/mp4", tee=local)
+
+        info = probe(local_path) if settings.VIDEO_INGEST_ENABLED or settings.VIDEO_HLS_ENABLED else None
+        if transfer is None:
+            playback = prepare_playback(job_id, local_path, workdir, info)
+            transfer = file_to_s3(s3, playback.path, storage.bucket, key, "video/mp4")
+            hls = playback.hls
+        else:
+            # Already uploaded as is; HLS segments come from the teed local copy
+            hls = publish_hls(job_id, local_path, workdir, info)
+        assets = process_video(job_id, local_path, workdir, info)
+    return IngestResult(url=storage.public_url(key), content_type="video/mp4", size=transfer.size,
+                        kind="video", sha256=transfer.sha256, width=assets.width, height=assets.height,
+                        duration=assets.duration, cover_url=assets.poster_url,
+                        preview_url=assets.preview_url, hls=hls)
+
+
+def _is_video(kind: str, source_url: str) -> bool:
+    return kind == "video" or ".mp4" in source_url
+
+
+def _content_type(fmt: str) -> str:
+    return FORMATS[fmt][2]
+
@@ -2,7 +2,8 @@
 import uuid
 import datetime
 from typing import TYPE_CHECKING
-from sqlalchemy import String, Integer, DateTime, ForeignKey, Text, JSON, Boolean
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Text, JSON, Boolean, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from app.core.db import Base
@@ -12,6 +13,9 @@ if TYPE_CHECKING:
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_generation_params", "generation_params", postgresql_using="gin"),
+    )
 
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     
@@ -23,9 +27,12 @@ class Job(Base):
     expires_at: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     kind: Mapped[str] = mapped_column(String, nullable=False)  # "image" | "video"
+    # Plain user prompt. Legacy rows (generation_params IS NULL) hold "[model] {json} | prompt"
+    # until the backfill migration converts them.
     prompt: Mapped[str] = mapped_column(Text, nullable=False)
     provider: Mapped[str] = mapped_column(String, default="mock")
-    model_id: Mapped[uuid.UUID | None] = mapped_column(ForeignKey("ai_models.id"), nullable=True)
+    model_id: Mapped[uuid.UUID | None] = mapped_column(ForeignKey("ai_models.id"), nullable=True, index=True)
+    model_ref: Mapped[str | None] = mapped_column(String, nullable=True) # Legacy non-UUID model identifier (e.g. "flux-pro")
     provider_job_id: Mapped[str | None] = mapped_column(String, index=True, nullable=True)
     
     # Input Metadata
@@ -41,8 +48,10 @@ class Job(Base):
     height: Mapped[int | None] = mapped_column(Integer, nullable=True)
     duration: Mapped[int | None] = mapped_column(Integer, nullable=True)
     cover_image_url: Mapped[str | None] = mapped_column(String, nullable=True)
+    preview_url: Mapped[str | None] = mapped_column(String, nullable=True) # Short silent loop (videos)
     
-    generation_params: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # User-supplied model params (without prompt). JSONB + GIN index on Postgres for filtering.
+    generation_params: Mapped[dict | None] = mapped_column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
     
     status: Mapped[str] = mapped_column(String, default="queued", index=True) # "queued", "running", "succeeded", "failed"
     cost_credits: Mapped[int] = mapped_column(Integer, default=0)
@@ -59,6 +68,11 @@ class Job(Base):
     views: Mapped[int] = mapped_column(Integer, default=0)
     
     result_url: Mapped[str | None] = mapped_column(String, nullable=True)
+    renditions: Mapped[list | None] = mapped_column(JSON().with_variant(JSONB(), "postgresql"), nullable=True) # [{width, height, format, key, size, url}]
+    # Output ingest: result_url points at the provider until the ingest task has copied it to S3
+    ingest_status: Mapped[str | None] = mapped_column(String, nullable=True) # "pending" | "done" | "failed" | "cancelled"
+    ingested_at: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    ingest_seconds: Mapped[float | None] = mapped_column(nullable=True) # Download + transform + upload
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
     logs: Mapped[str | None] = mapped_column(Text, nullable=True)
     
@@ -80,5 +94,17 @@ class Job(Base):
             return self.model.display_name
         return None
 
+    def output_urls(self) -> list[str]:
+        """Every stored object of this job's output (result, renditions, HLS, poster, preview), for archiving."""
+        urls = [url for url in (self.result_url, self.cover_image_url, self.preview_url) if url]
+        for r in self.renditions or ():
+            if r.get("url"):
+                urls.append(r["url"])
+            if r.get("segments"):
+                # HLS: segments sit next to the playlist as seg_00000.ts, seg_00001.ts, ...
+                base = r["url"].rsplit("/", 1)[0]
+                urls.extend(f"{base}/seg_{i:05d}.ts" for i in range(r["segments"]))
+        return urls
+
     user: Mapped["User"] = relationship("app.domain.users.models.User", back_populates="jobs")
     model: Mapped["AIModel"] = relationship("app.domain.providers.models.AIModel")
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import select, update, bindparam
+from app.core.config import settings
+from app.core.monitoring import register_metrics
+from app.domain.jobs.models import Job
+from app.domain.jobs.completion import complete_job
+from app.domain.jobs.events import publish_events, log_event, owner_key
+from app.domain.providers.cache import provider_services
+
+logger = logging.getLogger(__name__)
+
+# Bulk progress write: one executemany statement per run
+_progress_stmt = (
+    update(Job.__table__)
+    .where(Job.__table__.c.id == bindparam("job_id"))
+    .where(Job.__table__.c.status == "running")
+    .values(logs=bindparam("logs"))
+)
+
+
+class JobReconciler:
+    """
+    Pulls provider status for all running jobs in one pass instead of per status request.
+    - Polls with bounded concurrency, writes logs of in-progress jobs with one bulk UPDATE.
+    - Finalizes jobs whose webhook is overdue (terminal at the provider for longer than
+      the grace period) through the same completion path as the webhook.
+    """
+
+    def __init__(self, batch_size: int = 500, concurrency: int = 10, min_age: int = 10, webhook_grace: int = 60):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.min_age = min_age
+        self.webhook_grace = webhook_grace
+        self.stats = {"runs": 0, "polled": 0, "updated": 0, "finalized": 0, "errors": 0, "last_run_ms": 0}
+
+    async def run_once(self, session_factory) -> Dict[str, int]:
+        started = time.monotonic()
+        summary = {"polled": 0, "updated": 0, "finalized": 0, "errors": 0}
+
+        # 1. Snapshot of running jobs (connection released before polling)
+        async with session_factory() as db:
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.min_age)
+            rows = (await db.execute(
+                select(Job.id, Job.provider, Job.provider_job_id, Job.user_id, Job.guest_id)
+                .where(Job.status == "running")
+                .where(Job.provider_job_id.is_not(None))
+                .where(Job.created_at <= cutoff)
+                .order_by(Job.updated_at)
+                .limit(self.batch_size)
+            )).all()
+            if rows:
+                providers = await provider_services.load_async(db)
+            await db.commit()
+
+        if rows:
+            # 2. Poll provider
+            semaphore = asyncio.Semaphore(self.concurrency)
+            results = await asyncio.gather(*[self._poll(providers, row, semaphore) for row in rows])
+            summary["polled"] = len(rows)
+
+            progress: List[Dict[str, Any]] = []
+            overdue: List[Tuple[str, dict]] = []
+            for job_id, normalized in results:
+                if normalized is None:
+                    summary["errors"] += 1
+                elif normalized.get("status") in ("succeeded", "failed"):
+                    if self._webhook_overdue(normalized):
+                        overdue.append((job_id, normalized))
+                else:
+                    progress.append({"job_id": job_id, "logs": normalized.get("logs")})
+
+            # 3. Bulk write progress
+            if progress:
+                async with session_factory() as db:
+                    await db.execute(_progress_stmt, progress)
+                    await db.commit()
+                summary["updated"] = len(progress)
+                owners = {row.id: owner_key(row.user_id, row.guest_id) for row in rows}
+                await publish_events([
+                    (owners[p["job_id"]], log_event(p["job_id"], p["logs"]))
+                    for p in progress if owners.get(p["job_id"])
+                ])
+
+            # 4. Finalize lost webhooks
+            if overdue:
+                done = await asyncio.gather(*[
+                    self._finalize(session_factory, job_id, normalized, semaphore) for job_id, normalized in overdue
+                ])
+                summary["finalized"] = sum(1 for ok in done if ok)
+
+        self.stats["runs"] += 1
+        for k, v in summary.items():
+            self.stats[k] += v
+        self.stats["last_run_ms"] = int((time.monotonic() - started) * 1000)
+        if summary["polled"]:
+            logger.info(f"Reconciled running jobs: {summary}")
+        return summary
+
+    async def _poll(self, providers, row, semaphore) -> Tuple[str, Optional[dict]]:
+        async with semaphore:
+            try:
+                service = providers.get_service(row.provider)
+                pred = await service.get_prediction(row.provider_job_id)
+                if not pred:
+                    return row.id, None
+                return row.id, service.response_normalizer.normalize_job_response(pred)
+            except Exception as e:
+                logger.warning(f"Reconcile poll failed for job {row.id}: {e}")
+                return row.id, None
+
+    async def _finalize(self, session_factory, job_id: str, normalized: dict, semaphore) -> bool:
+        async with semaphore:
+            try:
+                async with session_factory() as db:
+                    # Skip jobs a webhook handler is finalizing right now
+                    job = (await db.execute(
+                        select(Job)
+                        .where(Job.id == job_id, Job.status == "running")
+                        .with_for_update(skip_locked=True)
+                    )).scalar_one_or_none()
+                    if job is None:
+                        return False
+                    logger.warning(f"Webhook lost for job {job_id}, finalizing as {normalized.get('status')}")
+                    return await complete_job(db, job, normalized)
+            except Exception as e:
+                logger.error(f"Failed to finalize job {job_id}: {e}")
+                self.stats["errors"] += 1
+                return False
+
+    def _webhook_overdue(self, normalized: dict) -> bool:
+        completed_at = _parse_timestamp((normalized.get("meta") or {}).get("completed_at"))
+        if completed_at is None:
+            return True
+        return datetime.now(timezone.utc) - completed_at >= timedelta(seconds=self.webhook_grace)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+job_reconciler = JobReconciler(
+    batch_size=settings.JOB_RECONCILE_BATCH_SIZE,
+    concurrency=settings.JOB_RECONCILE_CONCURRENCY,
+    min_age=settings.JOB_RECONCILE_MIN_AGE_SECONDS,
+    webhook_grace=settings.JOB_RECONCILE_WEBHOOK_GRACE_SECONDS,
+)
+
+register_metrics("job_reconciler", job_reconciler.get_stats)
@@ -0,0 +1,144 @@
+import io
+import logging
+from dataclasses import asdict, dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+from PIL import Image
+from app.core.config import settings
+from app.domain.providers.normalization.image_transform import TransformPolicy, TransformResult, image_engine
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pillow_avif  # noqa: F401  (registers AVIF with Pillow < 11.2)
+except ImportError:
+    pass
+
+FORMATS = {
+    # name -> (Pillow format, extension, content type)
+    "webp": ("WEBP", "webp", "image/webp"),
+    "avif": ("AVIF", "avif", "image/avif"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+}
+ENCODE_OPTIONS = {
+    "webp": {"method": 4},
+    "avif": {"speed": 6},
+    "jpeg": {"optimize": True, "progressive": True},
+}
+
+
+@dataclass
+class Rendition:
+    width: int
+    height: int
+    format: str
+    key: str
+    size: int
+    url: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def rendition_key(job_id: str, width: int, fmt: str) -> str:
+    return f"renditions/{job_id}/{width}.{FORMATS[fmt][1]}"
+
+
+def available_formats(formats: Iterable[str]) -> List[str]:
+    """Requested formats this Pillow build can encode (AVIF needs Pillow 11.2+ or pillow-avif-plugin)."""
+    Image.init()  # Registers all encoder plugins (Image.SAVE is filled lazily)
+    usable = []
+    for fmt in formats:
+        spec = FORMATS.get(fmt)
+        if spec is None or spec[0] not in Image.SAVE:
+            logger.debug(f"Rendition format {fmt!r} unavailable, skipped")
+            continue
+        usable.append(fmt)
+    return usable
+
+
+def render(image: Image.Image, job_id: str, widths: Sequence[int], formats: Sequence[str],
+           quality: dict) -> List[Tuple[Rendition, bytes]]:
+    """
+    Encodes downscaled copies of an already decoded image.
+    Widths are produced largest first, each resized from the previous step, so the
+    source is decoded once and every resize works on the smallest sufficient input.
+    Widths at or above the source width are skipped (the original covers them).
+    """
+    formats = available_formats(formats)
+    if not formats:
+        return []
+    src = image.convert("RGBA" if _has_alpha(image) else "RGB")
+    out = []
+    for width in sorted({w for w in widths if 0 < w < image.width}, reverse=True):
+        height = max(1, round(src.height * width / src.width))
+        src = src.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        for fmt in formats:
+            frame = src.convert("RGB") if fmt == "jpeg" and src.mode == "RGBA" else src
+            buf = io.BytesIO()
+            frame.save(buf, format=FORMATS[fmt][0], quality=quality.get(fmt, 80), **ENCODE_OPTIONS[fmt])
+            body = buf.getvalue()
+            out.append((Rendition(width=width, height=height, format=fmt,
+                                  key=rendition_key(job_id, width, fmt), size=len(body)), body))
+    return out
+
+
+def render_for_ingest(image: Image.Image, job_id: str) -> List[Tuple[Rendition, bytes]]:
+    if not settings.IMAGE_RENDITIONS_ENABLED:
+        return []
+    return render(image, job_id, settings.IMAGE_RENDITION_WIDTHS, settings.IMAGE_RENDITION_FORMATS,
+                  settings.IMAGE_RENDITION_QUALITY)
+
+
+def process_image(job_id: str, content: bytes,
+                  content_type: Optional[str]) -> Tuple[TransformResult, List[Tuple[Rendition, bytes]]]:
+    """
+    All codec work of an image output: the stored original and its renditions from one
+    decode. Runs in a media pool worker, so only picklable results leave it (no PIL image).
+    The transform is not recorded here; the caller records it in its own process.
+    """
+    prepared = prepare_original(content, content_type)
+    if prepared.image is None:
+        return prepared, []
+    try:
+        return prepared, _render_for_ingest(prepared.image, job_id)
+    finally:
+        prepared.image.close()
+        prepared.image = None
+
+
+def prepare_original(content: bytes, content_type: Optional[str]) -> TransformResult:
+    """
+    Stored original of an image output, via the shared transform engine (one decode,
+    format/quality policy, never larger than the provider's file unless downscaled).
+    Undecodable content is stored as received.
+    """
+    policy = TransformPolicy.from_settings()
+    if settings.IMAGE_RENDITIONS_ENABLED and settings.IMAGE_RENDITION_WIDTHS:
+        policy.min_decode_width = max(settings.IMAGE_RENDITION_WIDTHS)
+    try:
+        return image_engine.transform(content, policy, record=False)
+    except Exception as e:
+        logger.error(f"Image optimization failed: {e}, using original.")
+        content_type = content_type or "image/png"
+        ext = "png" if "png" in content_type else "webp" if "webp" in content_type else "jpg"
+        return TransformResult(body=content, ext=ext, content_type=content_type, width=None, height=None,
+                               original_size=len(content), strategy="passthrough")
+
+
+def _render_for_ingest(image: Image.Image, job_id: str) -> List[Tuple[Rendition, bytes]]:
+    try:
+        return render_for_ingest(image, job_id)
+    except Exception as e:
+        # Feeds fall back to the original
+        logger.error(f"Rendition generation failed for job {job_id}: {e}")
+        return []
+
+
+def pick(renditions: Optional[List[dict]], min_width: int, fmt: str = "webp") -> Optional[dict]:
+    """Smallest rendition of ``fmt`` at least ``min_width`` wide; None means use the original."""
+    fits = [r for r in renditions or () if r.get("format") == fmt and r.get("width", 0) >= min_width]
+    return min(fits, key=lambda r: r["width"]) if fits else None
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    return image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
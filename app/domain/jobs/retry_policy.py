@@ -0,0 +1,222 @@
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+import httpx
+from app.core.config import settings
+from app.core.redis import get_redis, get_async_redis
+from app.core.monitoring import register_metrics
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE = "retryable"
+THROTTLED = "throttled"
+PERMANENT = "permanent"
+
+BUDGET_PREFIX = "retry:budget"
+STATS_PREFIX = "retry:stats"
+
+# Statuses worth retrying; any other 4xx is a problem with the request itself
+RETRYABLE_STATUSES = {408, 409, 425, 500, 502, 503, 504}
+
+# Counts the error class and, for retries, spends from the provider's budget for the window.
+# A window allows min_retries plus ratio * attempts retries, so an outage (every attempt
+# failing) is capped at a fraction of normal traffic instead of multiplying it.
+# KEYS: budget hash, stats hash. ARGV: class, wants_retry, min_retries, ratio, ttl.
+BUDGET_LUA = """
+redis.call('HINCRBY', KEYS[2], ARGV[1], 1)
+if ARGV[2] == '0' then
+    return 1
+end
+local attempts = tonumber(redis.call('HGET', KEYS[1], 'attempts') or '0')
+local retries = tonumber(redis.call('HGET', KEYS[1], 'retries') or '0')
+if retries >= tonumber(ARGV[3]) + tonumber(ARGV[4]) * attempts then
+    redis.call('HINCRBY', KEYS[2], 'budget_exhausted', 1)
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], 'retries', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('HINCRBY', KEYS[2], 'retried', 1)
+return 1
+"""
+
+
+@dataclass(frozen=True)
+class RetryDecision:
+    kind: str                     # RETRYABLE / THROTTLED / PERMANENT
+    retry: bool
+    countdown: float = 0.0
+    error: Optional[str] = None   # Set when the job should fail instead
+
+
+def classify(exc: BaseException) -> Tuple[str, Optional[float]]:
+    """Returns (error class, Retry-After seconds) for a failed submission."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)  # httpx.HTTPStatusError
+    retry_after = getattr(exc, "retry_after", None)
+
+    if isinstance(status, int):
+        if status == 429:
+            return THROTTLED, retry_after
+        if status in RETRYABLE_STATUSES or status >= 500:
+            return RETRYABLE, retry_after
+        if 400 <= status < 500:
+            return PERMANENT, None
+
+    if isinstance(exc, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)):
+        return RETRYABLE, None
+    if isinstance(exc, (ValueError, TypeError, KeyError)):
+        return PERMANENT, None
+    # Adapters without structured errors only carry the status in the message
+    if "422" in str(exc):
+        return PERMANENT, None
+    return RETRYABLE, None
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed job submission is retried, and when.
+    - Permanent errors (4xx other than 408/409/425/429, bad input) fail immediately.
+    - Retries back off exponentially with jitter; Retry-After is a lower bound.
+    - Each provider has a retry budget per window shared by all workers (Redis); once
+      spent, further failures fail their jobs instead of retrying. Without Redis the
+      budget is not enforced.
+    """
+
+    def __init__(self, base: float = 5.0, cap: float = 300.0, budget_ratio: float = 0.2,
+                 budget_min: int = 10, budget_window: int = 60):
+        self.base = base
+        self.cap = cap
+        self.budget_ratio = budget_ratio
+        self.budget_min = budget_min
+        self.budget_window = budget_window
+        self.stats = {RETRYABLE: 0, THROTTLED: 0, PERMANENT: 0, "retried": 0, "exhausted": 0, "budget_exhausted": 0}
+
+    # --- Decisions ---
+
+    def decide(self, exc: BaseException, provider_id: Optional[str], retries: int, max_retries: int) -> RetryDecision:
+        kind, retry_after, wants_retry = self._classify(exc, retries, max_retries)
+        allowed = self._spend(get_redis(), provider_id, kind, wants_retry)
+        return self._decision(exc, provider_id, kind, retry_after, retries, wants_retry, allowed)
+
+    async def decide_async(self, exc: BaseException, provider_id: Optional[str], retries: int, max_retries: int) -> RetryDecision:
+        kind, retry_after, wants_retry = self._classify(exc, retries, max_retries)
+        allowed = await self._spend_async(provider_id, kind, wants_retry)
+        return self._decision(exc, provider_id, kind, retry_after, retries, wants_retry, allowed)
+
+    def backoff(self, retries: int, retry_after: Optional[float] = None) -> float:
+        """Equal jitter: half the exponential step is fixed, half random."""
+        step = min(self.cap, self.base * (2 ** max(0, retries)))
+        delay = step / 2 + random.uniform(0, step / 2)
+        if retry_after is not None:
+            # Spread callers that were all told the same Retry-After
+            delay = max(delay, retry_after + random.uniform(0, self.base))
+        return round(delay, 3)
+
+    def _classify(self, exc, retries, max_retries):
+        kind, retry_after = classify(exc)
+        self.stats[kind] += 1
+        wants_retry = kind != PERMANENT and (retries or 0) < (max_retries or 3)
+        if kind != PERMANENT and not wants_retry:
+            self.stats["exhausted"] += 1
+        return kind, retry_after, wants_retry
+
+    def _decision(self, exc, provider_id, kind, retry_after, retries, wants_retry, allowed) -> RetryDecision:
+        if kind == PERMANENT:
+            prefix = "Validation Error" if "422" in str(exc) else "Rejected"
+            return RetryDecision(kind, False, error=f"{prefix}: {exc}")
+        if not wants_retry:
+            return RetryDecision(kind, False, error=str(exc))
+        if not allowed:
+            self.stats["budget_exhausted"] += 1
+            logger.warning(f"Retry budget exhausted for provider {provider_id}, not retrying")
+            return RetryDecision(kind, False, error=f"Provider unavailable (retry budget exhausted): {exc}")
+        self.stats["retried"] += 1
+        countdown = self.backoff(retries or 0, retry_after)
+        logger.warning(f"Retrying ({(retries or 0) + 1}) in {countdown}s after {kind} error")
+        return RetryDecision(kind, True, countdown=countdown)
+
+    # --- Budget (Redis) ---
+
+    def record_attempt(self, provider_id: str):
+        """Counts a submission attempt; the budget grows with real traffic."""
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            key = self._budget_key(provider_id)
+            pipe = client.pipeline(transaction=False)
+            pipe.hincrby(key, "attempts", 1)
+            pipe.expire(key, self.budget_window * 2)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Retry budget write failed: {e}")
+
+    async def record_attempt_async(self, provider_id: str):
+        client = get_async_redis()
+        if client is None:
+            return
+        try:
+            key = self._budget_key(provider_id)
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.hincrby(key, "attempts", 1)
+                pipe.expire(key, self.budget_window * 2)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Retry budget write failed: {e}")
+
+    def _spend(self, client, provider_id, kind, wants_retry) -> bool:
+        if client is None:
+            return True
+        try:
+            return bool(client.eval(BUDGET_LUA, 2, *self._budget_args(provider_id, kind, wants_retry)))
+        except Exception as e:
+            logger.warning(f"Retry budget unavailable: {e}")
+            return True
+
+    async def _spend_async(self, provider_id, kind, wants_retry) -> bool:
+        client = get_async_redis()
+        if client is None:
+            return True
+        try:
+            return bool(await client.eval(BUDGET_LUA, 2, *self._budget_args(provider_id, kind, wants_retry)))
+        except Exception as e:
+            logger.warning(f"Retry budget unavailable: {e}")
+            return True
+
+    def _budget_args(self, provider_id, kind, wants_retry):
+        provider = provider_id or "worker"
+        return (self._budget_key(provider), f"{STATS_PREFIX}:{provider}", kind,
+                1 if wants_retry else 0, self.budget_min, self.budget_ratio, self.budget_window * 2)
+
+    def _budget_key(self, provider_id: str) -> str:
+        return f"{BUDGET_PREFIX}:{provider_id}:{int(time.time() // self.budget_window)}"
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"process": dict(self.stats), "providers": {}}
+        client = get_redis()
+        if client is None:
+            return stats
+        try:
+            for key in client.scan_iter(match=f"{STATS_PREFIX}:*", count=100):
+                key = key.decode() if isinstance(key, bytes) else key
+                raw = client.hgetall(key)
+                stats["providers"][key[len(STATS_PREFIX) + 1:]] = {
+                    (k.decode() if isinstance(k, bytes) else k): int(v) for k, v in raw.items()
+                }
+        except Exception as e:
+            stats["error"] = str(e)
+        return stats
+
+
+retry_policy = RetryPolicy(
+    base=settings.JOB_RETRY_BASE_SECONDS,
+    cap=settings.JOB_RETRY_MAX_SECONDS,
+    budget_ratio=settings.JOB_RETRY_BUDGET_RATIO,
+    budget_min=settings.JOB_RETRY_BUDGET_MIN,
+    budget_window=settings.JOB_RETRY_BUDGET_WINDOW_SECONDS,
+)
+
+register_metrics("job_retries", retry_policy.get_stats)
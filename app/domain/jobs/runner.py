@@ -1,19 +1,28 @@
 import logging
 import json
-from app.tasks.worker import celery_app
-from sqlalchemy import create_engine, select
+from celery.exceptions import Retry
+from app.tasks.worker import celery_app, executor_queue
+from sqlalchemy import create_engine, select, update
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
 from app.core.config import settings
 from app.domain.jobs.models import Job
 from app.models import User
-from app.domain.billing.models import LedgerEntry
+from app.domain.billing.service import fail_and_release_sync
 from app.domain.providers.models import ProviderConfig, AIModel
+from app.domain.providers.cache import provider_services
+from app.domain.providers.rate_limit import rate_limiter
+from app.domain.jobs.retry_policy import retry_policy
+from app.domain.jobs.events import publish_job_event_sync
 from app.domain.providers.replicate_service import ReplicateService
 from app.domain.providers.service import decrypt_key
 import uuid
+import time
 
 logger = logging.getLogger(__name__)
 
+RATE_SLOT_GRACE_SECONDS = 5  # How long after it opens a reserved submission slot is honoured
+
 sync_engine = create_engine(settings.SQLALCHEMY_DATABASE_URI_SYNC)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
 
@@ -22,6 +31,8 @@ def process_job(self, job_id: str):
     logger = logging.getLogger("runner")
     logger.info(f"Starting process_job for {job_id}")
     session = SessionLocal()
+    job = None
+    provider_id = None
     try:
         # 1. Fetch Job
         job = session.execute(select(Job).where(Job.id == job_id)).scalar_one_or_none()
@@ -30,92 +41,52 @@ def process_job(self, job_id: str):
             return "Job not found"
         
         logger.info(f"Job found: {job.id}, Status: {job.status}")
+        if not _awaiting_submission(job):
+            # Redelivered (acks_late) after a submission or failure was already recorded
+            return _skip_redelivery(job)
 
-        # 2. Initialize Router with Active Configs
+        # 2. Load Active Provider Configs (cached per process)
         try:
-             configs = session.execute(select(ProviderConfig).where(ProviderConfig.is_active == True)).scalars().all()
-             from app.domain.providers.router import ProviderRouter
-             router = ProviderRouter(list(configs))
+             providers = provider_services.load(session)
         except Exception as e:
-             logger.error(f"Failed to initialize ProviderRouter: {e}")
+             logger.error(f"Failed to load provider configs: {e}")
              return _fail_job(session, job, f"Provider Config Error: {e}")
 
-        # 3. Parse User Input (Internal Format)
-        model_identifier, raw_params, prompt_text = _parse_input_string(job.prompt or "")
+        # 3. Read User Input
+        model_identifier, raw_params, prompt_text = _job_inputs(job)
         logger.info(f"Job {job.id}: Model={model_identifier}, PromptLen={len(prompt_text)}")
 
         # 4. Resolve Model & Provider
         ai_model = None
-        provider_id = "replicate" # Default
-        model_ref = "black-forest-labs/flux-schnell" # Default
-        
-        try:
-            model_uuid = uuid.UUID(model_identifier)
+        model_uuid = _model_uuid(model_identifier)
+        if model_uuid:
             ai_model = session.execute(select(AIModel).where(AIModel.id == model_uuid)).scalar_one_or_none()
-        except ValueError:
-            pass
-            
-        if ai_model:
-            provider_id = ai_model.provider
-            model_ref = ai_model.model_ref
-            if ai_model.version_id:
-                 model_ref += f":{ai_model.version_id}"
-            
-            # Merge Defaults
-            if ai_model.ui_config:
-                 for k, conf in ai_model.ui_config.items():
-                      if k not in raw_params and "default" in conf:
-                           raw_params[k] = conf["default"]
-        elif model_identifier == "flux-pro":
-             model_ref = "black-forest-labs/flux-1.1-pro"
+        provider_id, model_ref = _resolve_target(model_identifier, ai_model, raw_params)
 
         # 5. Get Service
         try:
-            service = router.get_service(provider_id)
+            service = providers.get_service(provider_id)
         except Exception as e:
             logger.error(f"Provider not available: {e}")
             return _fail_job(session, job, f"Provider Error: {e}")
 
         # 6. Normalize Payload
-        from app.domain.catalog.service import CatalogService
-        catalog = CatalogService()
-        
-        allowed_inputs = []
-        if ai_model:
-             spec = catalog.resolve_ui_spec(ai_model)
-             for p in spec.parameters:
-                 allowed_inputs.append({
-                     "name": p.id,
-                     "type": p.type,
-                     "options": [o.value for o in p.options] if p.options else None,
-                     "min": p.min,
-                     "max": p.max,
-                     "default": p.default
-                 })
-                 
-        raw_params["prompt"] = prompt_text
-        
-        schema = {"inputs": allowed_inputs} if allowed_inputs else {"inputs": [{"name": "prompt", "type": "string"}]}
-        
-        # DEBUG: Log Schema and Payload
-        logger.info(f"DEBUG SCHEMA: {[p['name'] + ':' + p['type'] for p in allowed_inputs]}")
-        
-        payload = service.normalize_payload(raw_params, schema)
-        
-        # DEBUG LOG
-        logger.info(f"DEBUG PAYLOAD: {json.dumps(payload, default=str)}")
-        
-        if payload is None: payload = raw_params # Fallback
-
-        # 7. Execute
-        webhook_host = settings.WEBHOOK_HOST or 'https://api.artline.dev'
-        if not webhook_host.startswith("https://") and "api.artline.dev" not in webhook_host:
-             webhook_url = None
-        else:
-             webhook_url = f"{webhook_host}/webhooks/{provider_id}"
+        payload = _build_payload(service, ai_model, raw_params, prompt_text)
+
+        # 7. Rate Limit (throttled jobs are rescheduled, not retried)
+        throttled_since, holds_slot = _throttle_state(self.request)
+        if not holds_slot:
+            admission = rate_limiter.acquire(providers.rate_limit(provider_id))
+            if admission.wait:
+                session.rollback()
+                return _reschedule_throttled(self, job_id, admission, throttled_since)
+
+        # 8. Execute
+        webhook_url = _webhook_url(provider_id)
         
         try:
             logger.info(f"Submitting to {provider_id} Ref: {model_ref}")
+            retry_policy.record_attempt(provider_id)
             provider_job_id = service.submit_prediction(
                 model_ref=model_ref,
                 input_data=payload,
@@ -123,83 +94,216 @@ def process_job(self, job_id: str):
             )
             logger.info(f"Submitted successfully. Provider ID: {provider_job_id}")
             
-            job.status = "running"
-            job.provider_job_id = provider_job_id
-            job.provider = provider_id
+            if session.execute(_submitted_statement(job.id, provider_id, provider_job_id)).first() is None:
+                session.rollback()
+                return _discard_duplicate(job, provider_job_id)
+            _mark_submitted(job, provider_id, provider_job_id)
             session.commit()
+            publish_job_event_sync(job)
+            if throttled_since:
+                rate_limiter.record_wait(provider_id, throttled_since)
             return f"Submitted: {provider_job_id}"
             
         except Exception as e:
             logger.error(f"Submission Exception: {e}")
             
-            # Stop retrying on 422 Validation Error
-            if "422" in str(e):
-                 return _fail_job(session, job, f"Validation Error: {e}")
-            
-            current_retries = self.request.retries or 0
-            max_retries = self.max_retries or 3
-            
-            if current_retries >= max_retries:
-                return _fail_job(session, job, str(e))
-            else:
-                logger.warning(f"Retrying... ({current_retries + 1})")
+            decision = retry_policy.decide(e, provider_id, self.request.retries, self.max_retries)
+            if not decision.retry:
+                return _fail_job(session, job, decision.error)
             
-            raise self.retry(exc=e, countdown=10)
+            raise self.retry(exc=e, countdown=decision.countdown)
 
+    except Retry:
+        raise
     except Exception as e:
         logger.exception(f"Worker Crash for job {job_id}")
         session.rollback()
-        # Retry or Fail logic...
-        # For brevity, implementing fail:
-        _fail_job(session, job, f"Worker Crash: {str(e)}")
-        raise self.retry(exc=e, countdown=10)
+        # Either retry (job untouched, credits still held) or fail and refund - never both
+        decision = retry_policy.decide(e, provider_id, self.request.retries, self.max_retries)
+        if decision.retry or job is None:
+            raise self.retry(exc=e, countdown=decision.countdown)
+        return _fail_job(session, job, f"Worker Crash: {e}")
     finally:
         session.close()
 
+def enqueue_job(job_id, queue=None):
+    """
+    Dispatches a job to the configured executor (see JOB_EXECUTOR_MODE).
+    `queue` comes from job_queue() (owner/model routing); None keeps the executor's default.
+    In async mode it maps to the matching thread-pool queue (see executor_queue).
+    """
+    # Stamped for per-queue wait time metrics
+    headers = {"enqueued_at": time.time()}
+    if settings.JOB_EXECUTOR_MODE == "async":
+        from app.domain.jobs.executor import process_job_async
+        return process_job_async.apply_async(args=[job_id], queue=executor_queue(queue), headers=headers)
+    return process_job.apply_async(args=[job_id], queue=queue, headers=headers)
+
+def _request_header(request, name):
+    # Custom message headers surface as request attributes (or under request.headers)
+    value = getattr(request, name, None)
+    if value is None:
+        value = (getattr(request, "headers", None) or {}).get(name)
+    return value
+
+def _throttle_state(request):
+    """
+    Returns (throttled_since, holds_slot) for a job rescheduled by the rate limiter.
+    holds_slot: the job reserved a token for now and may submit without asking again.
+    """
+    throttled_since = _request_header(request, "throttled_since")
+    slot_at = _request_header(request, "rate_slot_at")
+    holds_slot = bool(slot_at) and time.time() < float(slot_at) + RATE_SLOT_GRACE_SECONDS
+    return throttled_since, holds_slot
+
+def _reschedule_throttled(task, job_id, admission, throttled_since=None):
+    """
+    Re-queues a throttled job on its current queue for when the bucket has capacity.
+    The retry count is carried over unchanged, so throttling never uses up retries.
+    """
+    request = task.request
+    now = time.time()
+    due = now + admission.wait
+    headers = {"enqueued_at": due, "throttled_since": throttled_since or now}
+    if admission.reserved:
+        headers["rate_slot_at"] = due
+    task.apply_async(
+        args=[job_id],
+        countdown=admission.wait,
+        queue=(request.delivery_info or {}).get("routing_key"),
+        retries=request.retries or 0,
+        headers=headers,
+    )
+    logger.info(f"Job {job_id} throttled, resubmitting in {admission.wait:.1f}s")
+    return f"Throttled: resubmitting in {admission.wait:.1f}s"
+
 def _fail_job(session, job, error_msg):
     logger.error(f"Failing job {job.id}: {error_msg}")
     try:
-        from app.domain.users.guest_models import GuestProfile
-        from sqlalchemy import update
-        
-        job.status = "failed"
-        job.error_message = error_msg
-        
-        # User Refund
-        if job.user_id and job.cost_credits > 0:
-            # 1. Add to Ledger
-            refund = LedgerEntry(
-                user_id=job.user_id,
-                amount=job.cost_credits,
-                reason=f"Refund for failed job {job.id}",
-                related_job_id=job.id,
-                currency="credits"
-            )
-            session.add(refund)
-            
-            # 2. Update Denormalized Balance (User.balance)
-            # We must do this explicitly to keep the cache in sync with ledger
-            stmt = (
-                update(User)
-                .where(User.id == job.user_id)
-                .values(balance=User.balance + job.cost_credits)
-            )
-            session.execute(stmt)
-            
-        # Guest Refund
-        elif job.guest_id and job.cost_credits > 0:
-            stmt = (
-                update(GuestProfile)
-                .where(GuestProfile.id == job.guest_id)
-                .values(balance=GuestProfile.balance + job.cost_credits)
-            )
-            session.execute(stmt)
-            
+        # Reserved credits go back to the user (with a ledger entry) or guest, only if
+        # this run is the one that failed the job
+        if not fail_and_release_sync(session, job, error_msg, _refund_reason(job)):
+            session.rollback()
+            return _skip_finished(job)
         session.commit()
+        publish_job_event_sync(job)
     except Exception as e:
         logger.error(f"Failed to fail job safely: {e}")
     return "Job Failed"
 
+def _skip_finished(job):
+    logger.warning(f"Job {job.id} already finished; not failing it again")
+    return "Already finished"
+
+def _refund_reason(job) -> str:
+    return f"Refund for failed job {job.id}"
+
+def _model_uuid(model_identifier: str):
+    try:
+        return uuid.UUID(model_identifier)
+    except ValueError:
+        return None
+
+def _resolve_target(model_identifier, ai_model, raw_params):
+    """
+    Returns (provider_id, model_ref) and merges model ui_config defaults into raw_params.
+    """
+    provider_id = "replicate" # Default
+    model_ref = "black-forest-labs/flux-schnell" # Default
+    
+    if ai_model:
+        provider_id = ai_model.provider
+        model_ref = ai_model.model_ref
+        if ai_model.version_id:
+             model_ref += f":{ai_model.version_id}"
+        
+        # Merge Defaults
+        if ai_model.ui_config:
+             for k, conf in ai_model.ui_config.items():
+                  if k not in raw_params and "default" in conf:
+                       raw_params[k] = conf["default"]
+    elif model_identifier == "flux-pro":
+         model_ref = "black-forest-labs/flux-1.1-pro"
+    return provider_id, model_ref
+
+def _build_payload(service, ai_model, raw_params, prompt_text):
+    from app.domain.catalog.service import CatalogService
+    catalog = CatalogService()
+    
+    allowed_inputs = []
+    if ai_model:
+         spec = catalog.resolve_ui_spec(ai_model)
+         for p in spec.parameters:
+             allowed_inputs.append({
+                 "name": p.id,
+                 "type": p.type,
+                 "options": [o.value for o in p.options] if p.options else None,
+                 "min": p.min,
+                 "max": p.max,
+                 "default": p.default
+             })
+             
+    raw_params["prompt"] = prompt_text
+    
+    schema = {"inputs": allowed_inputs} if allowed_inputs else {"inputs": [{"name": "prompt", "type": "string"}]}
+    
+    # DEBUG: Log Schema and Payload
+    logger.info(f"DEBUG SCHEMA: {[p['name'] + ':' + p['type'] for p in allowed_inputs]}")
+    
+    payload = service.normalize_payload(raw_params, schema)
+    
+    # DEBUG LOG
+    logger.info(f"DEBUG PAYLOAD: {json.dumps(payload, default=str)}")
+    
+    if payload is None: payload = raw_params # Fallback
+    return payload
+
+def _webhook_url(provider_id):
+    webhook_host = settings.WEBHOOK_HOST or 'https://api.artline.dev'
+    if not webhook_host.startswith("https://") and "api.artline.dev" not in webhook_host:
+         return None
+    return f"{webhook_host}/webhooks/{provider_id}"
+
+def _awaiting_submission(job) -> bool:
+    return job.status == "queued" and job.provider_job_id is None
+
+def _skip_redelivery(job):
+    logger.warning(f"Job {job.id} is {job.status} (provider job {job.provider_job_id}); not submitting again")
+    return f"Skipped: {job.status}"
+
+def _submitted_statement(job_id, provider_id, provider_job_id):
+    """
+    Records a submission only while the job still awaits one (no row otherwise),
+    so a concurrent or redelivered run never overwrites provider_job_id.
+    """
+    return (
+        update(Job)
+        .where(Job.id == job_id, Job.status == "queued", Job.provider_job_id.is_(None))
+        .values(status="running", provider_job_id=provider_job_id, provider=provider_id)
+        .returning(Job.id)
+        .execution_options(synchronize_session=False)
+    )
+
+def _mark_submitted(job, provider_id, provider_job_id):
+    # Mirrors what _submitted_statement wrote onto the loaded job
+    set_committed_value(job, "status", "running")
+    set_committed_value(job, "provider_job_id", provider_job_id)
+    set_committed_value(job, "provider", provider_id)
+
+def _discard_duplicate(job, provider_job_id):
+    logger.error(f"Job {job.id} was submitted by another run; prediction {provider_job_id} is not recorded")
+    return f"Duplicate: {provider_job_id}"
+
+def _job_inputs(job):
+    """
+    Returns (model_identifier, params, prompt) from the typed job columns.
+    """
+    if job.generation_params is not None:
+        model_identifier = str(job.model_id) if job.model_id else (job.model_ref or "flux")
+        return model_identifier, dict(job.generation_params), job.prompt or ""
+    # Legacy row not yet converted by the backfill migration
+    return _parse_input_string(job.prompt or "")
+
 def _parse_input_string(raw_text: str):
     model_identifier = "flux"
     params = {}
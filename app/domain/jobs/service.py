@@ -4,8 +4,9 @@ from sqlalchemy.orm import joinedload
 from app.domain.jobs.models import Job
 from app.domain.users.models import User
 from app.domain.providers.models import AIModel
-from app.domain.billing.service import get_user_balance, add_ledger_entry
+from app.domain.billing.service import reserve_credits
 from app.domain.pricing.service import PricingService
+from app.domain.jobs.events import publish_job_event
 from app.schemas import UserContext, UserRead
 import uuid
 import math
@@ -13,30 +14,34 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-import json
-
 async def create_job(
     db: AsyncSession, 
     user: User | object, # GuestProfile
     kind: str, 
     prompt: str, 
     model: str = "flux",
-    params: dict = None
+    params: dict = None,
+    model_obj: AIModel | None = None
 ) -> tuple[Job | None, str | None]:
-    
+    """
+    Builds a job in the caller's unit of work: quote, credit reservation and job row are
+    added to the session and the caller commits once. On an error only the quote is
+    pending, and the caller still commits it for audit. Ids are assigned in Python, so
+    nothing is flushed just to link rows. Pass ``model_obj`` when it is already loaded.
+    """
     # Determine if user or guest
     is_guest = not isinstance(user, User)
     
     # Resolve Model Object first (needed for PricingService)
     # The 'model' arg is currently a string ID or name. We need the object.
-    model_obj = None
-    try:
-        model_uuid = uuid.UUID(model)
-        stmt = select(AIModel).where(AIModel.id == model_uuid)
-        res = await db.execute(stmt)
-        model_obj = res.scalar_one_or_none()
-    except ValueError:
-        pass
+    if model_obj is None:
+        try:
+            model_uuid = uuid.UUID(model)
+            stmt = select(AIModel).where(AIModel.id == model_uuid)
+            res = await db.execute(stmt)
+            model_obj = res.scalar_one_or_none()
+        except ValueError:
+            pass
         
     if not model_obj:
         # Fallback or Error? 
@@ -61,30 +66,14 @@ async def create_job(
     quote = await PricingService.quote(db, model_obj, params or {}, u_ctx)
     cost = quote.total_credits
     
-    # Check balance
-    if is_guest:
-        balance = user.balance
-    else:
-        balance = await get_user_balance(db, user.id)
-        
-    if balance < cost:
+    # Reserve credits: one conditional UPDATE, so parallel submissions cannot overspend.
+    # Committed with the job by the caller; failure paths give them back via release_credits.
+    if not await reserve_credits(db, user, cost, reason=f"job_cost:{model}"):
         return None, "Insufficient credits"
 
-    # Deduct credits
-    if is_guest:
-        user.balance -= cost
-        # Guest ledger not strictly required, balance field is source of truth
-    else:
-        await add_ledger_entry(
-            db, 
-            user.id, 
-            -cost, 
-            reason=f"job_cost:{model}", 
-            external_id=None
-        )
-
     # Create Job
     job = Job(
+        id=str(uuid.uuid4()),  # Assigned up front: the quote links to it before any flush
         kind=kind,
         cost_credits=cost,
         quote_id=quote.id, # Link Quote
@@ -93,6 +82,7 @@ async def create_job(
         owner_type="guest" if is_guest else "user",
         is_public=False, # Default to PRIVATE per new logic (Library only)
         model_id=model_obj.id,
+        model=model_obj,  # Loaded already: serializing the job needs no lazy load
         provider=model_obj.provider # Derive from model
     )
     
@@ -104,57 +94,28 @@ async def create_job(
     else:
         job.user_id = user.id
     
-    # Serialize structure: [model_id] <json> | prompt
-    # If params exist, dump them.
-    params_str = ""
+    job.prompt = prompt
+    job.generation_params = dict(params or {})
+
     if params:
-        try:
-            params_str = json.dumps(params or {})
-            
-            # Extract metadata for columns
-            ar = params.get("aspect_ratio", "1:1")
-            
-            # Map common ARs to format enum
-            if ar in ["9:16", "9:21", "2:3", "3:4", "4:5"]:
-                job.format = "portrait"
-            elif ar in ["16:9", "21:9", "3:2", "4:3", "5:4"]:
-                job.format = "landscape"
-            else:
-                job.format = "square"
-                
-            # Resolution (if available)
-            if "width" in params and "height" in params:
-                 # This is rare for Flux/Replicate inputs which use AR, but good to have
-                 pass
-            
-            # Megapixels via 'megapixels'? Flux uses '1' or '0.25' sometimes
-            # Just default to 1080 for now unless we see explicit data
-            
-        except:
-             pass
-    
-    if params_str:
-        job.prompt = f"[{model}] {params_str} | {prompt}"
-    else:
-        job.prompt = f"[{model}] {prompt}"
+        # Extract metadata for columns
+        ar = params.get("aspect_ratio", "1:1")
+        
+        # Map common ARs to format enum
+        if ar in ["9:16", "9:21", "2:3", "3:4", "4:5"]:
+            job.format = "portrait"
+        elif ar in ["16:9", "21:9", "3:2", "4:3", "5:4"]:
+            job.format = "landscape"
+        else:
+            job.format = "square"
     
     db.add(job)
     
-    # Link Job ID to Quote (Circular update)
-    # quote.job_id = job.id # Can't do this yet as job.id might be None (it has default generator though)
-    # Let's trust job.id is generated or flush first?
-    # job.id is generated by Python or DB? Look at model: default=lambda: str(uuid.uuid4())
-    # So job.id is set on init.
+    # Link Job ID to Quote
     quote.job_id = job.id
-    
-    await db.commit()
-    await db.commit()
-    
-    # Re-fetch with eager loaded model to prevent MissingGreenlet on property access
-    stmt = select(Job).options(joinedload(Job.model)).where(Job.id == job.id)
-    res = await db.execute(stmt)
-    job = res.scalar_one()
-    
+
+    # No commit or re-select here: server defaults (created_at) come back via RETURNING
+    # when the caller commits
     return job, None
 
 async def get_user_jobs(db: AsyncSession, user: User | object, limit: int = 50):
@@ -207,27 +168,34 @@ async def get_job_with_permission(db: AsyncSession, job_id: str, user: User | ob
     result = await db.execute(stmt)
     return result.scalar_one_or_none()
 
-async def delete_job(db: AsyncSession, job_id: str, user: User | object) -> tuple[bool, str | None]:
+async def delete_job(db: AsyncSession, job_id: str, user: User | object) -> tuple[bool, list[str]]:
     """
-    Soft delete a job if owned by user. Returns (success, s3_url_to_delete).
+    Soft delete a job if owned by user. Returns (success, s3_urls_to_delete).
     """
     job = await get_job_with_permission(db, job_id, user)
     if not job:
-        return False, None
+        return False, []
         
-    old_url = job.result_url
+    old_urls = job.output_urls()
     
     # Soft Delete
     job.status = 'deleted'
     job.is_public = False
     job.is_curated = False
     job.prompt = '[Deleted]'
+    job.generation_params = {}
     job.result_url = None
-    job.thumbnailUrl = None
+    job.renditions = None
+    job.cover_image_url = None
+    job.preview_url = None
     job.input_image_url = None
+    if job.ingest_status == "pending":
+        # An ingest in flight must not write its outputs back; it archives them instead
+        job.ingest_status = "cancelled"
     
     await db.commit()
-    return True, old_url
+    await publish_job_event(job)
+    return True, old_urls
 
 async def like_job(db: AsyncSession, job_id: str) -> int:
     """
@@ -0,0 +1,190 @@
+import base64
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+
+
+@dataclass
+class TransferResult:
+    key: str
+    size: int
+    parts: int
+    sha256: Optional[str] = None  # Hex digest of the whole object, if requested
+    retried_parts: int = 0
+
+
+class StreamingUpload:
+    """
+    Pipes a byte stream into an S3 multipart upload in fixed-size parts.
+    At most ``max_memory`` bytes of part data exist at once: one part being filled plus
+    parts in flight, uploaded concurrently up to that ceiling. Failed parts are re-sent
+    from memory up to ``part_retries`` times; an unrecoverable failure aborts the upload
+    so no orphaned parts are billed. Streams smaller than one part use a single PUT.
+    """
+
+    def __init__(self, s3, bucket: str, key: str, content_type: str, part_size: int,
+                 max_memory: int, checksum: bool = False, part_retries: int = 3):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.part_size = max(MIN_PART_SIZE, part_size)
+        # The part being filled counts against the ceiling too
+        self.max_in_flight = max(1, max_memory // self.part_size - 1)
+        self.checksum = checksum
+        self.part_retries = part_retries
+        self._digest = hashlib.sha256() if checksum else None
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._upload_id: Optional[str] = None
+        self._retried = 0
+
+    def upload(self, chunks: Iterable[bytes]) -> TransferResult:
+        buffer = bytearray()
+        size = 0
+        futures = []
+        pool: Optional[ThreadPoolExecutor] = None
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if self._digest is not None:
+                    self._digest.update(chunk)
+                buffer += chunk
+                while len(buffer) >= self.part_size:
+                    if pool is None:
+                        self._start()
+                        pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="s3-part")
+                    part = bytes(buffer[:self.part_size])
+                    del buffer[:self.part_size]
+                    futures.append(self._submit(pool, len(futures) + 1, part))
+                    _raise_failed(futures)
+
+            if pool is None:
+                # Whole stream fit in one part
+                self._put(bytes(buffer))
+                return self._result(size, parts=1)
+
+            if buffer:
+                futures.append(self._submit(pool, len(futures) + 1, bytes(buffer)))
+            buffer = bytearray()
+            parts = [f.result() for f in futures]
+            self._complete(parts)
+            return self._result(size, parts=len(parts))
+        except BaseException:
+            if pool is not None:
+                # Let in-flight parts settle before aborting the upload they belong to
+                pool.shutdown(wait=True, cancel_futures=True)
+                pool = None
+            self._abort()
+            raise
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+
+    # --- S3 Calls ---
+
+    def _start(self):
+        extra = {"ChecksumAlgorithm": "SHA256"} if self.checksum else {}
+        resp = self.s3.create_multipart_upload(Bucket=self.bucket, Key=self.key,
+                                               ContentType=self.content_type, **extra)
+        self._upload_id = resp["UploadId"]
+
+    def _submit(self, pool: ThreadPoolExecutor, number: int, data: bytes):
+        # Blocks the reader once max_in_flight parts are buffered (backpressure on download)
+        self._slots.acquire()
+        future = pool.submit(self._upload_part, number, data)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _upload_part(self, number: int, data: bytes) -> dict:
+        extra = {}
+        if self.checksum:
+            extra["ChecksumSHA256"] = base64.b64encode(hashlib.sha256(data).digest()).decode()
+        for attempt in range(self.part_retries + 1):
+            try:
+                resp = self.s3.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                           PartNumber=number, Body=data, **extra)
+                part = {"PartNumber": number, "ETag": resp["ETag"]}
+                if self.checksum:
+                    part["ChecksumSHA256"] = resp.get("ChecksumSHA256", extra["ChecksumSHA256"])
+                return part
+            except Exception as e:
+                if attempt >= self.part_retries:
+                    raise
+                self._retried += 1
+                logger.warning(f"Part {number} of {self.key} failed ({e}), resending")
+                time.sleep(min(2 ** attempt, 10))
+
+    def _complete(self, parts: List[dict]):
+        self.s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                          MultipartUpload={"Parts": parts})
+        self._upload_id = None
+
+    def _put(self, data: bytes):
+        extra = {}
+        if self.checksum:
+            extra["ChecksumSHA256"] = base64.b64encode(hashlib.sha256(data).digest()).decode()
+        self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=data, ContentType=self.content_type, **extra)
+
+    def _abort(self):
+        if self._upload_id is None:
+            return
+        try:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+        except Exception as e:
+            logger.error(f"Failed to abort multipart upload of {self.key}: {e}")
+        self._upload_id = None
+
+    def _result(self, size: int, parts: int) -> TransferResult:
+        return TransferResult(key=self.key, size=size, parts=parts,
+                              sha256=self._digest.hexdigest() if self._digest is not None else None,
+                              retried_parts=self._retried)
+
+
+def _raise_failed(futures):
+    # Stop reading the source as soon as any part has failed for good
+    for f in futures:
+        if f.done() and f.exception() is not None:
+            raise f.exception()
+
+
+def stream_to_s3(s3, response, bucket: str, key: str, content_type: str, tee=None) -> TransferResult:
+    """
+    Uploads a streamed httpx response body using the TRANSFER_* settings.
+    With ``tee`` (a writable file), the body is also written there as it streams, so
+    local post-processing needs no second download.
+    """
+    chunks = response.iter_bytes(chunk_size=1024 * 1024)
+    return _upload(s3, bucket, key, content_type).upload(_tee(chunks, tee) if tee is not None else chunks)
+
+
+def file_to_s3(s3, path: str, bucket: str, key: str, content_type: str) -> TransferResult:
+    """Uploads a local file with the same part size, memory ceiling and checksums."""
+    with open(path, "rb") as f:
+        return _upload(s3, bucket, key, content_type).upload(iter(lambda: f.read(1024 * 1024), b""))
+
+
+def _upload(s3, bucket: str, key: str, content_type: str) -> StreamingUpload:
+    return StreamingUpload(
+        s3, bucket, key, content_type,
+        part_size=settings.TRANSFER_PART_SIZE_MB * 1024 * 1024,
+        max_memory=settings.TRANSFER_MAX_MEMORY_MB * 1024 * 1024,
+        checksum=settings.TRANSFER_CHECKSUM,
+        part_retries=settings.TRANSFER_PART_RETRIES,
+    )
+
+
+def _tee(chunks: Iterable[bytes], sink):
+    for chunk in chunks:
+        sink.write(chunk)
+        yield chunk
@@ -0,0 +1,158 @@
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.core.storage import storage
+from app.domain.providers.normalization.media_processor import MediaProcessor
+
+logger = logging.getLogger(__name__)
+
+POSTER_FORMATS = {"jpeg": ("jpg", "image/jpeg"), "webp": ("webp", "image/webp")}
+HLS_CONTENT_TYPES = {".m3u8": "application/vnd.apple.mpegurl", ".ts": "video/mp2t"}
+
+
+@dataclass
+class VideoAssets:
+    duration: Optional[float] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    poster_url: Optional[str] = None
+    preview_url: Optional[str] = None
+
+
+@dataclass
+class Playback:
+    path: str  # File to upload as the job's MP4
+    remuxed: bool = False
+    hls: Optional[Dict[str, Any]] = None  # Renditions entry of the HLS playlist
+
+
+def poster_key(job_id: str) -> str:
+    ext = POSTER_FORMATS.get(settings.VIDEO_POSTER_FORMAT, POSTER_FORMATS["jpeg"])[0]
+    return f"renditions/{job_id}/poster.{ext}"
+
+
+def preview_key(job_id: str) -> str:
+    return f"renditions/{job_id}/preview.mp4"
+
+
+def hls_prefix(job_id: str) -> str:
+    return f"renditions/{job_id}/hls"
+
+
+def probe(path: str) -> Optional[Dict[str, Any]]:
+    return MediaProcessor().probe_video(path, timeout=settings.VIDEO_FFMPEG_TIMEOUT_SECONDS)
+
+
+def use_hls(info: Optional[Dict[str, Any]], size: int) -> bool:
+    if not settings.VIDEO_HLS_ENABLED:
+        return False
+    duration = (info or {}).get("duration") or 0
+    return (duration >= settings.VIDEO_HLS_MIN_DURATION_SECONDS
+            or size >= settings.VIDEO_HLS_MIN_SIZE_MB * 1024 * 1024)
+
+
+def prepare_playback(job_id: str, path: str, workdir: str, info: Optional[Dict[str, Any]]) -> Playback:
+    """
+    Makes the downloaded MP4 start playing before it is fully fetched.
+    - Files whose moov atom trails the media data are remuxed with +faststart (stream
+      copy, seconds even for long videos); files already in order are kept as is.
+    - Above the HLS thresholds, a VOD playlist with segments is published as well; the
+      MP4 stays the download and fallback.
+    A failed remux falls back to the original file.
+    """
+    processor = MediaProcessor()
+    timeout = settings.VIDEO_FFMPEG_TIMEOUT_SECONDS
+    playback = Playback(path=path)
+    if not processor.is_faststart(path):
+        out_path = os.path.join(workdir, "faststart.mp4")
+        try:
+            processor.remux_faststart(path, out_path, timeout=timeout)
+            playback.path, playback.remuxed = out_path, True
+        except Exception as e:
+            logger.error(f"Fast-start remux failed for job {job_id}, uploading as is: {e}")
+
+    playback.hls = publish_hls(job_id, playback.path, workdir, info)
+    return playback
+
+
+def publish_hls(job_id: str, path: str, workdir: str, info: Optional[Dict[str, Any]]) -> Optional[dict]:
+    """
+    Above the HLS thresholds, segments the MP4 at ``path`` and uploads a VOD playlist.
+    Returns its rendition entry, or None (disabled, below thresholds or failed).
+    """
+    if not use_hls(info, os.path.getsize(path)):
+        return None
+    hls_dir = os.path.join(workdir, "hls")
+    os.makedirs(hls_dir, exist_ok=True)
+    try:
+        playlist = MediaProcessor().segment_hls(path, hls_dir, settings.VIDEO_HLS_SEGMENT_SECONDS,
+                                                timeout=settings.VIDEO_FFMPEG_TIMEOUT_SECONDS)
+        return _upload_hls(job_id, hls_dir, playlist, info or {})
+    except Exception as e:
+        logger.error(f"HLS segmenting failed for job {job_id}: {e}")
+        return None
+
+
+def process_video(job_id: str, path: str, workdir: str, info: Optional[Dict[str, Any]] = None) -> VideoAssets:
+    """
+    Video ingest stage, run on the already downloaded file at ``path``.
+    Probes duration and dimensions, then makes and uploads a poster frame and a short
+    preview loop. Outputs are written to ``workdir``, which the caller owns and removes.
+    Each step is best effort: a failure is logged and leaves its fields empty.
+    """
+    assets = VideoAssets()
+    if not settings.VIDEO_INGEST_ENABLED:
+        return assets
+    processor = MediaProcessor()
+    timeout = settings.VIDEO_FFMPEG_TIMEOUT_SECONDS
+
+    if info is None:
+        info = processor.probe_video(path, timeout=timeout)
+    if info is None:
+        return assets
+    assets.duration, assets.width, assets.height = info["duration"], info["width"], info["height"]
+
+    ext, content_type = POSTER_FORMATS.get(settings.VIDEO_POSTER_FORMAT, POSTER_FORMATS["jpeg"])
+    at = settings.VIDEO_POSTER_AT_SECONDS
+    if assets.duration:
+        at = min(at, assets.duration / 2)
+    poster_path = os.path.join(workdir, f"poster.{ext}")
+    try:
+        processor.extract_poster(path, poster_path, at_seconds=at, width=settings.VIDEO_POSTER_WIDTH,
+                                 timeout=timeout)
+        assets.poster_url = _upload(poster_path, poster_key(job_id), content_type)
+    except Exception as e:
+        logger.error(f"Poster generation failed for job {job_id}: {e}")
+
+    if settings.VIDEO_PREVIEW_SECONDS > 0:
+        preview_path = os.path.join(workdir, "preview.mp4")
+        try:
+            processor.make_preview(path, preview_path, seconds=settings.VIDEO_PREVIEW_SECONDS,
+                                   width=settings.VIDEO_PREVIEW_WIDTH, fps=settings.VIDEO_PREVIEW_FPS,
+                                   crf=settings.VIDEO_PREVIEW_CRF, timeout=timeout)
+            assets.preview_url = _upload(preview_path, preview_key(job_id), "video/mp4")
+        except Exception as e:
+            logger.error(f"Preview generation failed for job {job_id}: {e}")
+    return assets
+
+
+def _upload(path: str, key: str, content_type: str) -> str:
+    with open(path, "rb") as f:
+        return storage.upload_fileobj(f, key, content_type)
+
+
+def _upload_hls(job_id: str, hls_dir: str, playlist: str, info: Dict[str, Any]) -> Dict[str, Any]:
+    segments = sorted(name for name in os.listdir(hls_dir) if name.endswith(".ts"))
+    prefix = hls_prefix(job_id)
+    # Segments first, concurrently; the playlist last, so it never references missing files
+    futures = [storage.submit(_upload, os.path.join(hls_dir, name), f"{prefix}/{name}", HLS_CONTENT_TYPES[".ts"])
+               for name in segments]
+    for future in futures:
+        future.result()
+    key = f"{prefix}/index.m3u8"
+    url = _upload(playlist, key, HLS_CONTENT_TYPES[".m3u8"])
+    size = sum(os.path.getsize(os.path.join(hls_dir, name)) for name in segments)
+    return {"format": "hls", "width": info.get("width"), "height": info.get("height"), "key": key,
+            "size": size, "url": url, "segments": len(segments)}
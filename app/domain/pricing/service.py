@@ -16,7 +16,8 @@ class PricingService:
     ) -> PricingQuote:
         """
         Generates a deterministic price quote for a model + params.
-        Persists the quote to DB for audit.
+        Adds the quote to the session for audit; the caller's commit persists it
+        (with the credits and job, or on its own when the submission is rejected).
         """
         
         # 1. Base Cost Logic
@@ -91,6 +92,7 @@ class PricingService:
 
         # 3. Create Quote
         quote = PricingQuote(
+            id=uuid.uuid4(),  # Known before the INSERT, so the job can link it without a flush
             model_id=model.id,
             user_id=user_context.user.id if user_context and user_context.user else None,
             guest_id=uuid.UUID(user_context.guest_id) if user_context and user_context.guest_id else None,
@@ -99,7 +101,4 @@ class PricingService:
         )
         
         db.add(quote)
-        await db.commit()
-        await db.refresh(quote)
-        
         return quote
@@ -1,5 +1,6 @@
 import httpx
 import logging
+from app.core.http import get_sync_client, request_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -46,15 +47,15 @@ def submit_replicate_job(input_data: dict, api_key: str, webhook_url: str | None
         raise ReplicateError("Either 'version' or 'model' must be specified")
 
     try:
-        with httpx.Client(timeout=30.0) as client:
-            response = client.post(target_url, json=payload, headers=headers)
-            
-            if response.status_code not in [200, 201]:
-                logger.error(f"Replicate Error: {response.text}")
-                raise ReplicateError(f"Replicate API returned {response.status_code}: {response.text}")
-            
-            data = response.json()
-            return data["id"]
+        client = get_sync_client()
+        response = client.post(target_url, json=payload, headers=headers, timeout=request_timeout(30.0))
+        
+        if response.status_code not in [200, 201]:
+            logger.error(f"Replicate Error: {response.text}")
+            raise ReplicateError(f"Replicate API returned {response.status_code}: {response.text}")
+        
+        data = response.json()
+        return data["id"]
             
     except httpx.RequestError as e:
         logger.error(f"Replicate Request Failed: {e}")
@@ -64,8 +65,7 @@ def cancel_replicate_job(prediction_id: str, api_key: str):
     headers = {"Authorization": f"Token {api_key}"}
     url = f"{REPLICATE_API_URL}/{prediction_id}/cancel"
     
-    with httpx.Client(timeout=10.0) as client:
-        client.post(url, headers=headers)
+    get_sync_client().post(url, headers=headers, timeout=request_timeout(10.0))
 
 def fetch_model_schema(model_ref: str, api_key: str) -> dict:
     """
@@ -80,20 +80,21 @@ def fetch_model_schema(model_ref: str, api_key: str) -> dict:
     if ":" in name:
         name, version_id = name.split(":", 1)
         
-    client = httpx.Client(timeout=15.0)
+    client = get_sync_client()
+    timeout = request_timeout(15.0)
     try:
         schema_src = {}
         
         if version_id:
             # Fetch specific version
             url = f"https://api.replicate.com/v1/models/{owner}/{name}/versions/{version_id}"
-            resp = client.get(url, headers=headers)
+            resp = client.get(url, headers=headers, timeout=timeout)
             if resp.status_code == 200:
                 schema_src = resp.json().get("openapi_schema", {})
         else:
             # Fetch latest
             url = f"https://api.replicate.com/v1/models/{owner}/{name}"
-            resp = client.get(url, headers=headers)
+            resp = client.get(url, headers=headers, timeout=timeout)
             if resp.status_code == 200:
                 latest = resp.json().get("latest_version")
                 if latest:
@@ -156,5 +157,3 @@ def fetch_model_schema(model_ref: str, api_key: str) -> dict:
     except Exception as e:
         logger.error(f"Schema Fetch Error: {e}")
         raise ReplicateError(f"Failed to fetch schema: {e}")
-    finally:
-        client.close()
@@ -0,0 +1,199 @@
+import os
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple
+from sqlalchemy import select
+from app.core.config import settings
+from app.core.redis import get_redis, get_async_redis
+from app.core.monitoring import register_metrics
+from app.domain.providers.models import ProviderConfig
+from app.domain.providers.router import ProviderFactory
+from app.domain.providers.service import decrypt_key
+from app.domain.providers.rate_limit import RateLimit
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "providers:invalidate"
+SUBSCRIBE_RETRY_SECONDS = 30
+
+
+@dataclass(frozen=True)
+class _ConfigEntry:
+    id: int
+    updated_at: Any
+    encrypted_api_key: str
+    rate_limit_per_second: Optional[float] = None
+    rate_limit_burst: Optional[int] = None
+
+    @property
+    def key(self) -> Tuple[int, Any]:
+        return (self.id, self.updated_at)
+
+
+class ProviderSnapshot:
+    """
+    Active provider configs as loaded at one point in time.
+    Services are resolved through the owning cache, so they are built once per config version.
+    """
+
+    def __init__(self, cache: "ProviderServiceCache", entries: Dict[str, _ConfigEntry]):
+        self._cache = cache
+        self.entries = entries
+        self.loaded_at = time.monotonic()
+
+    def get_service(self, provider_id: str) -> Any:
+        entry = self.entries.get(provider_id)
+        if not entry:
+            raise ValueError(f"No active configuration for provider '{provider_id}'")
+        return self._cache._service_for(provider_id, entry)
+
+    def rate_limit(self, provider_id: str) -> Optional[RateLimit]:
+        """Submission limit for the provider's current API key, or None if unlimited."""
+        entry = self.entries.get(provider_id)
+        if not entry or not entry.rate_limit_per_second:
+            return None
+        service = self.get_service(provider_id)
+        return RateLimit.for_key(provider_id, getattr(service, "api_key", entry.encrypted_api_key),
+                                 entry.rate_limit_per_second, entry.rate_limit_burst)
+
+
+class ProviderServiceCache:
+    """
+    Per-process cache of ready-to-use provider services for job workers.
+    - Active configs are loaded at most once per TTL (one query instead of one per job).
+    - Service instances (decrypted key, normalizers) are keyed by (config id, updated_at).
+    - Admin provider CRUD publishes on INVALIDATION_CHANNEL; a subscriber thread drops the
+      snapshot immediately. Without Redis, the TTL bounds staleness.
+    """
+
+    def __init__(self, ttl: int = 300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._snapshot: Optional[ProviderSnapshot] = None
+        self._services: Dict[Tuple[int, Any], Any] = {}
+        self._subscriber = None
+        self._subscribe_after = 0.0
+        self.stats = {"hits": 0, "loads": 0, "services_built": 0, "invalidations": 0, "subscriber_errors": 0}
+
+    # --- Loading ---
+
+    def load(self, session) -> ProviderSnapshot:
+        """Returns the active provider snapshot, querying via a sync session only when stale."""
+        snap = self._fresh_snapshot()
+        if snap is not None:
+            return snap
+        rows = session.execute(select(ProviderConfig).where(ProviderConfig.is_active == True)).scalars().all()
+        return self._store(rows)
+
+    async def load_async(self, session) -> ProviderSnapshot:
+        snap = self._fresh_snapshot()
+        if snap is not None:
+            return snap
+        rows = (await session.execute(select(ProviderConfig).where(ProviderConfig.is_active == True))).scalars().all()
+        return self._store(rows)
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self.stats["invalidations"] += 1
+
+    def _fresh_snapshot(self) -> Optional[ProviderSnapshot]:
+        if self._pid != os.getpid():
+            # Forked child: the parent's subscriber thread and sockets are not ours
+            with self._lock:
+                self._reset()
+        self._ensure_subscriber()
+        snap = self._snapshot
+        if snap is not None and time.monotonic() - snap.loaded_at < self.ttl:
+            self.stats["hits"] += 1
+            return snap
+        return None
+
+    def _store(self, rows) -> ProviderSnapshot:
+        entries = {
+            cfg.provider_id: _ConfigEntry(cfg.id, cfg.updated_at, cfg.encrypted_api_key,
+                                          cfg.rate_limit_per_second, cfg.rate_limit_burst)
+            for cfg in rows if cfg.is_active
+        }
+        snap = ProviderSnapshot(self, entries)
+        live = {e.key for e in entries.values()}
+        with self._lock:
+            self._snapshot = snap
+            # Drop services of deleted/rotated configs
+            self._services = {k: v for k, v in self._services.items() if k in live}
+            self.stats["loads"] += 1
+        return snap
+
+    def _service_for(self, provider_id: str, entry: _ConfigEntry) -> Any:
+        service = self._services.get(entry.key)
+        if service is None:
+            service = ProviderFactory.create_service(provider_id, decrypt_key(entry.encrypted_api_key))
+            with self._lock:
+                self._services[entry.key] = service
+                self.stats["services_built"] += 1
+        return service
+
+    # --- Push Invalidation ---
+
+    def _ensure_subscriber(self):
+        if self._subscriber is not None or time.monotonic() < self._subscribe_after:
+            return
+        client = get_redis()
+        if client is None:
+            return
+        with self._lock:
+            if self._subscriber is not None:
+                return
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{INVALIDATION_CHANNEL: self._on_message})
+                self._subscriber = pubsub.run_in_thread(
+                    sleep_time=1.0, daemon=True, exception_handler=self._on_subscriber_error
+                )
+            except Exception as e:
+                self.stats["subscriber_errors"] += 1
+                self._subscribe_after = time.monotonic() + SUBSCRIBE_RETRY_SECONDS
+                logger.warning(f"Provider cache invalidation subscriber unavailable: {e}")
+
+    def _on_message(self, message):
+        logger.info(f"Provider config changed ({message.get('data')}), dropping provider cache")
+        self.invalidate()
+
+    def _on_subscriber_error(self, exc, pubsub, thread):
+        # Messages may have been missed: drop the snapshot and resubscribe on next load
+        logger.warning(f"Provider cache subscriber failed: {exc}")
+        self.stats["subscriber_errors"] += 1
+        thread.stop()  # The worker thread closes the pubsub connection on exit
+        self._subscriber = None
+        self._subscribe_after = time.monotonic() + SUBSCRIBE_RETRY_SECONDS
+        self.invalidate()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        snap = self._snapshot
+        stats["providers"] = sorted(snap.entries) if snap else []
+        stats["services"] = len(self._services)
+        stats["subscribed"] = self._subscriber is not None
+        return stats
+
+
+async def publish_provider_change(provider_id: str):
+    """Called by admin provider CRUD after commit; tells every worker to reload provider configs."""
+    client = get_async_redis()
+    if client is None:
+        return
+    try:
+        await client.publish(INVALIDATION_CHANNEL, provider_id)
+    except Exception as e:
+        logger.warning(f"Failed to publish provider config change: {e}")
+
+
+provider_services = ProviderServiceCache(ttl=settings.PROVIDER_CACHE_TTL_SECONDS)
+
+register_metrics("provider_services", provider_services.get_stats)
@@ -0,0 +1,46 @@
+from typing import Any, Dict, Optional
+
+
+class ProviderHTTPError(IOError):
+    """
+    Non-success response from a provider API, with the parts the retry policy needs.
+    Subclasses IOError so existing `except IOError` handlers keep working.
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None, body: Any = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.body = body
+
+    @classmethod
+    def from_response(cls, provider: str, resp) -> "ProviderHTTPError":
+        try:
+            body: Any = resp.json()
+        except Exception:
+            body = resp.text
+        return cls(
+            f"{provider} API returned {resp.status_code}: {resp.text}",
+            status_code=resp.status_code,
+            retry_after=parse_retry_after(resp.headers.get("retry-after")),
+            body=body,
+        )
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After as seconds; accepts delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    from datetime import datetime, timezone
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
@@ -1,7 +1,7 @@
 
 import uuid
 import datetime
-from sqlalchemy import String, Integer, DateTime, Text, Boolean, JSON, UUID
+from sqlalchemy import String, Integer, Float, DateTime, Text, Boolean, JSON, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 from app.core.db import Base
@@ -18,6 +18,10 @@ class ProviderConfig(Base):
     status: Mapped[str] = mapped_column(String, default="not_tested") # "valid", "invalid", "not_tested"
     last_tested_at: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # Submission rate limit per API key (token bucket); NULL = unlimited
+    rate_limit_per_second: Mapped[float | None] = mapped_column(Float, nullable=True)
+    rate_limit_burst: Mapped[int | None] = mapped_column(Integer, nullable=True)
     
     created_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
@@ -0,0 +1,185 @@
+import io
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from PIL import Image, ImageOps
+from app.core.config import settings
+from app.core.monitoring import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# Formats browsers display natively; anything else is always re-encoded
+WEB_FORMATS = {"JPEG": ("jpg", "image/jpeg"), "PNG": ("png", "image/png"), "WEBP": ("webp", "image/webp"),
+               "GIF": ("gif", "image/gif")}
+ORIENTATION_TAG = 0x0112
+
+
+@dataclass
+class TransformPolicy:
+    output_format: str = "JPEG"  # "JPEG" (progressive) or "WEBP"; images with alpha always use WEBP
+    jpeg_quality: int = 85
+    webp_quality: int = 82
+    max_dimension: int = 4096  # Longer side; larger images are downscaled
+    passthrough_max_bytes: int = 512 * 1024  # Web-format originals this small are kept untouched
+    min_savings: float = 0.1  # A re-encode must be at least this much smaller than the original
+    min_decode_width: int = 0  # Width callers need from the decoded image (e.g. largest rendition)
+
+    @classmethod
+    def from_settings(cls) -> "TransformPolicy":
+        return cls(
+            output_format=settings.IMAGE_OUTPUT_FORMAT.upper(),
+            jpeg_quality=settings.IMAGE_JPEG_QUALITY,
+            webp_quality=settings.IMAGE_WEBP_QUALITY,
+            max_dimension=settings.IMAGE_MAX_DIMENSION,
+            passthrough_max_bytes=settings.IMAGE_PASSTHROUGH_MAX_KB * 1024,
+            min_savings=settings.IMAGE_MIN_SAVINGS,
+        )
+
+
+@dataclass
+class TransformResult:
+    body: bytes
+    ext: str
+    content_type: str
+    width: Optional[int]
+    height: Optional[int]
+    original_size: int
+    strategy: str  # "passthrough" | "reencode" | "downscale"
+    # Decoded pixels (possibly at reduced scale) for further work such as renditions; caller closes
+    image: Optional[Image.Image] = field(default=None, repr=False)
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.original_size - len(self.body)
+
+
+class ImageTransformEngine:
+    """
+    Turns a provider image into the stored original with a single decode.
+    - The header is read first. Small web-format originals within the size limit are
+      kept byte for byte. Animated images are kept too.
+    - Otherwise the image is decoded once. JPEGs use draft mode (libjpeg DCT scaling)
+      and resize uses reducing_gap, so large downscales never work at full resolution.
+      The result is encoded per the policy.
+    - A re-encode that does not save at least ``min_savings`` is discarded in favour
+      of the original, when the original is a web format and needs no downscale.
+    The decoded image is handed back so renditions do not decode again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {"images": 0, "passthrough": 0, "reencode": 0, "downscale": 0,
+                      "bytes_in": 0, "bytes_out": 0}
+
+    def transform(self, content: bytes, policy: Optional[TransformPolicy] = None,
+                  record: bool = True) -> TransformResult:
+        """
+        Raises if the content cannot be decoded. Callers running this in a media pool worker
+        pass ``record=False`` and call ``record`` in their own process, where metrics are read.
+        """
+        policy = policy or TransformPolicy.from_settings()
+        img = Image.open(io.BytesIO(content))
+        try:
+            result = self._transform(img, content, policy)
+        except Exception:
+            img.close()
+            raise
+        if record:
+            self.record(result)
+        return result
+
+    def _transform(self, img: Image.Image, content: bytes, policy: TransformPolicy) -> TransformResult:
+        src_format = img.format
+        width, height = img.size
+        # EXIF is only looked at when already parsed from the header (PNG would decode for it)
+        rotated = "exif" in img.info and img.getexif().get(ORIENTATION_TAG, 1) in (5, 6, 7, 8)
+        if rotated:
+            width, height = height, width  # Displayed size
+        oversized = max(width, height) > policy.max_dimension
+        web = src_format in WEB_FORMATS
+        animated = getattr(img, "n_frames", 1) > 1
+
+        if web and (animated or (not oversized and len(content) <= policy.passthrough_max_bytes)):
+            # Kept as is: no decode at all, or only as much as later steps need
+            if not policy.min_decode_width:
+                img.close()
+                return self._passthrough(content, src_format, width, height, None)
+            self._decode(img, policy.min_decode_width, rotated)
+            ImageOps.exif_transpose(img, in_place=True)
+            return self._passthrough(content, src_format, width, height, img)
+
+        target = self._fit(width, height, policy.max_dimension) if oversized else (width, height)
+        decoded = self._decode(img, max(target[0], policy.min_decode_width), rotated)
+        ImageOps.exif_transpose(decoded, in_place=True)
+        if oversized and decoded.size != target:
+            target = self._fit(decoded.width, decoded.height, policy.max_dimension)
+            decoded = decoded.resize(target, Image.LANCZOS, reducing_gap=3.0)
+
+        fmt = "WEBP" if self._has_alpha(decoded) and policy.output_format == "JPEG" else policy.output_format
+        body = self._encode(decoded, fmt, policy, img.info.get("icc_profile"))
+
+        if web and not oversized and len(body) > len(content) * (1 - policy.min_savings):
+            # Re-encoding would not pay for itself (or would even grow the file)
+            return self._passthrough(content, src_format, width, height, decoded)
+
+        ext, content_type = WEB_FORMATS[fmt]
+        return TransformResult(body=body, ext=ext, content_type=content_type, width=decoded.width,
+                               height=decoded.height, original_size=len(content),
+                               strategy="downscale" if oversized else "reencode", image=decoded)
+
+    @staticmethod
+    def _decode(img: Image.Image, min_width: int, rotated: bool) -> Image.Image:
+        if min_width and img.format == "JPEG":
+            # libjpeg scales by 1/2, 1/4 or 1/8 while decoding, never below the request.
+            # min_width is the displayed width, i.e. the stored height of a rotated image.
+            scale = min_width / (img.height if rotated else img.width)
+            if scale < 1:
+                img.draft(img.mode, (int(img.width * scale) + 1, int(img.height * scale) + 1))
+        img.load()
+        return img
+
+    @staticmethod
+    def _fit(width: int, height: int, limit: int):
+        ratio = limit / max(width, height)
+        return max(1, round(width * ratio)), max(1, round(height * ratio))
+
+    @staticmethod
+    def _has_alpha(img: Image.Image) -> bool:
+        return img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+
+    @staticmethod
+    def _encode(img: Image.Image, fmt: str, policy: TransformPolicy, icc_profile: Optional[bytes]) -> bytes:
+        buf = io.BytesIO()
+        extra = {"icc_profile": icc_profile} if icc_profile else {}
+        if fmt == "JPEG":
+            img.convert("RGB").save(buf, format="JPEG", quality=policy.jpeg_quality, optimize=True,
+                                    progressive=True, **extra)
+        else:
+            frame = img.convert("RGBA" if ImageTransformEngine._has_alpha(img) else "RGB")
+            frame.save(buf, format="WEBP", quality=policy.webp_quality, method=4, **extra)
+        return buf.getvalue()
+
+    @staticmethod
+    def _passthrough(content: bytes, src_format: str, width: int, height: int,
+                     image: Optional[Image.Image]) -> TransformResult:
+        ext, content_type = WEB_FORMATS[src_format]
+        return TransformResult(body=content, ext=ext, content_type=content_type, width=width, height=height,
+                               original_size=len(content), strategy="passthrough", image=image)
+
+    def record(self, result: TransformResult):
+        with self._lock:
+            self.stats["images"] += 1
+            self.stats[result.strategy] += 1
+            self.stats["bytes_in"] += result.original_size
+            self.stats["bytes_out"] += len(result.body)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_out"]
+        return stats
+
+
+image_engine = ImageTransformEngine()
+
+register_metrics("image_transform", image_engine.get_stats)
@@ -4,48 +4,159 @@ import subprocess
 import os
 import requests
 import io
-from typing import Optional, Tuple
+import json
+import struct
+from typing import Any, Dict, Optional, Tuple
 from PIL import Image
+from app.domain.providers.normalization.image_transform import TransformPolicy, image_engine
 
 logger = logging.getLogger(__name__)
 
 class MediaProcessor:
     """
     Handles media specific operations:
-    - Thumbnail generation
+    - Video probing, poster frames and preview loops (local files)
+    - Fast-start remux and HLS segmenting (stream copy)
     - Waveform generation
     - Image optimization/normalization
     """
 
-    def generate_video_thumbnail(self, video_url: str) -> Optional[str]:
+    def probe_video(self, path: str, timeout: float = 30) -> Optional[Dict[str, Any]]:
         """
-        Downloads video, extracts a frame using ffmpeg, returns local path or URL.
+        Reads duration and display dimensions of a local video with ffprobe.
+        Returns None if the file cannot be probed.
         """
+        cmd = [
+            "ffprobe", "-v", "error",
+            "-print_format", "json",
+            "-show_format", "-show_streams",
+            path
+        ]
         try:
-             with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp_vid:
-                 self._download_file(video_url, tmp_vid.name)
-                 
-                 out_path = tmp_vid.name + "_thumb.jpg"
-                 
-                 cmd = [
-                     "ffmpeg", "-y",
-                     "-ss", "00:00:01",
-                     "-i", tmp_vid.name,
-                     "-vframes", "1",
-                     "-q:v", "2", 
-                     out_path
-                 ]
-                 
-                 subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-                 
-                 if os.path.exists(out_path):
-                      return f"file://{out_path}" # In prod, upload this to S3
-                 
-                 return None
-                     
+            out = self._run(cmd, timeout).stdout
+            data = json.loads(out or b"{}")
         except Exception as e:
-            logger.error(f"Thumbnail generation failed: {e}")
+            logger.error(f"ffprobe failed: {e}")
+            return None
+
+        video = next((st for st in data.get("streams", []) if st.get("codec_type") == "video"), None)
+        if video is None:
             return None
+        width, height = video.get("width"), video.get("height")
+        # Phone footage stores portrait frames as rotated landscape
+        if abs(self._rotation(video)) in (90, 270):
+            width, height = height, width
+        duration = data.get("format", {}).get("duration") or video.get("duration")
+        return {
+            "duration": float(duration) if duration else None,
+            "width": width,
+            "height": height,
+            "codec": video.get("codec_name"),
+            "has_audio": any(st.get("codec_type") == "audio" for st in data.get("streams", [])),
+        }
+
+    def extract_poster(self, path: str, out_path: str, at_seconds: float = 1.0, width: int = 1280,
+                       timeout: float = 60):
+        """Writes one frame (JPEG or WebP, by out_path extension) scaled to at most ``width``."""
+        cmd = [
+            "ffmpeg", "-y", "-v", "error",
+            "-ss", f"{at_seconds:.3f}",
+            "-i", path,
+            "-frames:v", "1",
+            "-vf", f"scale='min({width},iw)':-2",
+        ]
+        if out_path.endswith(".webp"):
+            cmd += ["-c:v", "libwebp", "-quality", "80"]
+        else:
+            cmd += ["-q:v", "3"]
+        self._run(cmd + [out_path], timeout)
+
+    def make_preview(self, path: str, out_path: str, seconds: float = 4.0, width: int = 480,
+                     fps: int = 15, crf: int = 32, timeout: float = 120):
+        """Writes a short silent low-bitrate H.264 loop from the start of the video."""
+        cmd = [
+            "ffmpeg", "-y", "-v", "error",
+            "-t", f"{seconds:.3f}",
+            "-i", path,
+            "-an",
+            "-vf", f"fps={fps},scale='min({width},iw)':-2",
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", str(crf),
+            "-pix_fmt", "yuv420p",
+            "-movflags", "+faststart",
+            out_path
+        ]
+        self._run(cmd, timeout)
+
+    @staticmethod
+    def is_faststart(path: str) -> bool:
+        """True if the MP4 index (moov) precedes the media data (mdat), i.e. playback can start early."""
+        try:
+            with open(path, "rb") as f:
+                for _ in range(64):
+                    header = f.read(8)
+                    if len(header) < 8:
+                        return False
+                    size = struct.unpack(">I", header[:4])[0]
+                    box = header[4:8]
+                    if box == b"moov":
+                        return True
+                    if box == b"mdat":
+                        return False
+                    if size == 1:
+                        size = struct.unpack(">Q", f.read(8))[0]
+                        f.seek(size - 16, os.SEEK_CUR)
+                    elif size == 0:
+                        return False
+                    else:
+                        f.seek(size - 8, os.SEEK_CUR)
+        except Exception:
+            return False
+        return False
+
+    def remux_faststart(self, path: str, out_path: str, timeout: float = 120):
+        """Moves the moov atom to the front. Stream copy: no re-encode, quality untouched."""
+        cmd = [
+            "ffmpeg", "-y", "-v", "error",
+            "-i", path,
+            "-map", "0", "-c", "copy",
+            "-movflags", "+faststart",
+            out_path
+        ]
+        self._run(cmd, timeout)
+
+    def segment_hls(self, path: str, out_dir: str, segment_seconds: float = 6.0, timeout: float = 300) -> str:
+        """Splits a video into a VOD HLS playlist plus MPEG-TS segments (stream copy). Returns the playlist path."""
+        playlist = os.path.join(out_dir, "index.m3u8")
+        cmd = [
+            "ffmpeg", "-y", "-v", "error",
+            "-i", path,
+            "-c", "copy",
+            "-f", "hls",
+            "-hls_time", f"{segment_seconds:g}",
+            "-hls_playlist_type", "vod",
+            "-hls_segment_filename", os.path.join(out_dir, "seg_%05d.ts"),
+            playlist
+        ]
+        self._run(cmd, timeout)
+        return playlist
+
+    @staticmethod
+    def _rotation(stream: Dict[str, Any]) -> int:
+        for side in stream.get("side_data_list", []) or []:
+            if "rotation" in side:
+                return int(side["rotation"])
+        try:
+            return int(stream.get("tags", {}).get("rotate", 0))
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def _run(cmd, timeout: float) -> subprocess.CompletedProcess:
+        try:
+            return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, timeout=timeout)
+        except subprocess.CalledProcessError as e:
+            stderr = (e.stderr or b"").decode(errors="replace")[-500:]
+            raise RuntimeError(f"{cmd[0]} exited with {e.returncode}: {stderr}") from e
 
     def generate_audio_waveform(self, audio_url: str) -> Optional[str]:
         try:
@@ -75,18 +186,13 @@ class MediaProcessor:
 
     def optimize_image(self, content: bytes, target_format="JPEG") -> bytes:
         """
-        Normalizes image content to specific format (default JPEG to save space/bandwidth).
+        Normalizes image content via the image transform engine: one decode, policy
+        quality, and the original is kept when re-encoding would not make it smaller.
         """
         try:
-            with Image.open(io.BytesIO(content)) as img:
-                if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
-                    img = img.convert('RGB')
-                else:
-                    img = img.convert('RGB')
-                
-                output_buffer = io.BytesIO()
-                img.save(output_buffer, format=target_format, quality=95)
-                return output_buffer.getvalue()
+            policy = TransformPolicy.from_settings()
+            policy.output_format = target_format.upper()
+            return image_engine.transform(content, policy).body
         except Exception as e:
             logger.error(f"Image optimization failed: {e}")
             raise e
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import logging
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.core.config import settings
+from app.core.redis import get_async_redis
+from app.core.monitoring import register_metrics
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = "prediction"
+TERMINAL_STATUSES = ("succeeded", "failed", "canceled")
+
+
+class PredictionLookupCache:
+    """
+    Coalesces provider prediction lookups.
+    - Within a process, concurrent lookups of one prediction share a single in-flight request
+      (per event loop, since futures are loop-bound).
+    - Across processes, results are shared through Redis: a short TTL while the prediction
+      is running, a long one once it is terminal.
+    """
+
+    def __init__(self, running_ttl: float = 2.0, terminal_ttl: float = 3600.0):
+        self.running_ttl = running_ttl
+        self.terminal_ttl = terminal_ttl
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = weakref.WeakKeyDictionary()
+        self.stats = {"lookups": 0, "coalesced": 0, "redis_hits": 0, "fetches": 0, "errors": 0}
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> Optional[Dict[str, Any]]:
+        self.stats["lookups"] += 1
+        inflight = self._inflight.setdefault(asyncio.get_running_loop(), {})
+        task = inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._load(key, fetch))
+            inflight[key] = task
+            task.add_done_callback(lambda t: inflight.pop(key, None) if inflight.get(key) is t else None)
+        # A cancelled waiter must not cancel the shared request
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, fetch) -> Optional[Dict[str, Any]]:
+        cached = await self._redis_get(key)
+        if cached is not None:
+            self.stats["redis_hits"] += 1
+            return cached
+
+        self.stats["fetches"] += 1
+        try:
+            result = await fetch()
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        if result is not None:
+            await self._redis_set(key, result)
+        return result
+
+    def ttl_for(self, result: Dict[str, Any]) -> float:
+        return self.terminal_ttl if result.get("status") in TERMINAL_STATUSES else self.running_ttl
+
+    async def _redis_get(self, key: str) -> Optional[Dict[str, Any]]:
+        client = get_async_redis()
+        if client is None:
+            return None
+        try:
+            raw = await client.get(f"{REDIS_PREFIX}:{key}")
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"Prediction cache read failed: {e}")
+            return None
+
+    async def _redis_set(self, key: str, result: Dict[str, Any]):
+        client = get_async_redis()
+        if client is None:
+            return
+        try:
+            ttl_ms = max(1, int(self.ttl_for(result) * 1000))
+            await client.set(f"{REDIS_PREFIX}:{key}", json.dumps(result, default=str), px=ttl_ms)
+        except Exception as e:
+            logger.warning(f"Prediction cache write failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        lookups = stats["lookups"]
+        stats["coalesced_ratio"] = round(stats["coalesced"] / lookups, 4) if lookups else 0.0
+        stats["redis_hit_ratio"] = round(stats["redis_hits"] / lookups, 4) if lookups else 0.0
+        # Share of lookups that did not reach the provider
+        stats["saved_ratio"] = round(1 - stats["fetches"] / lookups, 4) if lookups else 0.0
+        stats["in_flight"] = sum(len(v) for v in list(self._inflight.values()))
+        return stats
+
+
+prediction_cache = PredictionLookupCache(
+    running_ttl=settings.PREDICTION_CACHE_RUNNING_TTL_SECONDS,
+    terminal_ttl=settings.PREDICTION_CACHE_TERMINAL_TTL_SECONDS,
+)
+
+register_metrics("prediction_lookups", prediction_cache.get_stats)
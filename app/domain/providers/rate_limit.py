@@ -0,0 +1,177 @@
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.core.redis import get_redis, get_async_redis
+from app.core.monitoring import register_metrics
+
+logger = logging.getLogger(__name__)
+
+BUCKET_PREFIX = "ratelimit:bucket"
+STATS_PREFIX = "ratelimit:stats"
+
+# Token bucket with reservations. Tokens may go negative: a caller that cannot submit now
+# reserves the next free slot (up to max_reserve) and is told how long to wait for it, so
+# a spike is spread out at the configured rate instead of every job retrying at once.
+# Returns {wait_ms, reserved}. Server time keeps all workers on one clock.
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local max_reserve_ms = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+local wait = 0
+local reserved = 1
+if tokens < 1 then
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+    if wait > max_reserve_ms then
+        reserved = 0
+    end
+end
+if reserved == 1 then
+    tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) * 1000 / rate) + 60000)
+return {wait, reserved}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Limit for one provider API key (from ProviderConfig.rate_limit_*)."""
+    provider_id: str
+    bucket: str
+    rate: float
+    burst: int
+
+    @classmethod
+    def for_key(cls, provider_id: str, api_key: str, rate: float, burst: Optional[int]) -> "RateLimit":
+        # Keys are never stored in Redis, only a fingerprint
+        fingerprint = hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+        return cls(provider_id, f"{provider_id}:{fingerprint}", float(rate), max(1, int(burst or 1)))
+
+
+@dataclass(frozen=True)
+class Admission:
+    wait: float = 0.0       # Seconds until the job may submit; 0 means now
+    reserved: bool = True   # A token is held for the job at `wait`; if not, it must ask again
+
+
+class ProviderRateLimiter:
+    """
+    Redis token buckets consulted before provider submissions, shared by all workers.
+    Throttled jobs are rescheduled for their reserved slot instead of hitting the
+    provider and burning a retry on a 429. Without Redis, submissions are not limited.
+    """
+
+    def __init__(self, max_reserve: float = 300.0):
+        self.max_reserve = max_reserve
+        self._script = None
+        self.stats = {"admitted": 0, "throttled": 0, "deferred": 0, "errors": 0}
+
+    def acquire(self, limit: Optional[RateLimit]) -> Admission:
+        client = get_redis()
+        if limit is None or client is None:
+            return Admission()
+        try:
+            wait_ms, reserved = client.eval(TOKEN_BUCKET_LUA, 1, *self._args(limit))
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Rate limiter unavailable, submitting unthrottled: {e}")
+            return Admission()
+        admission = self._admission(wait_ms, reserved)
+        if admission.wait:
+            self._incr(client, limit.provider_id, {"throttled": 1})
+        return admission
+
+    async def acquire_async(self, limit: Optional[RateLimit]) -> Admission:
+        client = get_async_redis()
+        if limit is None or client is None:
+            return Admission()
+        try:
+            wait_ms, reserved = await client.eval(TOKEN_BUCKET_LUA, 1, *self._args(limit))
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Rate limiter unavailable, submitting unthrottled: {e}")
+            return Admission()
+        admission = self._admission(wait_ms, reserved)
+        if admission.wait:
+            await self._incr_async(limit.provider_id, {"throttled": 1})
+        return admission
+
+    def _args(self, limit: RateLimit):
+        return (f"{BUCKET_PREFIX}:{limit.bucket}", limit.rate, limit.burst, int(self.max_reserve * 1000))
+
+    def _admission(self, wait_ms, reserved) -> Admission:
+        if not wait_ms:
+            self.stats["admitted"] += 1
+            return Admission()
+        self.stats["throttled"] += 1
+        if not reserved:
+            self.stats["deferred"] += 1
+        return Admission(wait=int(wait_ms) / 1000, reserved=bool(reserved))
+
+    # --- Throttled Wait Metrics (aggregated in Redis across workers) ---
+
+    def record_wait(self, provider_id: str, throttled_since: float):
+        """Called when a throttled job finally submits."""
+        client = get_redis()
+        if client is not None:
+            self._incr(client, provider_id, self._wait_fields(throttled_since))
+
+    async def record_wait_async(self, provider_id: str, throttled_since: float):
+        await self._incr_async(provider_id, self._wait_fields(throttled_since))
+
+    @staticmethod
+    def _wait_fields(throttled_since: float) -> Dict[str, float]:
+        return {"throttled_jobs": 1, "wait_seconds_total": round(max(0.0, time.time() - float(throttled_since)), 3)}
+
+    def _incr(self, client, provider_id: str, fields: Dict[str, float]):
+        try:
+            pipe = client.pipeline(transaction=False)
+            for field, value in fields.items():
+                pipe.hincrbyfloat(f"{STATS_PREFIX}:{provider_id}", field, value)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Rate limiter stats write failed: {e}")
+
+    async def _incr_async(self, provider_id: str, fields: Dict[str, float]):
+        client = get_async_redis()
+        if client is None:
+            return
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                for field, value in fields.items():
+                    pipe.hincrbyfloat(f"{STATS_PREFIX}:{provider_id}", field, value)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Rate limiter stats write failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"process": dict(self.stats), "providers": {}}
+        client = get_redis()
+        if client is None:
+            return stats
+        try:
+            for key in client.scan_iter(match=f"{STATS_PREFIX}:*", count=100):
+                key = key.decode() if isinstance(key, bytes) else key
+                raw = client.hgetall(key)
+                values = {(k.decode() if isinstance(k, bytes) else k): float(v) for k, v in raw.items()}
+                jobs = values.get("throttled_jobs", 0)
+                values["avg_wait_seconds"] = round(values.get("wait_seconds_total", 0) / jobs, 3) if jobs else 0.0
+                stats["providers"][key[len(STATS_PREFIX) + 1:]] = values
+        except Exception as e:
+            stats["error"] = str(e)
+        return stats
+
+
+rate_limiter = ProviderRateLimiter(max_reserve=settings.PROVIDER_RATE_LIMIT_MAX_RESERVE_SECONDS)
+
+register_metrics("provider_rate_limits", rate_limiter.get_stats)
@@ -1,5 +1,6 @@
 import re
 import datetime
+from functools import lru_cache
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List
 from cryptography.fernet import Fernet
@@ -25,12 +26,16 @@ PROVIDERS_LIST = [
 # For MVP, we will generate a valid Fernet key from the SECRET_KEY padding.
 # In prod, this should be a stable env var.
 def _get_fernet() -> Fernet:
+    return _fernet_for(settings.SECRET_KEY)
+
+@lru_cache(maxsize=4)
+def _fernet_for(secret_key: str) -> Fernet:
     # Fernet key must be 32 url-safe base64-encoded bytes. 
     # This is a hack for MVP to reuse SECRET_KEY. 
     # Real App: settings.ENCRYPTION_KEY
     import base64
     import hashlib
-    key = hashlib.sha256(settings.SECRET_KEY.encode()).digest()
+    key = hashlib.sha256(secret_key.encode()).digest()
     key_b64 = base64.urlsafe_b64encode(key)
     return Fernet(key_b64)
 
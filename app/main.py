@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
@@ -5,12 +6,25 @@ from app.web.routers import i18n
 from app.webhooks import router as webhooks_main
 from app.webhooks import stripe as webhooks_stripe
 from app.core.monitoring import setup_monitoring_handler
+from app.core.redis import close_redis
+from app.core.http import http_clients
+from app.core.media_pool import media_pool
+from app.domain.jobs.events import job_event_hub
 
 app = FastAPI(title="ArtLine")
 
 @app.on_event("startup")
 async def startup_event():
     setup_monitoring_handler()
+    # Warm media workers per gunicorn worker (blocking spawn kept off the loop)
+    await asyncio.to_thread(media_pool.start)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_event_hub.close()
+    await close_redis()
+    await http_clients.aclose()
+    media_pool.shutdown()
 
 from app.web.middleware.guest import GuestMiddleware
 app.add_middleware(GuestMiddleware)
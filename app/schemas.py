@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, ConfigDict, Field, field_validator
+from pydantic import BaseModel, EmailStr, ConfigDict, Field, field_validator, ValidationInfo
 from typing import Optional
 from datetime import datetime
 import uuid
@@ -53,10 +53,15 @@ class JobPrivacyUpdate(BaseModel):
 class JobRead(BaseModel):
     id: str
     kind: str
+    # Declared before 'prompt' so clean_prompt can tell typed rows from legacy encoded ones
+    generation_params: Optional[dict] = None
     prompt: str
     status: str
     progress: int
     result_url: Optional[str] = None
+    signed_url: Optional[str] = None  # Presigned result_url (listings), when stored in our bucket
+    renditions: Optional[list[dict]] = None  # Downscaled copies: {width, height, format, url, ...}
+    thumbnail_url: Optional[str] = None  # Smallest rendition fitting the feed tile (listings)
     logs: Optional[str] = None
     
     # Owner Identity
@@ -76,6 +81,7 @@ class JobRead(BaseModel):
     height: Optional[int] = None
     duration: Optional[int] = None
     cover_image_url: Optional[str] = None
+    preview_url: Optional[str] = None
     credits_spent: int = 0
     
     # Social
@@ -94,10 +100,13 @@ class JobRead(BaseModel):
     
     @field_validator('prompt')
     @classmethod
-    def clean_prompt(cls, v: str) -> str:
+    def clean_prompt(cls, v: str, info: ValidationInfo) -> str:
         if not v:
             return v
-        # Clean internal format: [UUID] {JSON} | Prompt
+        # Typed rows store the plain prompt
+        if info.data.get("generation_params") is not None:
+            return v
+        # Legacy internal format: [UUID] {JSON} | Prompt
         if v.startswith("["):
             try:
                 end_sq = v.find("]")
@@ -178,6 +187,8 @@ class ProviderRead(BaseModel):
     provider_id: str
     env_vars: Optional[dict] = None
     is_active: bool
+    rate_limit_per_second: Optional[float] = None
+    rate_limit_burst: Optional[int] = None
     created_at: datetime
     
     model_config = ConfigDict(from_attributes=True)
@@ -186,11 +197,15 @@ class ProviderCreate(BaseModel):
     provider_id: str
     api_key: str  # Plaintext, will be encrypted
     env_vars: Optional[dict] = {}
+    rate_limit_per_second: Optional[float] = Field(None, gt=0)
+    rate_limit_burst: Optional[int] = Field(None, ge=1)
 
 class ProviderUpdate(BaseModel):
     api_key: Optional[str] = None
     env_vars: Optional[dict] = None
     is_active: Optional[bool] = None
+    rate_limit_per_second: Optional[float] = Field(None, gt=0)
+    rate_limit_burst: Optional[int] = Field(None, ge=1)
 
 # AI Model Schemas
 class AIModelRead(BaseModel):
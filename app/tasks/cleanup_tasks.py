@@ -11,7 +11,6 @@ from sqlalchemy import select, delete, create_engine
 from sqlalchemy.orm import Session
 from app.models import User, Job
 from app.core.config import settings
-import boto3
 from urllib.parse import urlparse
 
 
@@ -136,9 +135,9 @@ def delete_unverified_accounts():
                 # Archive S3 files
                 s3_keys_to_archive = []
                 for job in jobs:
-                    if job.result_url:
+                    for url in job.output_urls():
                         try:
-                            path = urlparse(job.result_url).path.lstrip('/')
+                            path = urlparse(url).path.lstrip('/')
                             if path:
                                 s3_keys_to_archive.append(path)
                         except Exception as e:
@@ -146,7 +145,11 @@ def delete_unverified_accounts():
                 
                 # Archive all S3 files
                 if s3_keys_to_archive and settings.AWS_ACCESS_KEY_ID:
-                    _archive_s3_files(s3_keys_to_archive)
+                    report = _archive_s3_files(s3_keys_to_archive, archive_id=f"user:{user.id}")
+                    if report.failed:
+                        # Keep the account (and its job rows) so the next run retries the files
+                        print(f"Archiving incomplete for {user.email}: {report.failed} files failed")
+                        continue
                 
                 # Delete user (cascade will delete jobs, ledger entries, etc.)
                 db.delete(user)
@@ -165,30 +168,23 @@ def delete_unverified_accounts():
 
 
 
-def _archive_s3_files(keys: list[str]):
+def _archive_s3_files(keys: list[str], archive_id: str | None = None):
     """Archive S3 files to 'deleted/' prefix (sync operation for Celery)"""
-    try:
-        s3 = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION
-        )
-        
-        for key in keys:
-            try:
-                source = {'Bucket': settings.AWS_BUCKET_NAME, 'Key': key}
-                dest_key = f"deleted/{key}"
-                
-                # Copy to deleted folder
-                s3.copy_object(CopySource=source, Bucket=settings.AWS_BUCKET_NAME, Key=dest_key)
-                
-                # Delete original
-                s3.delete_object(Bucket=settings.AWS_BUCKET_NAME, Key=key)
-                
-                print(f"Archived S3 object: {key} -> {dest_key}")
-            except Exception as e:
-                print(f"Failed to archive S3 object {key}: {e}")
-                
-    except Exception as e:
-        print(f"Failed to initialize S3 client for archiving: {e}")
+    from app.core.archive import bulk_archiver
+
+    report = bulk_archiver.archive(keys, archive_id=archive_id)
+    for batch in report.batches:
+        print(f"Archive batch {batch.index + 1}: {batch.deleted} archived, {batch.missing} missing, "
+              f"{len(batch.errors)} failed")
+    return report
+
+
+@shared_task(name="archive_s3_objects", acks_late=True)
+def archive_s3_objects(keys: list[str], archive_id: str | None = None):
+    """
+    Bulk-archives S3 objects off the web process (admin user deletion).
+    Redelivered after a worker crash; resumes from the archive checkpoint.
+    """
+    report = _archive_s3_files(keys, archive_id)
+    return {"total": report.total, "archived": report.archived, "failed": report.failed,
+            "resumed_from": report.resumed_from}
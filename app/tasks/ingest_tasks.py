@@ -0,0 +1,33 @@
+"""
+Celery tasks for ingesting provider outputs.
+Runs on its own queue (settings.INGEST_QUEUE) so slow or large downloads never hold
+web workers or job submission workers:
+    WORKER_QUEUE=ingest celery -A app.tasks.worker worker -Q ingest
+"""
+
+from celery import shared_task
+from app.core.config import settings
+
+
+@shared_task(name="ingest_job_output", bind=True, max_retries=settings.INGEST_MAX_RETRIES, acks_late=True)
+def ingest_job_output(self, job_id: str, source_url: str):
+    """
+    Downloads a job's output, transforms it and uploads it to S3, then updates the job.
+    Transient failures are retried with backoff; after that the job keeps the provider URL.
+    """
+    from app.domain.jobs.runner import SessionLocal
+    from app.domain.jobs.ingest import run_ingest, mark_ingest_failed
+    from app.domain.jobs.retry_policy import retry_policy, classify, PERMANENT
+
+    session = SessionLocal()
+    try:
+        return run_ingest(session, job_id, source_url)
+    except Exception as e:
+        session.rollback()
+        kind, _ = classify(e)
+        if kind != PERMANENT and self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=retry_policy.backoff(self.request.retries))
+        mark_ingest_failed(session, job_id, str(e))
+        return "failed"
+    finally:
+        session.close()
@@ -0,0 +1,55 @@
+"""
+Celery tasks for keeping running jobs in sync with providers.
+Scheduled tasks for:
+- Polling provider status of running jobs and finalizing lost webhooks
+- Verifying materialized user balances against the ledger
+"""
+
+import asyncio
+from celery import shared_task
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import NullPool
+from app.core.config import settings
+
+
+@shared_task(name="reconcile_running_jobs")
+def reconcile_running_jobs():
+    """
+    Periodic task (JOB_RECONCILE_INTERVAL_SECONDS).
+    Status endpoints only read the DB; this is the single place that polls providers.
+    """
+    return asyncio.run(_reconcile())
+
+
+async def _reconcile():
+    from app.core.http import http_clients
+    from app.core.redis import close_loop_redis
+    from app.domain.jobs.reconciler import job_reconciler
+
+    # Each run gets a fresh event loop, so pooled asyncpg, HTTP and Redis connections
+    # cannot be reused
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, poolclass=NullPool)
+    try:
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        return await job_reconciler.run_once(session_factory)
+    finally:
+        await http_clients.aclose_loop_client()
+        await close_loop_redis()
+        await engine.dispose()
+
+
+@shared_task(name="reconcile_user_balances")
+def reconcile_user_balances():
+    """Periodic task (BALANCE_RECONCILE_INTERVAL_SECONDS)."""
+    return asyncio.run(_reconcile_balances())
+
+
+async def _reconcile_balances():
+    from app.domain.billing.reconciler import balance_reconciler
+
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, poolclass=NullPool)
+    try:
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        return await balance_reconciler.run_once(session_factory)
+    finally:
+        await engine.dispose()
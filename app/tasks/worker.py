@@ -13,6 +13,8 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # Imported by the worker at startup (importing it here would be circular via runner)
+    include=["app.domain.jobs.executor"],
 )
 
 # Celery Beat Schedule for periodic tasks
@@ -27,13 +29,143 @@ celery_app.conf.beat_schedule = {
         'task': 'delete_unverified_accounts',
         'schedule': crontab(hour=2, minute=0),  # Daily at 02:00 UTC
     },
+    'reconcile-running-jobs': {
+        'task': 'reconcile_running_jobs',
+        'schedule': settings.JOB_RECONCILE_INTERVAL_SECONDS,
+        'options': {'expires': settings.JOB_RECONCILE_INTERVAL_SECONDS},  # Never pile up runs
+    },
+    'reconcile-user-balances': {
+        'task': 'reconcile_user_balances',
+        'schedule': settings.BALANCE_RECONCILE_INTERVAL_SECONDS,
+        'options': {'expires': settings.BALANCE_RECONCILE_INTERVAL_SECONDS},
+    },
 }
 
+# ============================================================================
+# JOB QUEUES
+# ============================================================================
+# Generation jobs are routed by owner type and model type so that bursts of guest
+# or video jobs cannot delay paying users' image jobs. Each queue gets its own worker:
+#   WORKER_QUEUE=jobs.user.image celery -A app.tasks.worker worker -Q jobs.user.image
+# Concurrency/prefetch for that worker come from settings.JOB_QUEUE_WORKERS.
+import os
+import json
+import time
+
+JOB_QUEUES = [
+    f"{settings.JOB_QUEUE_PREFIX}.{owner}.{kind}"
+    for owner in ("user", "guest")
+    for kind in ("image", "video")
+]
+JOB_QUEUE_WAIT_KEY = "jobs:queue_wait"  # Recent wait times per queue (Redis list)
+
+def job_queue(owner_type: str, model_type: str | None, model_id=None, model_ref: str | None = None) -> str | None:
+    """
+    Queue for a generation job, or None for Celery's default queue (routing disabled).
+    A model-specific route (JOB_QUEUE_MODEL_ROUTES) wins over owner/type routing.
+    """
+    if not settings.JOB_QUEUE_ROUTING_ENABLED:
+        return None
+    routes = settings.JOB_QUEUE_MODEL_ROUTES
+    for key in (str(model_id) if model_id else None, model_ref):
+        if key and key in routes:
+            return routes[key]
+    owner = "guest" if owner_type == "guest" else "user"
+    kind = "video" if model_type == "video" else "image"
+    return f"{settings.JOB_QUEUE_PREFIX}.{owner}.{kind}"
+
+def executor_queue(queue: str | None) -> str:
+    """
+    Queue for a job run by the async executor (JOB_EXECUTOR_MODE="async").
+    Routed jobs keep their isolation on "<queue>.async", consumed by --pool=threads workers;
+    unrouted jobs go to JOB_EXECUTOR_QUEUE.
+    """
+    return f"{queue}.async" if queue else settings.JOB_EXECUTOR_QUEUE
+
+WORKER_QUEUE = os.environ.get("WORKER_QUEUE")
+if WORKER_QUEUE:
+    _profile = settings.JOB_QUEUE_WORKERS.get(WORKER_QUEUE, {})
+    celery_app.conf.update(
+        worker_concurrency=_profile.get("concurrency"),
+        worker_prefetch_multiplier=_profile.get("prefetch", 1),
+        # With small prefetch, only ack after the job ran so a killed worker re-queues it
+        task_acks_late=True,
+    )
+
+def get_queue_stats() -> dict:
+    """Depth, oldest message age and recent wait times per job queue (Redis broker)."""
+    from app.core.redis import get_redis
+    client = get_redis()
+    if client is None:
+        return {}
+    queues = set(JOB_QUEUES) | set(settings.JOB_QUEUE_MODEL_ROUTES.values())
+    if settings.JOB_EXECUTOR_MODE == "async":
+        queues = {executor_queue(q) for q in queues} | {settings.JOB_EXECUTOR_QUEUE}
+    queues = sorted(queues | {settings.INGEST_QUEUE})
+    stats = {}
+    try:
+        pipe = client.pipeline(transaction=False)
+        for q in queues:
+            pipe.llen(q)
+            pipe.lindex(q, -1)  # kombu LPUSHes and BRPOPs: the oldest message is last
+            pipe.lrange(f"{JOB_QUEUE_WAIT_KEY}:{q}", 0, -1)
+        results = pipe.execute()
+    except Exception as e:
+        return {"error": str(e)}
+    now = time.time()
+    for i, q in enumerate(queues):
+        depth, oldest, waits = results[i * 3:i * 3 + 3]
+        waits = sorted(float(w) for w in waits)
+        stats[q] = {
+            "depth": depth,
+            "oldest_age_seconds": _message_age(oldest, now),
+            "wait_p50_seconds": round(waits[len(waits) // 2], 3) if waits else None,
+            "wait_p95_seconds": round(waits[int(len(waits) * 0.95)], 3) if waits else None,
+            "wait_samples": len(waits),
+        }
+    return stats
+
+def _message_age(raw, now: float):
+    if not raw:
+        return None
+    try:
+        enqueued_at = json.loads(raw).get("headers", {}).get("enqueued_at")
+        return round(now - float(enqueued_at), 3) if enqueued_at else None
+    except Exception:
+        return None
+
+from celery.signals import task_prerun
+
+@task_prerun.connect
+def record_queue_wait(task=None, **kwargs):
+    request = getattr(task, "request", None)
+    enqueued_at = getattr(request, "enqueued_at", None) or (getattr(request, "headers", None) or {}).get("enqueued_at")
+    queue = (getattr(request, "delivery_info", None) or {}).get("routing_key")
+    if not enqueued_at or not queue:
+        return
+    from app.core.redis import get_redis
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        key = f"{JOB_QUEUE_WAIT_KEY}:{queue}"
+        pipe = client.pipeline(transaction=False)
+        pipe.lpush(key, round(time.time() - float(enqueued_at), 3))
+        pipe.ltrim(key, 0, 199)
+        pipe.execute()
+    except Exception:
+        pass
+
+from app.core.monitoring import register_metrics
+register_metrics("job_queues", get_queue_stats)
+
 # Auto-discover tasks in the tasks module
 celery_app.autodiscover_tasks([
     "app.tasks.job_runner", 
     "app.domain.jobs.runner",
-    "app.tasks.cleanup_tasks"  # Email verification cleanup tasks
+    "app.tasks.cleanup_tasks",  # Email verification cleanup tasks
+    "app.tasks.reconcile_tasks",  # Running job and user balance reconciliation
+    "app.tasks.ingest_tasks",  # Output download/transform/upload (ingest queue)
 ])
 
 # Explicit import of runner module to ensure register
@@ -43,11 +175,25 @@ import app.domain.jobs.runner
 # Import ALL models to ensure SQLAlchemy registry is populated
 # This prevents "InvalidRequestError" when relationships are resolved
 # We use the worker_process_init signal to ensure this happens in every child process
-from celery.signals import worker_process_init
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
 
 @worker_process_init.connect
 def init_worker_process(**kwargs):
     import app.models
     print("Celery Worker Process Initialized: Models Loaded")
 
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    # Close pooled provider connections (keep-alive sockets) of this child
+    from app.core.http import http_clients
+    from app.core.media_pool import media_pool
+    http_clients.close_sync()
+    media_pool.shutdown()
+
+@worker_shutdown.connect
+def shutdown_worker(**kwargs):
+    # Thread-pool workers run the async executor loop in the main process
+    from app.domain.jobs.executor import job_executor
+    job_executor.shutdown()
+
 import app.models # Also import in parent for good measure
@@ -3,10 +3,11 @@ from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, update, delete
 import uuid
-import boto3
 
 from app.core.db import get_db
 from app.core.config import settings
+from app.core.storage import storage
+from app.core.media_pool import media_pool, MediaPoolBusy
 from app.core.deps import get_current_user
 from app.models import User, Job, AIModel, ProviderConfig, LedgerEntry
 from app.schemas import (
@@ -17,8 +18,13 @@ from app.schemas import (
     ModelPerformanceStats,
     ModelSchemaRequest
 )
-from app.domain.billing.service import get_user_balance, add_ledger_entry
+from app.domain.billing.service import add_ledger_entry
 from app.domain.providers.service import encrypt_key
+from app.domain.providers.cache import publish_provider_change
+from app.domain.catalog.service import CatalogService
+from app.domain.catalog.cache import spec_cache
+from app.domain.catalog.snapshot import catalog_snapshot
+from app.domain.providers.normalization.media_processor import MediaProcessor
 from datetime import datetime, timedelta
 
 router = APIRouter()
@@ -44,7 +50,7 @@ async def get_admin_stats(
     total_users = (await db.execute(select(func.count(User.id)))).scalar() or 0
     total_jobs = (await db.execute(select(func.count(Job.id)))).scalar() or 0
     active_jobs = (await db.execute(select(func.count(Job.id)).where(Job.status == "running"))).scalar() or 0
-    total_credits = (await db.execute(select(func.sum(LedgerEntry.amount)))).scalar() or 0
+    total_credits = (await db.execute(select(func.sum(User.balance)))).scalar() or 0
     
     # Global Performance (24h)
     one_day_ago = datetime.utcnow() - timedelta(days=1)
@@ -118,12 +124,11 @@ async def list_admin_users(
     
     output = []
     for u in users:
-        balance = await get_user_balance(db, u.id)
         output.append(UserWithBalance(
             id=u.id,
             email=u.email,
             is_admin=u.is_admin,
-            balance=balance,
+            balance=u.balance,
             created_at=u.created_at
         ))
     return output
@@ -140,13 +145,16 @@ async def grant_credits(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid user ID")
         
-    await add_ledger_entry(
-        db,
-        uid,
-        req.amount,
-        reason="admin_grant",
-        external_id=f"admin_grant_by_{current_admin.id}_{uuid.uuid4()}"
-    )
+    try:
+        await add_ledger_entry(
+            db,
+            uid,
+            req.amount,
+            reason="admin_grant",
+            external_id=f"admin_grant_by_{current_admin.id}_{uuid.uuid4()}"
+        )
+    except ValueError:
+        raise HTTPException(status_code=404, detail="User not found")
     return {"ok": True}
 
 # ============================================================================
@@ -180,11 +188,14 @@ async def create_provider(
         provider_id=req.provider_id,
         encrypted_api_key=encrypted,
         env_vars=req.env_vars,
+        rate_limit_per_second=req.rate_limit_per_second,
+        rate_limit_burst=req.rate_limit_burst,
         is_active=True
     )
     db.add(new_provider)
     await db.commit()
     await db.refresh(new_provider)
+    await publish_provider_change(new_provider.provider_id)
     return new_provider
 
 @router.put("/providers/{provider_id}", response_model=ProviderRead)
@@ -206,9 +217,16 @@ async def update_provider(
         
     if req.is_active is not None:
         p.is_active = req.is_active
+
+    # Explicit null clears the limit
+    if "rate_limit_per_second" in req.model_fields_set:
+        p.rate_limit_per_second = req.rate_limit_per_second
+    if "rate_limit_burst" in req.model_fields_set:
+        p.rate_limit_burst = req.rate_limit_burst
         
     await db.commit()
     await db.refresh(p)
+    await publish_provider_change(provider_id)
     return p
 
 @router.delete("/providers/{provider_id}")
@@ -223,12 +241,20 @@ async def delete_provider(
         
     await db.delete(p)
     await db.commit()
+    await publish_provider_change(provider_id)
     return {"ok": True}
 
 # ============================================================================
 # MODELS CRUD (New)
 # ============================================================================
 
+async def _rebuild_catalog_snapshot(db: AsyncSession):
+    # The change is already committed; a failed rebuild only delays catalog visibility
+    try:
+        await catalog_snapshot.rebuild(db)
+    except Exception as e:
+        print(f"Catalog snapshot rebuild failed: {e}")
+
 @router.get("/models", response_model=List[AIModelRead])
 async def list_admin_models(
     user: User = Depends(get_admin_user),
@@ -275,6 +301,7 @@ async def create_model(
     db.add(new_model)
     await db.commit()
     await db.refresh(new_model)
+    await _rebuild_catalog_snapshot(db)
     return new_model
 
 @router.get("/models/{model_id}", response_model=AIModelRead)
@@ -339,9 +366,14 @@ async def update_model(
     for key, value in update_data.items():
         setattr(m, key, value)
         
+    # Compiled UI specs depend on schema + ui_config
+    if "ui_config" in update_data or "raw_schema_json" in update_data:
+        await CatalogService().invalidate_model_async(m)
+        
     m.updated_at = datetime.utcnow()
     await db.commit()
     await db.refresh(m)
+    await _rebuild_catalog_snapshot(db)
     return m
 
 @router.delete("/models/{model_id}")
@@ -361,6 +393,8 @@ async def delete_model(
         
     await db.delete(m)
     await db.commit()
+    await spec_cache.invalidate_model_async(str(uid))
+    await _rebuild_catalog_snapshot(db)
     return {"ok": True}
 
 @router.post("/analyze-model")
@@ -397,28 +431,22 @@ async def upload_model_image(
              print(f"Upload rejected: {file.filename} (ext: {ext})")
              raise HTTPException(status_code=400, detail=f"Invalid image format: {ext}")
 
+        # Decoded in the media pool, never on the event loop
+        body = await file.read()
+        try:
+            width, height = await media_pool.run(MediaProcessor().get_image_dimensions, body)
+        except (MediaPoolBusy, TimeoutError):
+            raise HTTPException(status_code=503, detail="Image processing busy, please retry")
+        if not (width and height) and ext != "avif":  # AVIF decoding needs an optional Pillow plugin
+            raise HTTPException(status_code=400, detail="File is not a valid image")
+
         # Generate Key
         key = f"assets/models/{uuid.uuid4()}.{ext}"
         
-        # Upload
-        s3 = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION
-        )
-        
-        s3.upload_fileobj(
-            file.file,
-            settings.AWS_BUCKET_NAME,
-            key,
-            ExtraArgs={'ContentType': file.content_type}
-        )
-        
-        # Construct URL
+        # Upload (off the event loop)
         # Assumption: Bucket is public or we use CloudFront. 
         # Standard S3 URL style: https://bucket.s3.region.amazonaws.com/key
-        url = f"https://{settings.AWS_BUCKET_NAME}.s3.{settings.AWS_REGION}.amazonaws.com/{key}"
+        url = await storage.run(storage.put_bytes, key, body, file.content_type)
         
         return {"url": url}
 
@@ -537,8 +565,11 @@ async def fetch_model_schema_endpoint(
                 latest = result.get("raw_response", {}).get("latest_version", {})
                 if latest and "id" in latest:
                     m.version_id = latest["id"]
+                
+                await CatalogService().invalidate_model_async(m)
                     
             await db.commit()
+            await _rebuild_catalog_snapshot(db)
             
         return result
         
@@ -710,7 +741,7 @@ async def sync_global_stats(
 # SYSTEM HEALTH (New)
 # ============================================================================
 
-from app.core.monitoring import LOG_BUFFER, SystemMonitor
+from app.core.monitoring import LOG_BUFFER, SystemMonitor, collect_metrics
 
 @router.get("/system/logs")
 async def get_system_logs(
@@ -730,6 +761,15 @@ async def get_system_health(
     """
     return SystemMonitor.get_stats()
 
+@router.get("/system/metrics")
+async def get_system_metrics(
+    user: User = Depends(get_admin_user)
+):
+    """
+    Returns runtime counters (caches, pools) of the process serving this request.
+    """
+    return collect_metrics()
+
 # ============================================================================
 # ANALYTICS (New)
 # ============================================================================
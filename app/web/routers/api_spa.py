@@ -3,6 +3,7 @@ from typing import List, Optional, Any, Dict
 from pydantic import BaseModel
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, func, delete
 import uuid
@@ -12,15 +13,20 @@ from app.core.config import settings
 from app.core.deps import get_current_user_optional, get_current_user, get_current_admin_user
 from app.core.security import verify_password, create_access_token, get_password_hash
 from app.core.i18n import get_t
+from app.core.storage import storage
+from app.core.presign import presigner
 from app.models import User, Job, AIModel, ProviderConfig, LedgerEntry, GuestProfile
 from app.schemas import (
     UserContext, JobRead, JobRequestSPA, UserRead, UserCreate, 
     AdminStats, UserWithBalance, CreditGrantRequest, JobPrivacyUpdate,
     EmailVerificationSendRequest, EmailVerificationCodeRequest, EmailVerificationStatus
 )
-from app.domain.billing.service import get_user_balance, add_ledger_entry
+from app.domain.billing.service import add_ledger_entry
 from app.domain.jobs.service import create_job, get_user_jobs, get_public_jobs, get_review_jobs, delete_job, like_job, get_job_with_permission, get_admin_feed
-from app.domain.jobs.runner import process_job
+from app.domain.jobs.runner import enqueue_job
+from app.domain.jobs import renditions
+from app.tasks.worker import job_queue
+from app.domain.jobs.events import job_event_hub, owner_key, sse_stream
 from app.domain.users.guest_service import get_or_create_guest
 from app.domain.analytics.service import AnalyticsService
 import asyncio
@@ -112,8 +118,7 @@ async def spa_register(
             
             if guest_profile and guest_profile.balance > 0:
                 amount = guest_profile.balance
-                new_user.balance += amount
-                await add_ledger_entry(
+                await add_ledger_entry(  # Credits new_user.balance too
                     db, 
                     new_user.id, 
                     amount, 
@@ -260,11 +265,10 @@ async def get_me(
     Ensures guest ID exists if no user is logged in.
     """
     if isinstance(user, User):
-        balance = await get_user_balance(db, user.id)
         return UserContext(
             user=UserRead.model_validate(user), 
             is_guest=False,
-            balance=balance,
+            balance=user.balance,
             guest_id=None
         )
     
@@ -308,7 +312,8 @@ async def list_jobs(
     request: Request,
     user: User | object | None = Depends(get_current_user_optional),
     db: AsyncSession = Depends(get_db),
-    limit: int = 50
+    limit: int = 50,
+    tile: int = Query(settings.IMAGE_TILE_WIDTH, ge=64, le=4096)
 ):
     # Handle Guest Fallback
     if not user:
@@ -325,37 +330,59 @@ async def list_jobs(
     if not user:
         return []
 
-    return await get_user_jobs(db, user, limit)
+    return feed_items(await get_user_jobs(db, user, limit), tile)
+
+def feed_items(jobs, tile: int) -> list[JobRead]:
+    """
+    Listing rows with the smallest rendition that fills a ``tile``-px wide cell as
+    thumbnail_url, and presigned result URLs (one batch, cached signatures).
+    """
+    signed = presigner.sign_result_urls(j.result_url for j in jobs)
+    items = []
+    for j in jobs:
+        if j.kind == "video":
+            thumb_url = j.cover_image_url  # Poster frame
+        else:
+            thumb = renditions.pick(j.renditions, tile)
+            thumb_url = thumb["url"] if thumb else None
+        items.append(JobRead.model_validate(j).model_copy(update={
+            "signed_url": signed.get(j.result_url),
+            "thumbnail_url": thumb_url,
+        }))
+    return items
 
 @router.get("/gallery", response_model=list[JobRead])
 async def gallery_jobs(
     db: AsyncSession = Depends(get_db),
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    tile: int = Query(settings.IMAGE_TILE_WIDTH, ge=64, le=4096)
 ):
-    return await get_public_jobs(db, limit, offset)
+    return feed_items(await get_public_jobs(db, limit, offset), tile)
 
 @router.get("/admin/review", response_model=list[JobRead])
 async def admin_review_jobs(
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    tile: int = Query(settings.IMAGE_TILE_WIDTH, ge=64, le=4096)
 ):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Admin only")
-    return await get_review_jobs(db, limit, offset)
+    return feed_items(await get_review_jobs(db, limit, offset), tile)
 
 @router.get("/admin/feed", response_model=list[JobRead])
 async def admin_feed_jobs(
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
     limit: int = 30,
-    offset: int = 0
+    offset: int = 0,
+    tile: int = Query(settings.IMAGE_TILE_WIDTH, ge=64, le=4096)
 ):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Admin only")
-    return await get_admin_feed(db, limit, offset)
+    return feed_items(await get_admin_feed(db, limit, offset), tile)
 
 @router.post("/jobs", response_model=JobRead)
 async def create_spa_job(
@@ -397,16 +424,16 @@ async def create_spa_job(
     if not model:
         raise HTTPException(status_code=404, detail="Model not found")
 
-    # 2. Create Job
-    job, error = await create_job(db, user, req.kind, req.prompt, req.model_id, req.params)
+    # 2. Create Job: quote, credits, job and activity row commit together, once
+    job, error = await create_job(db, user, req.kind, req.prompt, req.model_id, req.params, model_obj=model)
     
     if error:
         code = "insufficient_credits" if "credits" in error else "validation_error"
         print(f"DEBUG: Job Creation Failed: {code} - {error}", flush=True)
+        # Rejected submissions still keep their quote for audit (nothing else was written)
+        await db.commit()
         raise HTTPException(status_code=400, detail={"code": code, "message": error})
         
-    process_job.delay(job.id)
-    
     real_user_id = user.id if isinstance(user, User) else None
     # If it's not a User but acts like one (Guest), we rely on cookie (handled inside log_activity) 
     # OR we pass it explicitly if we have the object.
@@ -419,10 +446,49 @@ async def create_spa_job(
         "generate", 
         details={"job_id": str(job.id), "model_id": req.model_id, "kind": req.kind},
         user_id=real_user_id,
-        request=request 
+        request=request,
+        commit=False
     )
+    await db.commit()
+
+    # Only after the commit, so the worker finds the job
+    owner_type = "user" if isinstance(user, User) else "guest"
+    enqueue_job(job.id, queue=job_queue(owner_type, model.type, model_id=model.id, model_ref=model.model_ref))
     return job
 
+@router.get("/jobs/stream")
+async def stream_jobs(
+    request: Request,
+    last_event_id: Optional[str] = Query(None),
+    user: User | object | None = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Server-Sent Events: status/progress/logs/result_url changes of the caller's jobs.
+    Resumes after the Last-Event-ID header (or ?last_event_id= for EventSource polyfills).
+    """
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    owner = owner_key(user_id=user.id) if isinstance(user, User) else owner_key(guest_id=user.id)
+    # Auth is done; do not hold a DB connection for the lifetime of the stream
+    await db.close()
+
+    try:
+        conn = await job_event_hub.connect(owner)
+    except Exception as e:
+        # Clients fall back to polling
+        raise HTTPException(status_code=503, detail=f"Job stream unavailable: {e}")
+
+    resume_from = request.headers.get("last-event-id") or last_event_id
+    backlog = await job_event_hub.replay(owner, resume_from) if resume_from else []
+
+    return StreamingResponse(
+        sse_stream(job_event_hub, conn, request, backlog),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/jobs/{job_id}", response_model=JobRead)
 async def get_job_status(
     request: Request,
@@ -453,36 +519,8 @@ async def get_job_status(
         print(f"DEBUG: Real Job GuestID={j_real} vs UserID={user.id if hasattr(user, 'id') else 'None'}", flush=True)
         raise HTTPException(status_code=404, detail="Job not found")
 
-    # Sync Logic: If job is running and is Replicate, maybe fetch live logs?
-    if job.status == "running" and job.provider == "replicate" and job.provider_job_id:
-         # We limit this to once every few seconds? 
-         # Or rely on frontend polling rate (2s) which is fine.
-         # Ideally we should cache this result for 1-2s in Redis to avoid spamming Replicate if multiple tabs open.
-         # For now, direct call (MVP).
-         try:
-             # We need ReplicateService
-             # Re-use dependency injection or manual init?
-             # get_replicate_client needs db session.
-             from app.domain.providers.replicate_service import get_replicate_client
-             service = await get_replicate_client(db)
-             
-             pred = await service.get_prediction(job.provider_job_id)
-             if pred:
-                 # Update logs and progress
-                 job.logs = pred.get("logs")
-                 
-                 # Optional: Auto-detect completion if webhook failed?
-                 if pred["status"] == "succeeded" and job.status != "succeeded":
-                     # We could finish it here, but let's stick to logs only for safe read-only
-                     pass
-                     
-                 # Update DB with logs so they persist
-                 # (Optional: might be heavy on write DB if logs are huge? Text is fine).
-                 await db.commit()
-         except Exception as e:
-             # Ignore transient errors during polling
-             pass
-    
+    # Status and logs of running jobs are kept current by the reconciler
+    # (app/domain/jobs/reconciler.py) and webhooks; no provider calls here.
     return job
 
 @router.delete("/jobs/{job_id}")
@@ -495,20 +533,20 @@ async def remove_job(
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    success, deleted_url = await delete_job(db, job_id, user)
+    success, deleted_urls = await delete_job(db, job_id, user)
     
     if not success:
          raise HTTPException(status_code=404, detail="Job not found")
          
-    # Trigger S3 deletion in background
-    if deleted_url:
-        from urllib.parse import urlparse
+    # Trigger S3 deletion in background (result and renditions)
+    for deleted_url in deleted_urls:
         try:
             # Extract key from URL
             # format: https://bucket.s3.region.amazonaws.com/path/to/key
-            path = urlparse(deleted_url).path.lstrip('/')
+            path = storage.key_from_url(deleted_url)
             if path:
-                background_tasks.add_task(archive_s3_object_bg, path)
+                # After the response, on the storage pool (not Starlette's shared threadpool)
+                background_tasks.add_task(storage.run, archive_s3_object_bg, path)
         except Exception as e:
             print(f"Error parsing S3 URL for deletion: {e}")
     
@@ -516,38 +554,11 @@ async def remove_job(
 
 # Renamed to strictly imply background usage (synchronous wrapper for boto3)
 def archive_s3_object_bg(key: str):
-    import boto3
-    from botocore.exceptions import ClientError
-
     if not settings.AWS_ACCESS_KEY_ID:
         return
-    try:
-        s3 = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION
-        )
-        
-        # Archiving Logic: Move to 'deleted/' prefix
-        # 1. Copy
-        source = {'Bucket': settings.AWS_BUCKET_NAME, 'Key': key}
-        dest_key = f"deleted/{key}"
-        print(f"DEBUG: Archiving S3 Object: {key} -> {dest_key}")
-        
-        s3.copy_object(CopySource=source, Bucket=settings.AWS_BUCKET_NAME, Key=dest_key)
-        
-        # 2. Delete Original
-        s3.delete_object(Bucket=settings.AWS_BUCKET_NAME, Key=key)
-        
-    except ClientError as e:
-         # If 404, maybe already deleted?
-         if e.response['Error']['Code'] == "404":
-             print(f"WARN: S3 Object {key} not found for archiving")
-         else:
-             print(f"ERROR: Failed to archive S3 object {key}: {e}")
-    except Exception as e:
-        print(f"ERROR: Failed to archive S3 object {key}: {e}")
+    # Archiving Logic: Move to 'deleted/' prefix
+    print(f"DEBUG: Archiving S3 Object: {key} -> deleted/{key}")
+    storage.archive(key)
 
 # Removed async wrapper as we use BackgroundTasks which runs in threadpool for sync functions
 # (FastAPI handles it if def is not async)
@@ -586,40 +597,14 @@ async def download_job(
     if not job or not job.result_url:
          raise HTTPException(status_code=404, detail="File not found")
 
-    # Generate Presigned URL
+    # Presigned download (cached per key/filename; provider URLs pending ingest pass through)
+    ext = job.result_url.split('?')[0].split('.')[-1]
+    filename = f"artline-{job_id[:8]}.{ext}"
     try:
-        # Extract Ext
-        ext = job.result_url.split('.')[-1]
-        filename = f"artline-{job_id[:8]}.{ext}"
-        
-        # Parse Key
-        from urllib.parse import urlparse
-        key = urlparse(job.result_url).path.lstrip('/')
-        
-        url = generate_presigned_url(key, filename)
-        return {"url": url}
+        return {"url": presigner.sign_result_url(job.result_url, filename)}
     except Exception as e:
         print(f"Presign Error: {e}")
-        # Fallback to direct URL if presign fails
-        return {"url": job.result_url}
-
-def generate_presigned_url(key: str, filename: str):
-    import boto3
-    s3 = boto3.client(
-        's3',
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=settings.AWS_REGION
-    )
-    return s3.generate_presigned_url(
-        'get_object',
-        Params={
-            'Bucket': settings.AWS_BUCKET_NAME,
-            'Key': key,
-            'ResponseContentDisposition': f'attachment; filename="{filename}"'
-        },
-        ExpiresIn=3600
-    )
+        raise HTTPException(status_code=503, detail="Download link unavailable, please retry")
 
 @router.post("/jobs/{job_id}/public")
 async def toggle_public(
@@ -726,6 +711,7 @@ async def toggle_like(
 
 from app.domain.catalog.service import CatalogService
 from app.domain.catalog.schemas import ModelUISpec
+from app.domain.catalog.snapshot import catalog_snapshot, etag_matches
 
 @router.get("/models/{model_id}/ui-spec", response_model=ModelUISpec)
 async def get_model_ui_spec(
@@ -761,51 +747,43 @@ async def get_model_ui_spec(
 
 
 @router.get("/models")
-async def list_models(db: AsyncSession = Depends(get_db)):
-    # Fetch active models
-    res = await db.execute(select(AIModel).where(AIModel.is_active == True))
-    models = res.scalars().all()
-    
-    # Use CatalogService to resolve authoritative parameters
-    from app.domain.catalog.service import CatalogService
-    catalog_service = CatalogService()
-    
-    data = []
-    for m in models:
-         # Resolve full spec (assuming 'starter' tier for public list)
-         spec = catalog_service.resolve_ui_spec(m, user_tier="starter")
-         
-         # Map spec.parameters to legacy 'inputs' format for frontend compatibility
-         inputs = []
-         for p in spec.parameters:
-             inputs.append({
-                 "name": p.id,
-                 "type": p.type,
-                 "description": p.description,
-                 "default": p.default,
-                 "required": p.required,
-                 "min": p.min,
-                 "max": p.max,
-                 "enum": [opt.value for opt in p.options] if p.options else None,
-                 "ui_group": p.group_id
-             })
-
-         # Extract defaults map
-         defaults = {p.id: p.default for p in spec.parameters if p.default is not None}
-
-         data.append({
-             "id": str(m.id),
-             "name": m.display_name,
-             "description": m.description,
-             "provider": m.provider,
-             "cover_image": m.cover_image_url,
-             "inputs": inputs, # Authoritative inputs from CatalogService
-             "defaults": defaults,
-             "credits": m.credits_per_generation,
-             "capabilities": m.capabilities or [],
-             "ui_config": m.ui_config or {}
-         })
-    return data
+async def list_models(
+    request: Request,
+    view: str = Query("full", pattern="^(full|lite)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Public catalog, served from the materialized snapshot.
+    view=lite omits inputs/defaults/ui_config; fetch them per model via GET /models/{model_id}.
+    """
+    snapshot = await catalog_snapshot.get(db)
+    body = snapshot.full if view == "full" else snapshot.lite
+    return _snapshot_response(request, body, snapshot.etags[view])
+
+
+@router.get("/models/{model_id}")
+async def get_catalog_model(
+    request: Request,
+    model_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Full catalog entry of a single model (lazy detail for the lite listing).
+    """
+    snapshot = await catalog_snapshot.get(db)
+    body = snapshot.models.get(model_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Model not found")
+    return _snapshot_response(request, body, snapshot.model_etags[model_id])
+
+
+def _snapshot_response(request: Request, body: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        catalog_snapshot.stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    catalog_snapshot.stats["served"] += 1
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 
@@ -854,23 +832,23 @@ async def admin_delete_user(
         
         s3_keys = []
         for j in jobs:
-            if j.result_url:
+            for url in j.output_urls():
                 try:
-                    path = urlparse(j.result_url).path.lstrip('/')
+                    path = urlparse(url).path.lstrip('/')
                     if path:
                         s3_keys.append(path)
                 except:
                     pass
         
-        # S3 Cleanup (Sync in thread)
+        # S3 Cleanup (bulk archive on a worker; resumable)
         if s3_keys and settings.AWS_ACCESS_KEY_ID:
-             import threading
-             def archive_batch(keys):
-                 for key in keys:
-                     archive_s3_object_bg(key)
-             
-             t = threading.Thread(target=archive_batch, args=(s3_keys,))
-             t.start()
+             from app.tasks.cleanup_tasks import archive_s3_objects
+             try:
+                 archive_s3_objects.delay(s3_keys, f"user:{user_id}")
+             except Exception as e:
+                 print(f"Failed to enqueue S3 archive, archiving in process: {e}")
+                 from app.core.archive import bulk_archiver
+                 storage.submit(bulk_archiver.archive, s3_keys, f"user:{user_id}")
 
         # Delete User (Cascade deletes Jobs, Ledger, etc)
         await db.delete(target_user)
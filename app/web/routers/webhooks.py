@@ -2,20 +2,15 @@ from fastapi import APIRouter, Request, Depends, BackgroundTasks, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.core.db import get_db
-from app.models import Job, User
+from app.models import Job
+from app.domain.billing.service import fail_and_release
+from app.domain.jobs.events import publish_job_event
+from app.domain.jobs.ingest import ingest_enabled, enqueue_ingest
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-import httpx
-import os
-import boto3
-import asyncio
-import io
-from PIL import Image
-from app.core.config import settings
-
 # ...
 
 @router.post("/webhooks/replicate")
@@ -40,6 +35,11 @@ async def replicate_webhook(
     if not job:
         logger.warning(f"Job not found for provider_id: {provider_job_id}")
         return {"ok": False, "reason": "Job not found"}
+
+    # Duplicate deliveries must not refund twice
+    if job.status in ["succeeded", "failed"]:
+        logger.info(f"Job {job.id} already {job.status}. Ignoring update.")
+        return {"ok": True}
         
     if status == "succeeded":
         job.status = "succeeded"
@@ -52,141 +52,34 @@ async def replicate_webhook(
             download_url = output
             
         if download_url:
-            try:
-                # DEBUG LOGGING - Using print to force stdout
-                print(f"DEBUG: Processing succeeded job {job.id}", flush=True)
-                print(f"DEBUG: AWS Config Check - Bucket: {settings.AWS_BUCKET_NAME}, Region: {settings.AWS_REGION}, KeyID Present: {bool(settings.AWS_ACCESS_KEY_ID)}", flush=True)
-
-                # 1. Download Content
-                async with httpx.AsyncClient() as client:
-                    resp = await client.get(download_url, follow_redirects=True, timeout=60.0)
-                    
-                    if resp.status_code == 200:
-                        file_content = resp.content
-                        print(f"DEBUG: Downloaded {len(file_content)} bytes", flush=True)
-                        
-                        # 2. Normalize & Upload to S3
-                        if settings.AWS_ACCESS_KEY_ID and settings.AWS_BUCKET_NAME:
-                            ext = "jpg" # Default normalized format
-                            content_to_upload = file_content
-                            content_type = "image/jpeg"
-
-                            if job.kind == "video":
-                                ext = "mp4"
-                                content_type = "video/mp4"
-                            else:
-                                # Normalize Image to JPG
-                                try:
-                                    print("DEBUG: Normalizing image to JPG...", flush=True)
-                                    with Image.open(io.BytesIO(file_content)) as img:
-                                        # Convert RGBA to RGB if needed
-                                        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
-                                            img = img.convert('RGB')
-                                        else:
-                                            # Ensure generic RGB
-                                            img = img.convert('RGB')
-                                            
-                                        output_buffer = io.BytesIO()
-                                        img.save(output_buffer, format='JPEG', quality=95)
-                                        content_to_upload = output_buffer.getvalue()
-                                        print(f"DEBUG: Normalization complete. Size: {len(content_to_upload)} bytes", flush=True)
-                                except Exception as e:
-                                    print(f"DEBUG: Image normalization failed: {e}, using original.", flush=True)
-                                    # Fallback to original if PIL fails
-                                    content_type = resp.headers.get("content-type", "image/png")
-                                    if "webp" in content_type: ext = "webp"
-                                    elif "png" in content_type: ext = "png"
-                                    elif "jpeg" in content_type: ext = "jpg"
-                                    else:
-                                        # Emergency fallback to URL check
-                                        if ".png" in download_url: ext = "png"; content_type="image/png"
-                                        elif ".webp" in download_url: ext = "webp"; content_type="image/webp"
-                                        # If all else fails, keep ext="jpg" but this might be risky. 
-                                        # Better to default to webp if that is the common failure case?
-                                        else: ext = "webp"; content_type="image/webp"
-                                    
-                            filename = f"generations/{job.id}.{ext}"
-                            print(f"DEBUG: Attempting S3 upload to {filename}", flush=True)
-                            
-                            def upload_s3(content, bucket, key, mime_type):
-                                try:
-                                    s3 = boto3.client(
-                                        's3',
-                                        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                                        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                                        region_name=settings.AWS_REGION
-                                    )
-                                    s3.put_object(
-                                        Bucket=bucket,
-                                        Key=key,
-                                        Body=content,
-                                        ContentType=mime_type,
-
-                                    )
-                                    return f"https://{bucket}.s3.{settings.AWS_REGION}.amazonaws.com/{key}"
-                                except Exception as e:
-                                    print(f"DEBUG: Boto3 inner exception: {e}", flush=True)
-                                    raise e
-
-                            loop = asyncio.get_event_loop()
-                            s3_url = await loop.run_in_executor(
-                                None, 
-                                upload_s3, 
-                                content_to_upload, 
-                                settings.AWS_BUCKET_NAME, 
-                                filename,
-                                content_type
-                            )
-                            
-                            job.result_url = s3_url
-                            print(f"DEBUG: Upload success: {s3_url}", flush=True)
-                            logger.info(f"Uploaded asset to S3: {s3_url}")
-                        else:
-                            print("DEBUG: AWS Config missing in IF check", flush=True)
-                            logger.warning("AWS S3 credentials missing. Using remote URL.")
-                            job.result_url = download_url
-                            
-                    else:
-                        print(f"Failed to download asset: {resp.status_code}", flush=True)
-                        job.result_url = download_url # Fallback to remote
-                        
-            except Exception as e:
-                print(f"S3 Upload Exception (Outer): {e}", flush=True)
-                job.result_url = download_url # Fallback
+            # Served from the provider until the ingest task has copied it to S3
+            job.result_url = download_url
+            if ingest_enabled():
+                job.ingest_status = "pending"
+            else:
+                logger.warning("AWS S3 credentials missing. Using remote URL.")
         
     elif status == "failed":
-        job.status = "failed"
-        job.error_message = str(error) if error else "Unknown error from provider"
-        
-        # REFUND LOGIC
-        if job.cost_credits > 0:
-            # We need to fetch the user to refund
-            # Since 'job' is attached to session, we can try accessing job.user if lazy loading works, 
-            # or we might need to query. Let's explicit query to be safe/explicit in async code if needed, 
-            # but usually accessing relation triggers lazy load if not await-compatible.
-            # Ideally we should have joined loaded user, but let's just fetch user by ID to be safe and atomic.
-            if job.user_id:
-                user_result = await db.execute(select(User).where(User.id == job.user_id))
-                user = user_result.scalar_one_or_none()
-                if user:
-                    user.balance += job.cost_credits
-                    job.error_message += f" (Refunded {job.cost_credits} credits)"
-                    logger.info(f"Refunded {job.cost_credits} credits to user {user.id} for failed job {job.id}")
+        # REFUND LOGIC (same primitive as the completion path; users and guests)
+        message = str(error) if error else "Unknown error from provider"
+        if not await fail_and_release(db, job, _refund_note(job, message), reason=f"refund:{status}"):
+            return {"ok": True}
+        logger.info(f"Failed job {job.id}, released {job.cost_credits} credits")
 
     elif status == "canceled":
-        job.status = "failed"
-        job.error_message = "Canceled by provider/user"
-        
         # REFUND LOGIC
-        if job.cost_credits > 0:
-             if job.user_id:
-                user_result = await db.execute(select(User).where(User.id == job.user_id))
-                user = user_result.scalar_one_or_none()
-                if user:
-                    user.balance += job.cost_credits
-                    job.error_message += f" (Refunded {job.cost_credits} credits)"
-                    logger.info(f"Refunded {job.cost_credits} credits to user {user.id} for canceled job {job.id}")
+        if not await fail_and_release(db, job, _refund_note(job, "Canceled by provider/user"), reason=f"refund:{status}"):
+            return {"ok": True}
+        logger.info(f"Canceled job {job.id}, released {job.cost_credits} credits")
         
     await db.commit()
+    await publish_job_event(job)
+    if status == "succeeded" and job.ingest_status == "pending":
+        enqueue_ingest(job.id, job.result_url)
     
     return {"ok": True}
+
+def _refund_note(job, message: str) -> str:
+    if job.cost_credits > 0 and (job.user_id or job.guest_id):
+        return f"{message} (Refunded {job.cost_credits} credits)"
+    return message
@@ -0,0 +1,126 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from botocore.exceptions import ClientError
+from app.core.archive import BulkArchiver, CHECKPOINT_PREFIX
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    def hgetall(self, key):
+        return {k.encode(): str(v).encode() for k, v in self.hashes.get(key, {}).items()}
+
+    def pipeline(self, transaction=False):
+        return self
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def expire(self, key, ttl):
+        pass
+
+    def execute(self):
+        pass
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+
+@pytest.fixture
+def s3():
+    client = MagicMock()
+    client.delete_objects.return_value = {}
+    return client
+
+
+@pytest.fixture
+def archiver(s3):
+    store = MagicMock()
+    store.bucket = "bucket"
+    store.client.return_value = s3
+    return BulkArchiver(store, concurrency=4)
+
+
+@pytest.mark.unit
+def test_deletes_in_batches_of_1000(archiver, s3):
+    keys = [f"generations/{i:05d}.jpg" for i in range(2500)]
+    copied = []  # Plain function: MagicMock call counting is not thread-safe
+    s3.copy_object = lambda CopySource, Bucket, Key: copied.append(Key)
+    with patch("app.core.archive.get_redis", return_value=None):
+        report = archiver.archive(keys + keys[:10])  # Duplicates are archived once
+
+    assert sorted(copied) == [f"deleted/{k}" for k in keys]
+    sizes = [len(c.kwargs["Delete"]["Objects"]) for c in s3.delete_objects.call_args_list]
+    assert sizes == [1000, 1000, 500]
+    assert report.total == 2500 and report.archived == 2500 and report.failed == 0
+    assert [b.index for b in report.batches] == [0, 1, 2]
+
+
+@pytest.mark.unit
+def test_missing_and_failed_keys_are_reported(archiver, s3):
+    def copy(CopySource, Bucket, Key):
+        if CopySource["Key"] == "b":
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "CopyObject")
+        if CopySource["Key"] == "c":
+            raise ClientError({"Error": {"Code": "AccessDenied"}}, "CopyObject")
+
+    s3.copy_object.side_effect = copy
+    s3.delete_objects.return_value = {"Errors": [{"Key": "d", "Code": "InternalError", "Message": "boom"}]}
+    with patch("app.core.archive.get_redis", return_value=None):
+        report = archiver.archive(["a", "b", "c", "d"])
+
+    deleted = [o["Key"] for o in s3.delete_objects.call_args.kwargs["Delete"]["Objects"]]
+    assert deleted == ["a", "d"]
+    batch = report.batches[0]
+    assert (batch.copied, batch.deleted, batch.missing) == (2, 1, 1)
+    assert set(batch.errors) == {"c", "d"} and batch.errors["d"] == "boom"
+
+
+@pytest.mark.unit
+def test_resumes_from_checkpoint(s3):
+    store = MagicMock(bucket="bucket")
+    store.client.return_value = s3
+    archiver = BulkArchiver(store, concurrency=2, batch_size=2)
+    redis = FakeRedis()
+    keys = ["a", "b", "c", "d", "e"]
+
+    # First run dies in the second batch
+    calls = {"n": 0}
+
+    def delete_objects(**kwargs):
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise KeyboardInterrupt
+        return {}
+
+    s3.delete_objects.side_effect = delete_objects
+    with patch("app.core.archive.get_redis", return_value=redis):
+        with pytest.raises(KeyboardInterrupt):
+            archiver.archive(keys, archive_id="user:1")
+        assert redis.hashes[f"{CHECKPOINT_PREFIX}:user:1"]["next_batch"] == 1
+
+        copied = []
+        s3.copy_object = lambda CopySource, Bucket, Key: copied.append(CopySource["Key"])
+        s3.delete_objects.side_effect = None
+        s3.delete_objects.return_value = {}
+        report = archiver.archive(keys, archive_id="user:1")
+
+    assert report.resumed_from == 1
+    assert sorted(copied) == ["c", "d", "e"]
+    assert f"{CHECKPOINT_PREFIX}:user:1" not in redis.hashes
+
+
+@pytest.mark.unit
+def test_checkpoint_ignored_for_other_key_set_and_kept_on_failure(archiver, s3):
+    redis = FakeRedis()
+    redis.hashes[f"{CHECKPOINT_PREFIX}:user:1"] = {"fingerprint": "stale", "next_batch": 3}
+    s3.delete_objects.side_effect = RuntimeError("unavailable")
+
+    with patch("app.core.archive.get_redis", return_value=redis):
+        report = archiver.archive(["a", "b"], archive_id="user:1")
+
+    assert report.resumed_from == 0
+    assert report.failed == 2 and report.archived == 0
+    # Nothing advanced, so the next run retries the whole set
+    assert redis.hashes[f"{CHECKPOINT_PREFIX}:user:1"]["next_batch"] == 3
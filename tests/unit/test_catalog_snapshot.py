@@ -0,0 +1,78 @@
+import json
+import uuid
+import pytest
+from unittest.mock import MagicMock, AsyncMock, patch
+from app.domain.catalog.snapshot import CatalogSnapshotStore, etag_matches
+from app.domain.providers.models import AIModel
+
+RAW_SCHEMA = {
+    "components": {
+        "schemas": {
+            "Input": {
+                "properties": {
+                    "prompt": {"type": "string", "title": "Prompt"},
+                    "steps": {"type": "integer", "default": 4}
+                }
+            }
+        }
+    }
+}
+
+@pytest.fixture
+def mock_db():
+    model = AIModel(
+        id=uuid.uuid4(),
+        display_name="Test Model",
+        provider="replicate",
+        model_ref="owner/name",
+        credits_per_generation=5,
+        raw_schema_json=RAW_SCHEMA,
+        ui_config={}
+    )
+    db = AsyncMock()
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = [model]
+    db.execute.return_value = result
+    return db, model
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_snapshot_is_built_once_and_reused(mock_db):
+    db, model = mock_db
+    store = CatalogSnapshotStore(fallback_ttl=60)
+
+    with patch("app.domain.catalog.snapshot.get_async_redis", return_value=None):
+        first = await store.get(db)
+        second = await store.get(db)
+
+    assert first is second
+    assert db.execute.await_count == 1
+
+    full = json.loads(first.full)
+    lite = json.loads(first.lite)
+    assert full[0]["defaults"] == {"steps": 4}
+    assert "inputs" not in lite[0]
+    assert json.loads(first.models[str(model.id)])["name"] == "Test Model"
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_rebuild_changes_etag(mock_db):
+    db, model = mock_db
+    store = CatalogSnapshotStore(fallback_ttl=60)
+
+    with patch("app.domain.catalog.snapshot.get_async_redis", return_value=None):
+        before = await store.get(db)
+        model.display_name = "Renamed"
+        after = await store.rebuild(db)
+        current = await store.get(db)
+
+    assert before.etags["full"] != after.etags["full"]
+    assert current is after
+
+@pytest.mark.unit
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"def"', '"abc"')
+    assert not etag_matches(None, '"abc"')
@@ -0,0 +1,133 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from app.domain.billing.models import LedgerEntry
+from app.domain.billing.service import fail_and_release_sync, release_credits_sync, reserve_credits
+from app.domain.jobs.completion import complete_job
+from app.domain.jobs.models import Job
+from app.domain.users.guest_models import GuestProfile
+from app.domain.users.models import User
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    for model in (User, GuestProfile, LedgerEntry, Job):
+        model.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+class _Async:
+    """AsyncSession-shaped view of a sync session (no async SQLite driver here)."""
+
+    def __init__(self, session):
+        self.session = session
+        self.identity_map = session.identity_map
+        self.add = session.add
+
+    async def execute(self, stmt):
+        return self.session.execute(stmt)
+
+    async def commit(self):
+        self.session.commit()
+
+    async def rollback(self):
+        self.session.rollback()
+
+
+def _owners(session, user_balance=100, guest_balance=25):
+    user = User(email="a@example.com", hashed_password="x", balance=user_balance)
+    guest = GuestProfile(balance=guest_balance)
+    session.add_all([user, guest])
+    session.commit()
+    return user, guest
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reservation_is_conditional(session):
+    user, guest = _owners(session)
+    db = _Async(session)
+
+    assert await reserve_credits(db, user, 60, "job_cost:flux")
+    assert not await reserve_credits(db, user, 60, "job_cost:flux")  # 40 left
+    assert await reserve_credits(db, guest, 25, "job_cost:flux")
+    assert not await reserve_credits(db, guest, 1, "job_cost:flux")
+    session.commit()
+
+    assert (user.balance, guest.balance) == (40, 0)
+    entries = session.scalars(select(LedgerEntry)).all()
+    assert [(e.amount, e.balance_before, e.balance_after) for e in entries] == [(-60, 100, 40)]
+
+
+@pytest.mark.unit
+def test_release_returns_credits_to_user_or_guest(session):
+    user, guest = _owners(session, user_balance=40, guest_balance=0)
+    user_job = Job(id="job-1", user_id=user.id, cost_credits=60)
+    guest_job = Job(id="job-2", guest_id=guest.id, cost_credits=5)
+
+    assert release_credits_sync(session, user_job, "Refund for failed job job-1")
+    assert release_credits_sync(session, guest_job, "Refund for failed job job-2")
+    assert not release_credits_sync(session, Job(id="job-3", user_id=user.id, cost_credits=0), "noop")
+    session.commit()
+
+    assert (user.balance, guest.balance) == (100, 5)
+    refund = session.scalars(select(LedgerEntry)).one()
+    assert (refund.amount, refund.related_job_id, refund.external_id) == (60, "job-1", "refund_job-1")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_failed_guest_job_is_refunded_on_completion(session):
+    _, guest = _owners(session, guest_balance=0)
+    job = Job(id="job-1", guest_id=guest.id, cost_credits=5, status="running", kind="image", prompt="p")
+    session.add(job)
+    session.commit()
+    with patch("app.domain.jobs.completion.publish_job_event", AsyncMock()):
+        assert await complete_job(_Async(session), job, {"status": "failed", "error_message": "nsfw"})
+
+    assert job.status == "failed"
+    assert guest.balance == 5
+    assert session.scalars(select(LedgerEntry)).all() == []
+
+
+@pytest.mark.unit
+def test_second_failure_of_a_job_releases_nothing(session):
+    user, _ = _owners(session, user_balance=40)
+    job = Job(id="job-1", user_id=user.id, cost_credits=60, status="queued", kind="image", prompt="p")
+    session.add(job)
+    session.commit()
+
+    assert fail_and_release_sync(session, job, "Provider Error", "Refund for failed job job-1")
+    session.commit()
+    assert not fail_and_release_sync(session, job, "Worker Crash", "Refund for failed job job-1")
+    session.commit()
+
+    assert (job.status, job.error_message, user.balance) == ("failed", "Provider Error", 100)
+    assert len(session.scalars(select(LedgerEntry)).all()) == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_completion_racing_a_runner_failure_is_a_no_op(session):
+    _, guest = _owners(session, guest_balance=0)
+    job = Job(id="job-1", guest_id=guest.id, cost_credits=5, status="running", kind="image", prompt="p")
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+
+    # The runner fails the job in its own session while this one still sees it running
+    with Session(session.get_bind()) as runner:
+        assert fail_and_release_sync(runner, runner.get(Job, "job-1"), "Worker Crash", "Refund for failed job job-1")
+        runner.commit()
+    assert job.status == "running"
+
+    with patch("app.domain.jobs.completion.publish_job_event", AsyncMock()) as publish:
+        assert not await complete_job(_Async(session), job, {"status": "failed", "error_message": "nsfw"})
+
+    publish.assert_not_awaited()
+    assert session.scalar(select(GuestProfile.balance).where(GuestProfile.id == guest.id)) == 5
+    assert session.scalar(select(Job.error_message)) == "Worker Crash"
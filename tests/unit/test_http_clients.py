@@ -0,0 +1,46 @@
+import httpx
+import pytest
+from app.core.http import HttpClientManager, request_timeout
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"ok": True})
+
+@pytest.mark.unit
+def test_sync_client_is_shared():
+    manager = HttpClientManager()
+
+    first = manager.get_sync_client()
+    second = manager.get_sync_client()
+
+    assert first is second
+    assert manager.get_stats()["clients_created"] == 1
+    manager.close_sync()
+    assert manager.get_sync_client() is not first
+
+@pytest.mark.unit
+def test_reset_after_fork_drops_inherited_clients():
+    manager = HttpClientManager()
+    parent_client = manager.get_sync_client()
+
+    manager._pid = -1  # Simulate running in a forked child
+    child_client = manager.get_sync_client()
+
+    assert child_client is not parent_client
+    assert not parent_client.is_closed  # Parent's sockets are left alone
+    assert manager.get_stats()["clients_created"] == 1
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_async_client_per_loop_and_request_stats():
+    manager = HttpClientManager()
+    client = manager.get_async_client()
+    assert manager.get_async_client() is client
+
+    # Swap in a mock transport, keeping the manager's event hooks
+    client._transport = httpx.MockTransport(_handler)
+    resp = await client.get("https://example.test/", timeout=request_timeout(5.0))
+
+    assert resp.status_code == 200
+    assert manager.get_stats()["requests"] == 1
+    await manager.aclose()
+    assert client.is_closed
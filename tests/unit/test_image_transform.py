@@ -0,0 +1,109 @@
+import io
+import random
+import pytest
+from unittest.mock import patch
+from PIL import Image, JpegImagePlugin
+from app.domain.providers.normalization.image_transform import ImageTransformEngine, TransformPolicy
+
+
+def _encode(image: Image.Image, fmt: str, **kwargs) -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, format=fmt, **kwargs)
+    return buf.getvalue()
+
+
+def _noise(size, mode="RGB") -> Image.Image:
+    # Incompressible for PNG, so a lossy re-encode always pays off
+    return Image.frombytes(mode, size, random.Random(0).randbytes(size[0] * size[1] * len(mode)))
+
+
+@pytest.mark.unit
+def test_small_web_image_passes_through_without_decoding():
+    content = _encode(Image.new("RGB", (64, 32), "red"), "PNG")
+    with patch.object(Image.Image, "load", side_effect=AssertionError("decoded")):
+        result = ImageTransformEngine().transform(content, TransformPolicy())
+    assert (result.strategy, result.body, result.ext, result.width, result.height) == \
+        ("passthrough", content, "png", 64, 32)
+    assert result.image is None
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("min_decode_width", [0, 32])
+def test_animated_gif_is_kept_with_all_frames(min_decode_width):
+    frames = [Image.new("RGB", (64, 32), color) for color in ("red", "green", "blue", "white")]
+    buf = io.BytesIO()
+    frames[0].save(buf, "GIF", save_all=True, append_images=frames[1:], duration=100, loop=0)
+    content = buf.getvalue()
+
+    # Even past the passthrough size limit: a re-encode would keep only the first frame
+    result = ImageTransformEngine().transform(
+        content, TransformPolicy(passthrough_max_bytes=0, min_decode_width=min_decode_width))
+
+    assert (result.strategy, result.body, result.content_type, result.ext) == \
+        ("passthrough", content, "image/gif", "gif")
+    assert Image.open(io.BytesIO(result.body)).n_frames == 4
+    assert (result.image is not None) == bool(min_decode_width)
+
+
+@pytest.mark.unit
+def test_large_png_is_reencoded_as_progressive_jpeg():
+    content = _encode(_noise((400, 300)), "PNG")
+    result = ImageTransformEngine().transform(content, TransformPolicy(passthrough_max_bytes=0))
+    assert (result.strategy, result.ext, result.content_type) == ("reencode", "jpg", "image/jpeg")
+    assert result.saved_bytes > 0
+    with Image.open(io.BytesIO(result.body)) as out:
+        assert out.info.get("progressive") == 1
+
+
+@pytest.mark.unit
+def test_reencode_that_does_not_save_enough_keeps_the_original():
+    content = _encode(_noise((300, 200)), "JPEG", quality=40)
+    result = ImageTransformEngine().transform(content, TransformPolicy(passthrough_max_bytes=0, jpeg_quality=95))
+    assert result.strategy == "passthrough" and result.body == content
+    assert result.image is not None and result.image.size == (300, 200)  # Decoded for renditions anyway
+
+
+@pytest.mark.unit
+def test_oversized_jpeg_is_drafted_and_downscaled():
+    content = _encode(_noise((1600, 800)), "JPEG", quality=90)
+    with patch.object(JpegImagePlugin.JpegImageFile, "draft", autospec=True,
+                      side_effect=JpegImagePlugin.JpegImageFile.draft) as draft:
+        result = ImageTransformEngine().transform(content, TransformPolicy(max_dimension=400))
+    assert draft.called
+    assert (result.strategy, result.width, result.height) == ("downscale", 400, 200)
+    with Image.open(io.BytesIO(result.body)) as out:
+        assert out.size == (400, 200)
+
+
+@pytest.mark.unit
+def test_alpha_is_encoded_as_webp_when_policy_says_jpeg():
+    content = _encode(_noise((200, 200), "RGBA"), "PNG")
+    result = ImageTransformEngine().transform(content, TransformPolicy(passthrough_max_bytes=0, min_savings=0))
+    assert (result.ext, result.content_type) == ("webp", "image/webp")
+    with Image.open(io.BytesIO(result.body)) as out:
+        assert out.mode == "RGBA"
+
+
+@pytest.mark.unit
+def test_exif_orientation_is_applied():
+    image = Image.new("RGB", (60, 20), "blue")
+    exif = image.getexif()
+    exif[0x0112] = 6  # Rotated 90 degrees clockwise
+    content = _encode(image, "JPEG", exif=exif.tobytes())
+
+    passthrough = ImageTransformEngine().transform(content, TransformPolicy())
+    assert (passthrough.width, passthrough.height) == (20, 60)
+
+    result = ImageTransformEngine().transform(content, TransformPolicy(min_decode_width=20))
+    assert result.image.size == (20, 60)
+
+
+@pytest.mark.unit
+def test_stats_count_strategies_and_bytes():
+    engine = ImageTransformEngine()
+    small = _encode(Image.new("RGB", (8, 8)), "PNG")
+    engine.transform(small, TransformPolicy())
+    engine.transform(_encode(_noise((400, 300)), "PNG"), TransformPolicy(passthrough_max_bytes=0))
+    stats = engine.get_stats()
+    assert (stats["images"], stats["passthrough"], stats["reencode"]) == (2, 1, 1)
+    assert stats["bytes_saved"] == stats["bytes_in"] - stats["bytes_out"] > 0
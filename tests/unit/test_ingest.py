@@ -0,0 +1,135 @@
+import io
+import pytest
+from unittest.mock import MagicMock, AsyncMock, patch
+from PIL import Image
+from sqlalchemy import create_engine, delete, update
+from sqlalchemy.orm import Session
+from app.domain.jobs.models import Job
+from app.domain.jobs.completion import complete_job
+from app.domain.jobs.ingest import run_ingest, IngestResult, _is_video
+from app.domain.jobs.renditions import prepare_original
+
+
+def _job(**kw):
+    defaults = dict(id="job-1", user_id=None, guest_id=None, cost_credits=0, status="running",
+                    kind="image", prompt="a cat", generation_params={})
+    defaults.update(kw)
+    return Job(**defaults)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_webhook_completion_records_result_and_enqueues_ingest():
+    job = _job()
+    db = AsyncMock()
+    with patch("app.domain.jobs.completion.ingest_enabled", return_value=True), \
+         patch("app.domain.jobs.completion.enqueue_ingest") as enqueue, \
+         patch("app.domain.jobs.completion.publish_job_event", AsyncMock()):
+        assert await complete_job(db, job, {"status": "succeeded", "result_url": "https://replicate.delivery/x.png"})
+
+    assert job.status == "succeeded"
+    assert job.result_url == "https://replicate.delivery/x.png"
+    assert job.ingest_status == "pending"
+    enqueue.assert_called_once_with("job-1", "https://replicate.delivery/x.png")
+    db.commit.assert_awaited_once()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_completion_without_storage_keeps_provider_url():
+    job = _job()
+    with patch("app.domain.jobs.completion.ingest_enabled", return_value=False), \
+         patch("app.domain.jobs.completion.enqueue_ingest") as enqueue, \
+         patch("app.domain.jobs.completion.publish_job_event", AsyncMock()):
+        await complete_job(AsyncMock(), job, {"status": "succeeded", "result_url": "https://r/x.png"})
+    assert job.ingest_status is None
+    enqueue.assert_not_called()
+
+
+@pytest.mark.unit
+def test_run_ingest_updates_job_once():
+    job = _job(status="succeeded", ingest_status="pending")
+    session = MagicMock()
+    select_res = MagicMock()
+    select_res.scalar_one_or_none.return_value = job
+    update_res = MagicMock(rowcount=1)
+    session.execute.side_effect = [select_res, update_res]
+    session.get.return_value = job
+    result = IngestResult(url="https://bucket.s3/generations/job-1.jpg", content_type="image/jpeg",
+                          size=10, width=64, height=32)
+
+    with patch("app.domain.jobs.ingest.ingest_output", return_value=result) as ingest, \
+         patch("app.domain.jobs.ingest.publish_job_event_sync") as publish:
+        assert run_ingest(session, "job-1", "https://r/x.png") == "ingested"
+
+    ingest.assert_called_once_with("job-1", "image", "https://r/x.png")
+    params = session.execute.call_args_list[1][0][0].compile().params
+    assert params["result_url"] == result.url
+    assert params["ingest_status"] == "done"
+    assert params["width"] == 64 and params["height"] == 32
+    assert params["ingest_seconds"] >= 0
+    publish.assert_called_once()
+
+
+@pytest.mark.unit
+def test_run_ingest_skips_already_ingested_job():
+    session = MagicMock()
+    session.execute.return_value.scalar_one_or_none.return_value = _job(ingest_status="done")
+    with patch("app.domain.jobs.ingest.ingest_output") as ingest:
+        assert run_ingest(session, "job-1", "https://r/x.png") == "skipped"
+    ingest.assert_not_called()
+
+
+@pytest.mark.unit
+def test_prepare_normalizes_images():
+    buf = io.BytesIO()
+    Image.new("RGBA", (64, 32)).save(buf, format="PNG")
+
+    # Small web-format originals are stored as received
+    prepared = prepare_original(buf.getvalue(), "image/png")
+    assert (prepared.ext, prepared.content_type, prepared.width, prepared.height) == ("png", "image/png", 64, 32)
+    assert prepared.body == buf.getvalue()
+
+    prepared = prepare_original(b"not an image", "image/webp")
+    assert (prepared.body, prepared.ext, prepared.width, prepared.height) == (b"not an image", "webp", None, None)
+
+
+@pytest.mark.unit
+def test_videos_are_streamed():
+    assert _is_video("video", "https://r/out")
+    assert _is_video("image", "https://r/out.mp4")
+    assert not _is_video("image", "https://r/out.png")
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("removal", [
+    update(Job).values(status="deleted", ingest_status="cancelled", result_url=None),  # delete_job
+    delete(Job),  # Cascade from a deleted user
+])
+def test_ingest_racing_a_delete_archives_its_uploads(removal):
+    engine = create_engine("sqlite://")
+    Job.__table__.create(engine)
+    with Session(engine) as session:
+        session.add(_job(status="succeeded", ingest_status="pending", result_url="https://r/x.png"))
+        session.commit()
+
+    result = IngestResult(url="https://bucket.s3/generations/job-1.jpg", content_type="image/jpeg", size=10,
+                          cover_url="https://bucket.s3/renditions/job-1/cover.webp")
+
+    def ingest_while_deleted(*args):
+        with Session(engine) as other:
+            other.execute(removal)
+            other.commit()
+        return result
+
+    with Session(engine) as session, \
+         patch("app.domain.jobs.ingest.ingest_output", side_effect=ingest_while_deleted), \
+         patch("app.domain.jobs.ingest.storage.archive") as archive, \
+         patch("app.domain.jobs.ingest.publish_job_event_sync") as publish:
+        assert run_ingest(session, "job-1", "https://r/x.png") == "cancelled"
+        job = session.get(Job, "job-1", populate_existing=True)
+
+    assert job is None or (job.result_url, job.cover_image_url) == (None, None)
+    assert [c.args[0] for c in archive.call_args_list] == ["generations/job-1.jpg", "renditions/job-1/cover.webp"]
+    publish.assert_not_called()
+    engine.dispose()
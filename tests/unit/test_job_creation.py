@@ -0,0 +1,85 @@
+import uuid
+from datetime import datetime
+import pytest
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.domain.analytics.models import UserActivity
+from app.domain.jobs.models import Job
+from app.domain.pricing.models import PricingQuote
+from app.domain.providers.models import AIModel
+from app.domain.users.models import User
+from app.schemas import JobRequestSPA
+from app.web.routers.api_spa import create_spa_job
+
+
+def _model() -> AIModel:
+    return AIModel(id=uuid.uuid4(), display_name="Flux", provider="replicate", model_ref="bfl/flux",
+                   type="image", credits_per_generation=10, pricing_rules=[])
+
+
+def _db(model):
+    db = AsyncMock()
+    db.add = MagicMock()
+    db.execute.return_value.scalar_one_or_none = MagicMock(return_value=model)
+    return db
+
+
+def _user(balance: int) -> User:
+    return User(id=uuid.uuid4(), email="a@example.com", hashed_password="x", balance=balance,
+                is_admin=False, is_email_verified=True, language="en", total_generations=0,
+                created_at=datetime.utcnow())
+
+
+def _request():
+    request = MagicMock()
+    request.cookies = {}
+    return request
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_job_creation_is_one_transaction():
+    model = _model()
+    db = _db(model)
+    user = _user(100)
+    req = JobRequestSPA(model_id=str(model.id), prompt="a cat", params={"aspect_ratio": "16:9"})
+
+    def enqueue(job_id, queue=None):
+        assert db.commit.await_count == 1  # Worker must find the committed job
+
+    with patch("app.domain.jobs.service.reserve_credits", AsyncMock(return_value=True)) as reserve, \
+         patch("app.web.routers.api_spa.enqueue_job", side_effect=enqueue) as enqueue_job:
+        job = await create_spa_job(req, _request(), MagicMock(), user=user, db=db)
+
+    assert db.commit.await_count == 1
+    assert db.execute.await_count == 1  # Model lookup only; create_job reuses it
+    db.flush.assert_not_awaited()
+    db.refresh.assert_not_awaited()
+    enqueue_job.assert_called_once()
+    reserve.assert_awaited_once_with(db, user, 10, reason=f"job_cost:{model.id}")
+
+    added = {type(obj): obj for (obj,), _ in db.add.call_args_list}
+    assert set(added) == {PricingQuote, Job, UserActivity}
+    quote = added[PricingQuote]
+    assert job is added[Job] and job.id and quote.id
+    assert (job.quote_id, quote.job_id) == (quote.id, job.id)
+    assert job.model is model and job.format == "landscape"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_rejected_submission_keeps_only_its_quote():
+    model = _model()
+    db = _db(model)
+    user = _user(0)
+    req = JobRequestSPA(model_id=str(model.id), prompt="a cat")
+
+    with patch("app.domain.jobs.service.reserve_credits", AsyncMock(return_value=False)), \
+         patch("app.web.routers.api_spa.enqueue_job") as enqueue_job:
+        with pytest.raises(HTTPException) as exc:
+            await create_spa_job(req, _request(), MagicMock(), user=user, db=db)
+
+    assert exc.value.status_code == 400
+    db.commit.assert_awaited_once()  # Quote kept for audit
+    assert [type(obj) for (obj,), _ in db.add.call_args_list] == [PricingQuote]
+    enqueue_job.assert_not_called()
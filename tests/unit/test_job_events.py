@@ -0,0 +1,52 @@
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from app.domain.jobs.events import JobEventConnection, job_event, owner_key, sse_stream
+
+@pytest.mark.unit
+def test_pending_events_coalesce_per_job_and_overflow():
+    conn = JobEventConnection("user:1", max_pending=2)
+    conn.push("1-0", '{"status": "running"}', "job-a")
+    conn.push("2-0", '{"status": "succeeded"}', "job-a")
+    conn.push("3-0", '{"status": "running"}', "job-b")
+
+    assert conn.drain() == [("2-0", '{"status": "succeeded"}'), ("3-0", '{"status": "running"}')]
+
+    for i, job_id in enumerate(["a", "b", "c"]):
+        conn.push(f"{i}-1", "{}", job_id)
+    assert conn.overflowed and not conn.pending
+
+@pytest.mark.unit
+def test_job_event_payload():
+    job = SimpleNamespace(id="job-1", user_id="u1", guest_id=None, status="running", progress=10,
+                          result_url=None, error_message=None, width=None, height=None, logs="x" * 5000)
+
+    event = job_event(job)
+
+    assert owner_key(job.user_id, job.guest_id) == "user:u1"
+    assert event["status"] == "running"
+    assert len(event["logs"]) == 2000
+    json.dumps(event)
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_sse_stream_replays_heartbeats_and_streams():
+    hub = MagicMock(disconnect=AsyncMock())
+    conn = JobEventConnection("user:1", max_pending=10)
+    request = MagicMock(is_disconnected=AsyncMock(side_effect=[False, False, True]))
+    stream = sse_stream(hub, conn, request, backlog=[("1-0", '{"job_id": "a"}')])
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("app.domain.jobs.events.settings.JOB_EVENTS_HEARTBEAT_SECONDS", 0.01)
+        chunks = [await stream.__anext__() for _ in range(3)]
+        conn.push("2-0", '{"job_id": "b"}', "b")
+        chunks.append(await stream.__anext__())
+        with pytest.raises(StopAsyncIteration):
+            await stream.__anext__()
+
+    assert chunks[0].startswith("retry:")
+    assert chunks[1] == 'id: 1-0\nevent: job\ndata: {"job_id": "a"}\n\n'
+    assert chunks[2] == ": ping\n\n"
+    assert chunks[3] == 'id: 2-0\nevent: job\ndata: {"job_id": "b"}\n\n'
+    hub.disconnect.assert_awaited_once_with(conn)
@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, AsyncMock, patch
+from app.domain.jobs.models import Job
+from app.domain.jobs.executor import AsyncJobExecutor
+
+def _session_for(job):
+    session = AsyncMock()
+    session.add = MagicMock()
+
+    async def execute(stmt):
+        res = MagicMock()
+        res.scalar_one_or_none.return_value = job() if callable(job) else job
+        return res
+
+    session.execute.side_effect = execute
+    factory = MagicMock()
+    factory.return_value.__aenter__.return_value = session
+    return factory, session
+
+@pytest.fixture
+def job():
+    return Job(id="job-1", user_id=None, guest_id=None, cost_credits=0, status="queued",
+               prompt="a cat", model_ref="flux", generation_params={})
+
+def _service(submit):
+    service = MagicMock()
+    service.normalize_payload.side_effect = lambda params, schema: params
+    service.submit_prediction_async = submit
+    return service
+
+def _patched(job, service):
+    factory, session = _session_for(job)
+    providers = MagicMock()
+    providers.load_async = AsyncMock(return_value=MagicMock(get_service=MagicMock(return_value=service)))
+    return patch("app.domain.jobs.executor.AsyncSessionLocal", factory), \
+        patch("app.domain.jobs.executor.provider_services", providers)
+
+async def _run(executor, job, service):
+    session_patch, router_patch = _patched(job, service)
+    with session_patch, router_patch:
+        return await executor.execute(job.id, 0, 3)
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_submission_marks_job_running(job):
+    executor = AsyncJobExecutor(max_in_flight=2)
+    service = _service(AsyncMock(return_value="pred-1"))
+
+    outcome = await _run(executor, job, service)
+
+    assert outcome.result == "Submitted: pred-1"
+    assert job.status == "running" and job.provider_job_id == "pred-1"
+    assert executor.stats["submitted"] == 1
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_transient_error_retries_and_validation_error_fails(job):
+    executor = AsyncJobExecutor(max_in_flight=2)
+
+    outcome = await _run(executor, job, _service(AsyncMock(side_effect=IOError("503"))))
+    assert outcome.retry_exc is not None
+    assert job.status == "queued"
+
+    outcome = await _run(executor, job, _service(AsyncMock(side_effect=IOError("returned 422"))))
+    assert outcome.result == "Job Failed" and outcome.retry_exc is None
+    assert job.status == "failed"
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_in_flight_cap(job):
+    executor = AsyncJobExecutor(max_in_flight=2)
+
+    async def slow_submit(**kwargs):
+        await asyncio.sleep(0.01)
+        return "pred"
+
+    # A fresh queued row per run: a job that is already running is never submitted again
+    fresh = lambda: Job(id=job.id, cost_credits=0, status="queued", prompt="a cat", model_ref="flux", generation_params={})
+    session_patch, router_patch = _patched(fresh, _service(slow_submit))
+    with session_patch, router_patch:
+        await asyncio.gather(*[executor.execute(job.id, 0, 3) for _ in range(5)])
+
+    assert executor.stats["peak_in_flight"] == 2
+    assert executor.stats["submitted"] == 5
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_crash_retries_without_failing_job(job):
+    executor = AsyncJobExecutor(max_in_flight=2)
+    service = _service(AsyncMock(return_value="pred-1"))
+    service.normalize_payload.side_effect = RuntimeError("db hiccup")
+
+    outcome = await _run(executor, job, service)
+
+    assert outcome.retry_exc is not None and outcome.countdown > 0
+    assert job.status == "queued"
@@ -0,0 +1,33 @@
+import uuid
+import pytest
+from datetime import datetime
+from app.domain.jobs.models import Job
+from app.domain.jobs.runner import _job_inputs
+from app.schemas import JobRead
+
+@pytest.mark.unit
+def test_typed_columns_are_read_directly():
+    model_id = uuid.uuid4()
+    job = Job(prompt="[not] a | legacy string", model_id=model_id, generation_params={"steps": 4})
+
+    model_identifier, params, prompt = _job_inputs(job)
+
+    assert model_identifier == str(model_id)
+    assert params == {"steps": 4}
+    assert prompt == "[not] a | legacy string"
+
+@pytest.mark.unit
+def test_legacy_rows_fall_back_to_parser():
+    job = Job(prompt='[flux-pro] {"steps": 4} | a cat', generation_params=None)
+
+    assert _job_inputs(job) == ("flux-pro", {"steps": 4}, "a cat")
+
+@pytest.mark.unit
+def test_job_read_keeps_typed_prompt_verbatim():
+    base = dict(id="job-1", kind="image", status="queued", progress=0, created_at=datetime.utcnow())
+
+    typed = JobRead(**base, prompt="[cinematic] a cat", generation_params={})
+    legacy = JobRead(**base, prompt='[uuid] {"a": 1} | a cat')
+
+    assert typed.prompt == "[cinematic] a cat"
+    assert legacy.prompt == "a cat"
@@ -0,0 +1,50 @@
+import pytest
+from unittest.mock import patch
+from app.tasks.worker import job_queue, _message_age
+from app.domain.jobs.runner import enqueue_job
+
+
+@pytest.mark.unit
+def test_routes_by_owner_and_model_type():
+    assert job_queue("user", "image") == "jobs.user.image"
+    assert job_queue("user", "video") == "jobs.user.video"
+    assert job_queue("guest", "image") == "jobs.guest.image"
+    assert job_queue("guest", "video") == "jobs.guest.video"
+    # Unknown types fall back to the image queue
+    assert job_queue("user", None) == "jobs.user.image"
+
+
+@pytest.mark.unit
+def test_model_route_overrides_owner_routing():
+    routes = {"stability-ai/sdxl": "jobs.sdxl", "1234": "jobs.pinned"}
+    with patch("app.tasks.worker.settings.JOB_QUEUE_MODEL_ROUTES", routes):
+        assert job_queue("guest", "image", model_ref="stability-ai/sdxl") == "jobs.sdxl"
+        assert job_queue("user", "video", model_id=1234, model_ref="other/model") == "jobs.pinned"
+        assert job_queue("user", "video", model_ref="other/model") == "jobs.user.video"
+
+
+@pytest.mark.unit
+def test_routing_disabled_uses_default_queue():
+    with patch("app.tasks.worker.settings.JOB_QUEUE_ROUTING_ENABLED", False):
+        assert job_queue("user", "image") is None
+
+
+@pytest.mark.unit
+def test_async_mode_keeps_routing_on_thread_pool_queues():
+    with patch("app.tasks.worker.settings.JOB_EXECUTOR_MODE", "async"), \
+         patch("app.domain.jobs.executor.process_job_async.apply_async") as send, \
+         patch("app.domain.jobs.runner.process_job.apply_async") as send_sync:
+        enqueue_job("job-1", queue=job_queue("guest", "video"))
+        with patch("app.tasks.worker.settings.JOB_QUEUE_ROUTING_ENABLED", False):
+            enqueue_job("job-2", queue=job_queue("user", "image"))
+
+    assert [c.kwargs["queue"] for c in send.call_args_list] == ["jobs.guest.video.async", "jobs_async"]
+    send_sync.assert_not_called()
+
+
+@pytest.mark.unit
+def test_message_age_from_enqueued_header():
+    raw = '{"headers": {"enqueued_at": 100.0}, "body": ""}'
+    assert _message_age(raw, 112.5) == 12.5
+    assert _message_age(None, 1.0) is None
+    assert _message_age("not json", 1.0) is None
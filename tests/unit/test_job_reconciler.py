@@ -0,0 +1,84 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, AsyncMock, patch
+from app.core import redis as redis_module
+from app.core.redis import get_async_redis
+from app.domain.jobs.reconciler import JobReconciler
+from app.tasks.reconcile_tasks import reconcile_running_jobs
+from app.domain.providers.replicate.response_normalizer import ReplicateResponseNormalizer
+
+def _iso(delta_seconds):
+    return (datetime.now(timezone.utc) - timedelta(seconds=delta_seconds)).isoformat().replace("+00:00", "Z")
+
+PREDICTIONS = {
+    "p-running": {"id": "p-running", "status": "processing", "logs": "50%"},
+    "p-lost": {"id": "p-lost", "status": "succeeded", "output": ["https://x/out.png"], "completed_at": _iso(600)},
+    "p-fresh": {"id": "p-fresh", "status": "failed", "error": "boom", "completed_at": _iso(1)},
+}
+
+@pytest.fixture
+def sessions():
+    created = []
+
+    def factory():
+        session = AsyncMock()
+        rows = [SimpleNamespace(id=f"job-{pid[2:]}", provider="replicate", provider_job_id=pid, user_id="u1", guest_id=None) for pid in PREDICTIONS]
+        result = MagicMock()
+        result.all.return_value = rows
+        result.scalar_one_or_none.return_value = MagicMock(id="job-lost", status="running")
+        session.execute.return_value = result
+        ctx = MagicMock()
+        ctx.__aenter__ = AsyncMock(return_value=session)
+        ctx.__aexit__ = AsyncMock(return_value=False)
+        created.append(session)
+        return ctx
+
+    return factory, created
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reconcile_updates_progress_and_finalizes_lost_webhooks(sessions):
+    factory, created = sessions
+    service = MagicMock()
+    service.get_prediction = AsyncMock(side_effect=lambda pid: PREDICTIONS[pid])
+    service.response_normalizer = ReplicateResponseNormalizer()
+    providers = MagicMock()
+    providers.load_async = AsyncMock(return_value=MagicMock(get_service=MagicMock(return_value=service)))
+
+    reconciler = JobReconciler(concurrency=2, webhook_grace=60)
+    with patch("app.domain.jobs.reconciler.provider_services", providers), \
+         patch("app.domain.jobs.reconciler.publish_events", AsyncMock()) as publish, \
+         patch("app.domain.jobs.reconciler.complete_job", AsyncMock(return_value=True)) as complete:
+        summary = await reconciler.run_once(factory)
+
+    assert summary == {"polled": 3, "updated": 1, "finalized": 1, "errors": 0}
+    assert service.get_prediction.await_count == 3
+
+    # One executemany for progress, carrying only the running job
+    progress_call = created[1].execute.await_args
+    assert progress_call.args[1] == [{"job_id": "job-running", "logs": "50%"}]
+    publish.assert_awaited_once_with([("user:u1", {"job_id": "job-running", "status": "running", "logs": "50%"})])
+
+    # Only the overdue terminal job is finalized; the fresh one is left for its webhook
+    complete.assert_awaited_once()
+    assert complete.await_args.args[2]["status"] == "succeeded"
+
+
+@pytest.mark.unit
+def test_each_beat_run_gets_its_own_redis_client():
+    clients = []
+
+    async def run_once(session_factory):
+        clients.append(get_async_redis())
+        return {}
+
+    with patch("app.core.redis.settings.REDIS_URL", "redis://localhost:6379/0"), \
+         patch("app.tasks.reconcile_tasks.create_async_engine", return_value=AsyncMock()), \
+         patch("app.domain.jobs.reconciler.job_reconciler.run_once", run_once):
+        reconcile_running_jobs()
+        reconcile_running_jobs()
+
+    # A client cached from the first (closed) loop would fail with "Event loop is closed"
+    assert clients[0] is not clients[1]
+    assert len(redis_module._async_clients) == 0
@@ -0,0 +1,60 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.domain.jobs.executor import AsyncJobExecutor
+from app.domain.jobs.models import Job
+from app.domain.jobs.runner import _submitted_statement, process_job
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Job.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+@pytest.mark.unit
+def test_submission_is_recorded_once(session):
+    session.add(Job(id="job-1", status="queued", kind="image", prompt="p"))
+    session.commit()
+
+    assert session.execute(_submitted_statement("job-1", "replicate", "pred-1")).first() is not None
+    assert session.execute(_submitted_statement("job-1", "replicate", "pred-2")).first() is None
+    session.commit()
+
+    job = session.get(Job, "job-1")
+    session.refresh(job)
+    assert (job.status, job.provider_job_id) == ("running", "pred-1")
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("status, provider_job_id", [("running", "pred-1"), ("failed", None), ("succeeded", "pred-1")])
+def test_runner_skips_redelivered_job(status, provider_job_id):
+    job = Job(id="job-1", status=status, provider_job_id=provider_job_id, cost_credits=5, prompt="p")
+    with patch("app.domain.jobs.runner.SessionLocal") as session_cls, \
+         patch("app.domain.jobs.runner.provider_services") as providers:
+        session_cls.return_value.execute.return_value.scalar_one_or_none.return_value = job
+        assert process_job.run("job-1") == f"Skipped: {status}"
+
+    providers.load.assert_not_called()
+    assert job.provider_job_id == provider_job_id
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_executor_skips_redelivered_job():
+    job = Job(id="job-1", status="running", provider_job_id="pred-1", cost_credits=5, prompt="p")
+    session = AsyncMock()
+    session.execute.return_value = MagicMock(scalar_one_or_none=MagicMock(return_value=job))
+    factory = MagicMock()
+    factory.return_value.__aenter__.return_value = session
+
+    with patch("app.domain.jobs.executor.AsyncSessionLocal", factory), \
+         patch("app.domain.jobs.executor.provider_services") as providers:
+        outcome = await AsyncJobExecutor().execute("job-1")
+
+    assert outcome.result == "Skipped: running"
+    providers.load_async.assert_not_called()
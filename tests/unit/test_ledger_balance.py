@@ -0,0 +1,85 @@
+import uuid
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+from app.domain.billing.models import LedgerEntry
+from app.domain.billing.reconciler import BalanceReconciler
+from app.domain.billing.service import post_entry_sync
+from app.domain.users.models import User
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+    LedgerEntry.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+def _user(session, email="a@example.com") -> User:
+    user = User(email=email, hashed_password="x")
+    session.add(user)
+    session.commit()
+    return user
+
+
+class _AsyncSession:
+    """Async facade over a sync session, enough for the reconciler."""
+
+    def __init__(self, engine):
+        self.session = Session(engine)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.session.close()
+
+    async def execute(self, stmt):
+        return self.session.execute(stmt)
+
+    async def commit(self):
+        self.session.commit()
+
+
+@pytest.mark.unit
+def test_ledger_entries_move_the_balance_and_record_checkpoints(engine):
+    with Session(engine) as session:
+        user = _user(session)
+        topup = post_entry_sync(session, LedgerEntry(user_id=user.id, amount=100, reason="topup"))
+        spend = post_entry_sync(session, LedgerEntry(user_id=user.id, amount=-30, reason="job_cost"))
+        session.commit()
+
+        assert (topup.balance_before, topup.balance_after) == (0, 100)
+        assert (spend.balance_before, spend.balance_after) == (100, 70)
+        assert user.balance == 70  # Loaded object follows the UPDATE
+
+
+@pytest.mark.unit
+def test_entry_for_unknown_user_is_rejected(engine):
+    with Session(engine) as session:
+        with pytest.raises(ValueError):
+            post_entry_sync(session, LedgerEntry(user_id=uuid.uuid4(), amount=5, reason="topup"))
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reconciler_walks_chunks_and_reports_mismatches(engine):
+    with Session(engine) as session:
+        users = [_user(session, f"u{i}@example.com") for i in range(5)]
+        for user in users:
+            post_entry_sync(session, LedgerEntry(user_id=user.id, amount=10, reason="topup"))
+        drifted = users[3].id
+        session.execute(update(User).where(User.id == drifted).values(balance=999))
+        session.commit()
+
+    reconciler = BalanceReconciler(chunk_size=2)
+    summary = await reconciler.run_once(lambda: _AsyncSession(engine))
+    assert summary == {"checked": 5, "mismatched": 1, "repaired": 0}
+
+    reconciler.repair = True
+    assert (await reconciler.run_once(lambda: _AsyncSession(engine)))["repaired"] == 1
+    with Session(engine) as session:
+        assert session.get(User, drifted).balance == 10
+    assert (await reconciler.run_once(lambda: _AsyncSession(engine)))["mismatched"] == 0
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from app.core.media_pool import MediaPool, MediaPoolBusy
+
+POOL_SETTINGS = {"MEDIA_POOL_WORKERS": 2, "MEDIA_POOL_MAX_QUEUE": 2, "MEDIA_POOL_QUEUE_WAIT_SECONDS": 0.05,
+                 "MEDIA_POOL_TASK_TIMEOUT_SECONDS": 10.0, "MEDIA_POOL_START_METHOD": "fork"}
+
+
+@pytest.fixture
+def pool():
+    with patch.multiple("app.core.media_pool.settings", **POOL_SETTINGS):
+        media = MediaPool()
+        yield media
+        media.shutdown()
+
+
+def _crash():
+    os._exit(1)
+
+
+@pytest.mark.unit
+def test_start_warms_every_worker(pool):
+    pool.start()
+    assert len(pool._executor._processes) == 2  # Spawned before the first task
+    assert pool.call(os.getpid) in pool._executor._processes
+    assert pool.get_stats()["running"]
+
+
+@pytest.mark.unit
+def test_full_queue_waits_then_rejects(pool):
+    running = [pool.submit(time.sleep, 0.5) for _ in range(2)]
+    with pytest.raises(MediaPoolBusy):
+        pool.call(abs, -1)
+    for future in running:
+        future.result()
+    assert pool.call(abs, -1) == 1  # Slots are released as tasks finish
+    stats = pool.get_stats()
+    assert (stats["rejected"], stats["in_flight"], stats["peak_in_flight"]) == (1, 0, 2)
+
+
+@pytest.mark.unit
+def test_async_callers_are_rejected_without_waiting(pool):
+    running = [pool.submit(time.sleep, 0.5) for _ in range(2)]
+
+    async def scenario():
+        started = time.monotonic()
+        with pytest.raises(MediaPoolBusy):
+            await pool.run(abs, -1)
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 0.05
+    for future in running:
+        future.result()
+
+
+@pytest.mark.unit
+def test_timeout_abandons_the_task_but_keeps_its_slot(pool):
+    with pytest.raises(TimeoutError):
+        pool.call(time.sleep, 0.5, timeout=0.05)
+    assert pool.get_stats()["timeouts"] == 1
+    assert pool.get_stats()["in_flight"] == 1  # Still running in the worker
+    time.sleep(0.6)
+    assert pool.get_stats()["in_flight"] == 0
+
+
+@pytest.mark.unit
+def test_crashed_worker_rebuilds_the_pool(pool):
+    with pytest.raises(Exception):
+        pool.call(_crash)
+    assert pool.call(abs, -2) == 2
+    assert pool.get_stats()["restarts"] == 1
+
+
+@pytest.mark.unit
+def test_disabled_pool_runs_inline_and_off_the_loop():
+    with patch.multiple("app.core.media_pool.settings", **{**POOL_SETTINGS, "MEDIA_POOL_WORKERS": 0}):
+        media = MediaPool()
+        assert media.call(threading.get_ident) == threading.get_ident()
+
+        async def scenario():
+            return await media.run(threading.get_ident)
+
+        assert asyncio.run(scenario()) != threading.get_ident()
+        assert media.get_stats()["inline"] == 2
@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.domain.providers.prediction_cache import PredictionLookupCache
+
+@pytest.fixture(autouse=True)
+def no_redis():
+    with patch("app.domain.providers.prediction_cache.get_async_redis", return_value=None):
+        yield
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_request():
+    cache = PredictionLookupCache()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"id": "p1", "status": "processing"}
+
+    results = await asyncio.gather(*[cache.get("replicate:p1", fetch) for _ in range(5)])
+
+    assert calls == 1
+    assert all(r == {"id": "p1", "status": "processing"} for r in results)
+    stats = cache.get_stats()
+    assert stats["coalesced"] == 4
+    assert stats["saved_ratio"] == 0.8
+    assert stats["in_flight"] == 0
+
+    # Once finished, a new lookup goes out again
+    await cache.get("replicate:p1", fetch)
+    assert calls == 2
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_errors_propagate_to_all_waiters():
+    cache = PredictionLookupCache()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise IOError("boom")
+
+    results = await asyncio.gather(*[cache.get("replicate:p2", fetch) for _ in range(3)], return_exceptions=True)
+
+    assert all(isinstance(r, IOError) for r in results)
+    assert cache.get_stats()["errors"] == 1
+
+@pytest.mark.unit
+def test_ttl_depends_on_status():
+    cache = PredictionLookupCache(running_ttl=1.5, terminal_ttl=3600)
+
+    assert cache.ttl_for({"status": "processing"}) == 1.5
+    assert cache.ttl_for({"status": "succeeded"}) == 3600
@@ -0,0 +1,71 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from app.core.presign import PresignedUrlService
+
+BUCKET_URL = "https://bucket.s3.eu-west-1.amazonaws.com"
+
+
+@pytest.fixture
+def store():
+    store = MagicMock(enabled=True, bucket="bucket")
+    store.presigned_get.side_effect = lambda key, filename=None, expires_in=3600: f"signed:{key}:{filename}"
+    return store
+
+
+@pytest.fixture
+def presigner(store):
+    return PresignedUrlService(store, expires_in=3600, refresh_margin=600)
+
+
+@pytest.mark.unit
+def test_signatures_are_cached_per_key_and_filename(presigner, store):
+    assert presigner.sign("generations/a.jpg", "a.jpg") == "signed:generations/a.jpg:a.jpg"
+    assert presigner.sign("generations/a.jpg", "a.jpg") == "signed:generations/a.jpg:a.jpg"
+    assert presigner.sign("generations/a.jpg") == "signed:generations/a.jpg:None"
+    assert store.presigned_get.call_count == 2
+    assert presigner.stats["hits"] == 1 and presigner.stats["signed"] == 2
+
+
+@pytest.mark.unit
+def test_resigns_before_expiry(presigner, store):
+    with patch("app.core.presign.time.time", return_value=1000.0):
+        presigner.sign("k")
+    with patch("app.core.presign.time.time", return_value=1000.0 + 3600 - 601):
+        presigner.sign("k")
+    assert store.presigned_get.call_count == 1
+    with patch("app.core.presign.time.time", return_value=1000.0 + 3600 - 600):
+        presigner.sign("k")
+    assert store.presigned_get.call_count == 2
+
+
+@pytest.mark.unit
+def test_lru_bound(store):
+    presigner = PresignedUrlService(store, max_entries=2)
+    for key in ("a", "b", "a", "c"):
+        presigner.sign(key)
+    assert list(presigner._cache) == [("a", None), ("c", None)]
+    assert presigner.stats["evicted"] == 1
+
+
+@pytest.mark.unit
+def test_batch_signing_of_result_urls(presigner, store):
+    urls = [f"{BUCKET_URL}/generations/a.jpg", "https://replicate.delivery/x.png", None,
+            f"{BUCKET_URL}/generations/a.jpg", f"{BUCKET_URL}/generations/b.mp4"]
+    signed = presigner.sign_result_urls(urls)
+    assert signed == {
+        f"{BUCKET_URL}/generations/a.jpg": "signed:generations/a.jpg:None",
+        f"{BUCKET_URL}/generations/b.mp4": "signed:generations/b.mp4:None",
+    }
+    assert store.presigned_get.call_count == 2
+
+    # Foreign URLs pass through the single-item form unchanged
+    assert presigner.sign_result_url("https://replicate.delivery/x.png", "x.png") == "https://replicate.delivery/x.png"
+
+
+@pytest.mark.unit
+def test_batch_signing_failure_degrades(presigner, store):
+    store.presigned_get.side_effect = RuntimeError("no credentials")
+    assert presigner.sign_result_urls([f"{BUCKET_URL}/generations/a.jpg"]) == {}
+    with pytest.raises(RuntimeError):
+        presigner.sign("generations/a.jpg", "a.jpg")
+    assert presigner.stats["errors"] == 2
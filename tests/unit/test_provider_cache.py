@@ -0,0 +1,58 @@
+import datetime
+import pytest
+from unittest.mock import MagicMock, patch
+from app.domain.providers.cache import ProviderServiceCache
+from app.domain.providers.models import ProviderConfig
+from app.domain.providers.service import encrypt_key
+
+def _config(updated_at=None, key="r8_secret"):
+    return ProviderConfig(id=1, provider_id="replicate", encrypted_api_key=encrypt_key(key),
+                          is_active=True, updated_at=updated_at)
+
+def _session(rows):
+    session = MagicMock()
+    session.execute.return_value.scalars.return_value.all.return_value = rows
+    return session
+
+@pytest.fixture(autouse=True)
+def no_redis():
+    with patch("app.domain.providers.cache.get_redis", return_value=None):
+        yield
+
+@pytest.mark.unit
+def test_services_are_reused_between_jobs():
+    cache = ProviderServiceCache(ttl=60)
+    session = _session([_config()])
+
+    first = cache.load(session).get_service("replicate")
+    second = cache.load(session).get_service("replicate")
+
+    assert first is second
+    assert first.api_key == "r8_secret"
+    assert session.execute.call_count == 1
+    assert cache.get_stats()["services_built"] == 1
+
+@pytest.mark.unit
+def test_invalidation_picks_up_rotated_key():
+    cache = ProviderServiceCache(ttl=60)
+    old = cache.load(_session([_config()])).get_service("replicate")
+
+    cache._on_message({"data": b"replicate"})
+    rotated = _config(updated_at=datetime.datetime(2026, 1, 1), key="r8_rotated")
+    new = cache.load(_session([rotated])).get_service("replicate")
+
+    assert new is not old
+    assert new.api_key == "r8_rotated"
+    assert cache.get_stats()["services"] == 1
+
+@pytest.mark.unit
+def test_ttl_expiry_reloads_and_missing_provider_raises():
+    cache = ProviderServiceCache(ttl=0)
+    session = _session([])
+
+    snapshot = cache.load(session)
+    cache.load(session)
+
+    assert session.execute.call_count == 2
+    with pytest.raises(ValueError):
+        snapshot.get_service("replicate")
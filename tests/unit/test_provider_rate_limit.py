@@ -0,0 +1,84 @@
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from app.domain.providers.rate_limit import ProviderRateLimiter, RateLimit, Admission
+from app.domain.jobs.runner import _throttle_state, _reschedule_throttled
+
+
+LIMIT = RateLimit.for_key("replicate", "r8_secret", rate=2, burst=5)
+
+
+@pytest.mark.unit
+def test_bucket_is_keyed_by_provider_and_key_fingerprint():
+    assert LIMIT.bucket.startswith("replicate:")
+    assert "r8_secret" not in LIMIT.bucket
+    assert RateLimit.for_key("replicate", "other", 2, 5).bucket != LIMIT.bucket
+    assert RateLimit.for_key("replicate", "k", 2, None).burst == 1
+
+
+@pytest.mark.unit
+def test_acquire_without_redis_does_not_throttle():
+    limiter = ProviderRateLimiter()
+    with patch("app.domain.providers.rate_limit.get_redis", return_value=None):
+        assert limiter.acquire(LIMIT) == Admission()
+    assert limiter.acquire(None) == Admission()
+
+
+@pytest.mark.unit
+def test_acquire_returns_reserved_wait():
+    limiter = ProviderRateLimiter(max_reserve=60)
+    client = MagicMock()
+    client.eval.side_effect = [[0, 1], [1500, 1], [90000, 0]]
+    with patch("app.domain.providers.rate_limit.get_redis", return_value=client):
+        assert limiter.acquire(LIMIT) == Admission()
+        assert limiter.acquire(LIMIT) == Admission(wait=1.5, reserved=True)
+        assert limiter.acquire(LIMIT) == Admission(wait=90.0, reserved=False)
+    # Max reserve is passed to the script in ms
+    assert client.eval.call_args[0][-1] == 60000
+    assert limiter.stats["admitted"] == 1
+    assert limiter.stats["throttled"] == 2
+    assert limiter.stats["deferred"] == 1
+
+
+@pytest.mark.unit
+def test_redis_error_fails_open():
+    limiter = ProviderRateLimiter()
+    client = MagicMock()
+    client.eval.side_effect = ConnectionError("down")
+    with patch("app.domain.providers.rate_limit.get_redis", return_value=client):
+        assert limiter.acquire(LIMIT) == Admission()
+    assert limiter.stats["errors"] == 1
+
+
+@pytest.mark.unit
+def test_reschedule_keeps_retry_count_and_queue():
+    task = MagicMock()
+    task.request = SimpleNamespace(retries=2, delivery_info={"routing_key": "jobs.user.image"})
+    result = _reschedule_throttled(task, "job-1", Admission(wait=3.0, reserved=True), throttled_since=100.0)
+
+    assert result.startswith("Throttled")
+    kwargs = task.apply_async.call_args.kwargs
+    assert kwargs["countdown"] == 3.0
+    assert kwargs["retries"] == 2
+    assert kwargs["queue"] == "jobs.user.image"
+    assert kwargs["headers"]["throttled_since"] == 100.0
+    assert "rate_slot_at" in kwargs["headers"]
+    task.retry.assert_not_called()
+
+
+@pytest.mark.unit
+def test_unreserved_reschedule_must_ask_again():
+    task = MagicMock()
+    task.request = SimpleNamespace(retries=0, delivery_info={})
+    _reschedule_throttled(task, "job-1", Admission(wait=300.0, reserved=False))
+    assert "rate_slot_at" not in task.apply_async.call_args.kwargs["headers"]
+
+
+@pytest.mark.unit
+def test_reserved_slot_is_honoured_only_briefly():
+    now = time.time()
+    assert _throttle_state(SimpleNamespace(throttled_since=1.0, rate_slot_at=now)) == (1.0, True)
+    assert _throttle_state(SimpleNamespace(throttled_since=1.0, rate_slot_at=now - 600))[1] is False
+    assert _throttle_state(SimpleNamespace(headers={"rate_slot_at": now}))[1] is True
+    assert _throttle_state(SimpleNamespace()) == (None, False)
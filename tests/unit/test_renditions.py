@@ -0,0 +1,97 @@
+import io
+import pytest
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+from PIL import Image
+from app.domain.jobs import renditions
+from app.domain.jobs.ingest import ingest_output
+from app.domain.jobs.models import Job
+
+
+def _png(size, mode="RGB", color="red") -> bytes:
+    buf = io.BytesIO()
+    Image.new(mode, size, color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.mark.unit
+def test_render_downscales_from_one_decode():
+    image = Image.open(io.BytesIO(_png((2000, 1000))))
+    out = renditions.render(image, "job-1", [512, 256, 1024, 4096], ["webp", "jpeg"], {"webp": 75})
+
+    assert [(r.width, r.height, r.format) for r, _ in out] == [
+        (1024, 512, "webp"), (1024, 512, "jpeg"),
+        (512, 256, "webp"), (512, 256, "jpeg"),
+        (256, 128, "webp"), (256, 128, "jpeg"),
+    ]
+    rendition, body = out[0]
+    assert rendition.key == "renditions/job-1/1024.webp"
+    assert rendition.size == len(body)
+    assert Image.open(io.BytesIO(body)).format == "WEBP"
+
+
+@pytest.mark.unit
+def test_unavailable_formats_are_skipped():
+    with patch.dict(renditions.FORMATS, {"webp": ("NOPE", "webp", "image/webp")}):
+        assert renditions.available_formats(["webp", "jpeg", "bmp"]) == ["jpeg"]
+
+
+@pytest.mark.unit
+def test_alpha_is_kept_for_webp():
+    image = Image.open(io.BytesIO(_png((600, 600), "RGBA", (255, 0, 0, 128))))
+    (rendition, body), = renditions.render(image, "job-1", [256], ["webp"], {})
+    assert Image.open(io.BytesIO(body)).mode == "RGBA"
+
+
+@pytest.mark.unit
+def test_pick_smallest_fitting_rendition():
+    stored = [
+        {"width": 1024, "format": "webp", "url": "w1024"},
+        {"width": 256, "format": "webp", "url": "w256"},
+        {"width": 512, "format": "avif", "url": "a512"},
+        {"width": 512, "format": "webp", "url": "w512"},
+    ]
+    assert renditions.pick(stored, 300)["url"] == "w512"
+    assert renditions.pick(stored, 100)["url"] == "w256"
+    assert renditions.pick(stored, 300, fmt="avif")["url"] == "a512"
+    assert renditions.pick(stored, 2000) is None
+    assert renditions.pick(None, 256) is None
+
+
+@pytest.mark.unit
+def test_ingest_uploads_original_and_renditions():
+    client = MagicMock()
+    client.get.return_value.content = _png((800, 400))
+    client.get.return_value.headers = {"content-type": "image/png"}
+    storage = MagicMock(bucket="bucket")
+    storage.put_bytes.side_effect = lambda key, body, content_type: f"https://bucket.s3/{key}"
+
+    def submit(fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    storage.submit.side_effect = submit
+    with patch("app.domain.jobs.ingest.get_sync_client", return_value=client), \
+         patch("app.domain.jobs.ingest.storage", storage), \
+         patch("app.core.media_pool.settings.MEDIA_POOL_WORKERS", 0), \
+         patch("app.domain.jobs.renditions.settings.IMAGE_RENDITION_WIDTHS", [256, 512, 1024]), \
+         patch("app.domain.jobs.renditions.settings.IMAGE_RENDITION_FORMATS", ["webp"]):
+        result = ingest_output("job-1", "image", "https://r/out.png")
+
+    assert result.url == "https://bucket.s3/generations/job-1.png"  # Small PNG kept as is
+    assert (result.width, result.height) == (800, 400)
+    assert [(r.width, r.url) for r in result.renditions] == [
+        (512, "https://bucket.s3/renditions/job-1/512.webp"),
+        (256, "https://bucket.s3/renditions/job-1/256.webp"),
+    ]
+    content_types = {c.args[0]: c.args[2] for c in storage.put_bytes.call_args_list}
+    assert content_types["renditions/job-1/512.webp"] == "image/webp"
+
+
+@pytest.mark.unit
+def test_output_urls_include_renditions():
+    job = Job(id="job-1", kind="image", prompt="p", result_url="https://b/generations/job-1.jpg",
+              renditions=[{"width": 256, "format": "webp", "url": "https://b/renditions/job-1/256.webp"}])
+    assert job.output_urls() == ["https://b/generations/job-1.jpg", "https://b/renditions/job-1/256.webp"]
+    assert Job(id="job-2", kind="image", prompt="p").output_urls() == []
@@ -0,0 +1,75 @@
+import httpx
+import pytest
+from unittest.mock import MagicMock, patch
+from app.domain.jobs.retry_policy import RetryPolicy, classify, RETRYABLE, THROTTLED, PERMANENT
+from app.domain.providers.errors import ProviderHTTPError, parse_retry_after
+
+
+def _http_error(status, retry_after=None):
+    return ProviderHTTPError(f"Replicate API returned {status}: ...", status_code=status, retry_after=retry_after)
+
+
+@pytest.mark.unit
+def test_classifies_structured_and_transport_errors():
+    assert classify(_http_error(429, 7)) == (THROTTLED, 7)
+    assert classify(_http_error(503)) == (RETRYABLE, None)
+    assert classify(_http_error(422)) == (PERMANENT, None)
+    assert classify(_http_error(401)) == (PERMANENT, None)
+    assert classify(httpx.ConnectTimeout("slow")) == (RETRYABLE, None)
+    assert classify(ValueError("Invalid model_ref flux")) == (PERMANENT, None)
+    # Unstructured errors from legacy adapters
+    assert classify(IOError("returned 422"))[0] == PERMANENT
+    assert classify(IOError("boom"))[0] == RETRYABLE
+
+
+@pytest.mark.unit
+def test_backoff_grows_with_jitter_and_respects_retry_after():
+    policy = RetryPolicy(base=4, cap=60)
+    for retries, (low, high) in enumerate([(2, 4), (4, 8), (8, 16), (16, 32), (30, 60), (30, 60)]):
+        delay = policy.backoff(retries)
+        assert low <= delay <= high
+    assert policy.backoff(0, retry_after=30) >= 30
+
+
+@pytest.mark.unit
+def test_permanent_errors_fail_without_retry():
+    policy = RetryPolicy()
+    with patch("app.domain.jobs.retry_policy.get_redis", return_value=None):
+        decision = policy.decide(_http_error(422), "replicate", 0, 3)
+    assert not decision.retry
+    assert decision.error.startswith("Validation Error")
+    assert policy.stats[PERMANENT] == 1
+
+
+@pytest.mark.unit
+def test_retries_until_max_then_fails():
+    policy = RetryPolicy(base=1, cap=2)
+    with patch("app.domain.jobs.retry_policy.get_redis", return_value=None):
+        assert policy.decide(_http_error(503), "replicate", 2, 3).retry
+        decision = policy.decide(_http_error(503), "replicate", 3, 3)
+    assert not decision.retry and decision.error
+    assert policy.stats["exhausted"] == 1
+
+
+@pytest.mark.unit
+def test_exhausted_budget_fails_instead_of_retrying():
+    policy = RetryPolicy()
+    client = MagicMock()
+    client.eval.return_value = 0
+    with patch("app.domain.jobs.retry_policy.get_redis", return_value=client):
+        decision = policy.decide(_http_error(503), "replicate", 0, 3)
+    assert not decision.retry
+    assert "retry budget" in decision.error
+    keys = client.eval.call_args[0][2:4]
+    assert keys[0].startswith("retry:budget:replicate:") and keys[1] == "retry:stats:replicate"
+
+
+@pytest.mark.unit
+def test_parse_retry_after():
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    resp = httpx.Response(429, headers={"Retry-After": "3"}, json={"detail": "throttled"})
+    err = ProviderHTTPError.from_response("Replicate", resp)
+    assert err.status_code == 429 and err.retry_after == 3.0 and err.body == {"detail": "throttled"}
+    assert isinstance(err, IOError)
@@ -1,87 +1,64 @@
+import uuid
 import pytest
 from unittest.mock import MagicMock, patch, ANY
+from app.domain.jobs.models import Job
 from app.domain.jobs.runner import process_job
 
 @pytest.fixture
 def mock_dependencies():
     with patch("app.domain.jobs.runner.SessionLocal") as mock_session_cls, \
-         patch("app.domain.jobs.runner.ReplicateService") as mock_service_cls, \
-         patch("app.domain.jobs.runner.decrypt_key") as mock_decrypt:
-         
+         patch("app.domain.jobs.runner.provider_services") as mock_providers, \
+         patch("app.domain.jobs.runner.rate_limiter") as mock_limiter, \
+         patch("app.domain.jobs.runner.retry_policy"), \
+         patch("app.domain.jobs.runner.publish_job_event_sync"):
+
         mock_session = mock_session_cls.return_value
-        mock_service = mock_service_cls.return_value
-        mock_decrypt.return_value = "secret_key"
-        
+        mock_service = MagicMock()
+        mock_service.normalize_payload.side_effect = lambda params, schema: params
+        mock_providers.load.return_value.get_service.return_value = mock_service
+        mock_limiter.acquire.return_value.wait = 0
+
         yield mock_session, mock_service
 
+@pytest.mark.unit
 def test_process_job_coordinator_flow(mock_dependencies):
     mock_session, mock_service = mock_dependencies
-    
-    # 1. Setup Mock DB Data
-    mock_job = MagicMock()
-    mock_job.id = "job-123"
-    mock_job.prompt = "[my/model] {params} | prompt"
-    
-    mock_provider = MagicMock()
-    mock_provider.encrypted_api_key = "enc_key"
-    
+    model_id = uuid.uuid4()
+
+    # 1. Setup DB Data: inputs live in typed columns (model_id, generation_params, prompt)
+    job = Job(id="job-123", status="queued", model_id=model_id, model_ref="test/model",
+              generation_params={"aspect_ratio": "16:9"}, prompt="actual prompt", cost_credits=0)
+
     mock_ai_model = MagicMock()
-    mock_ai_model.id = "uuid-123"
+    mock_ai_model.id = model_id
+    mock_ai_model.provider = "replicate"
     mock_ai_model.model_ref = "test/model"
     mock_ai_model.version_id = "v1"
-    mock_ai_model.ui_config = {}
-    mock_ai_model.normalized_caps_json = {"inputs": [{"name": "foo", "type": "string"}]}
-    
-    # Configure Session Returns
-    # First call: Job
-    # Second call: Provider
-    # Third call: AIModel (if UUID matches)
-    
+    mock_ai_model.ui_config = {"num_outputs": {"default": 1}}
+
     def side_effect(query):
         # Very rough mock of SQLAlchemy execution
         s_query = str(query)
         mock_res = MagicMock()
         if "FROM jobs" in s_query:
-            mock_res.scalar_one_or_none.return_value = mock_job
-        elif "FROM provider_configs" in s_query:
-            mock_res.scalars.return_value.first.return_value = mock_provider
+            mock_res.scalar_one_or_none.return_value = job
         elif "FROM ai_models" in s_query:
             mock_res.scalar_one_or_none.return_value = mock_ai_model
-        return mock_res
-        
+        return mock_res  # UPDATE jobs ... RETURNING: a row, the submission is recorded
+
     mock_session.execute.side_effect = side_effect
-    
-    # 2. Setup Service Mocks
-    mock_service.parse_input_string.return_value = ("uuid-123", {"foo": "bar"}, "actual prompt")
-    mock_service.build_payload.return_value = {"foo": "bar", "prompt": "actual prompt"}
     mock_service.submit_prediction.return_value = "pred-id"
-    
-    # patch uuid
-    with patch("app.domain.jobs.runner.uuid.UUID") as mock_uuid:
-        mock_uuid.return_value = "uuid-123" # match our expectations
-        
-        # 3. Validation Logic in Runner checks UUID. 
-        # But wait, runner does `uuid.UUID(model_identifier)`.
-        # If model_identifier is "uuid-123" (string), uuid.UUID("uuid-123") works.
-        # So we don't strictly need to patch UUID if we use valid UUID string.
-        # But "uuid-123" isn't valid UUID.
-        
-        # ACT
-        process_job("job-123")
-        
-        # ASSERT
-        # Verify Service Calls
-        mock_service.parse_input_string.assert_called_with("[my/model] {params} | prompt")
-        
-        # Verify Payload Builder usage
-        mock_service.build_payload.assert_called_with(
-            {"foo": "bar", "prompt": "actual prompt"}, 
-            [{"name": "foo", "type": "string"}]
-        )
-        
-        # Verify Submission
-        mock_service.submit_prediction.assert_called_with(
-            model_ref="test/model:v1",
-            input_data={"foo": "bar", "prompt": "actual prompt"},
-            webhook_url=ANY
-        )
+
+    # ACT
+    assert process_job("job-123") == "Submitted: pred-id"
+
+    # ASSERT
+    # Model defaults are merged into the stored params, prompt comes from its column
+    mock_service.submit_prediction.assert_called_with(
+        model_ref="test/model:v1",
+        input_data={"aspect_ratio": "16:9", "num_outputs": 1, "prompt": "actual prompt"},
+        webhook_url=ANY
+    )
+    assert (job.status, job.provider_job_id, job.provider) == ("running", "pred-id", "replicate")
+    assert job.generation_params == {"aspect_ratio": "16:9"}  # Stored params are not mutated
+    mock_session.commit.assert_called_once()
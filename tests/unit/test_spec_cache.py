@@ -0,0 +1,101 @@
+import uuid
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.domain.catalog.cache import SpecCache
+from app.domain.catalog.service import CatalogService
+from app.domain.catalog.schemas import ModelUISpec
+from app.domain.providers.models import AIModel
+
+RAW_SCHEMA = {
+    "components": {
+        "schemas": {
+            "Input": {
+                "properties": {
+                    "prompt": {"type": "string", "title": "Prompt"},
+                    "steps": {"type": "integer", "default": 4, "minimum": 1, "maximum": 50}
+                }
+            }
+        }
+    }
+}
+
+@pytest.fixture
+def model():
+    return AIModel(
+        id=uuid.uuid4(),
+        display_name="Test",
+        provider="replicate",
+        model_ref="owner/name",
+        raw_schema_json=RAW_SCHEMA,
+        ui_config={}
+    )
+
+@pytest.mark.unit
+def test_resolve_hits_cache_after_first_call(model):
+    cache = SpecCache(max_size=10)
+    service = CatalogService(cache=cache)
+
+    with patch.object(service.pipeline, "process", wraps=service.pipeline.process) as spy:
+        first = service.resolve_ui_spec(model, "starter")
+        second = service.resolve_ui_spec(model, "starter")
+        service.resolve_ui_spec(model, "admin")
+
+    assert first is second
+    assert spy.call_count == 2  # starter once, admin once
+    stats = cache.get_stats()
+    assert stats["hits_local"] == 1
+    assert stats["misses"] == 2
+
+@pytest.mark.unit
+def test_invalidate_bumps_version(model):
+    cache = SpecCache(max_size=10)
+    service = CatalogService(cache=cache)
+
+    before = service.resolve_ui_spec(model)
+    model.ui_config = {"steps": {"default": 8}}
+    service.invalidate_model(model)
+    after = service.resolve_ui_spec(model)
+
+    assert model.schema_version_hash is not None
+    assert before is not after
+    assert next(p for p in after.parameters if p.id == "steps").default == 8
+
+@pytest.mark.unit
+def test_stale_stored_hash_never_serves_old_spec(model):
+    service = CatalogService(cache=SpecCache(max_size=10))
+    model.schema_version_hash = "stale"
+
+    service.resolve_ui_spec(model)
+    model.ui_config = {"steps": {"default": 8}}  # e.g. a migration script, no invalidate_model
+    after = service.resolve_ui_spec(model)
+
+    assert next(p for p in after.parameters if p.id == "steps").default == 8
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_async_invalidation_uses_async_redis(model):
+    cache = SpecCache(max_size=10, use_redis=True)
+    cache.set((str(model.id), "v", "starter"), ModelUISpec(model_id=str(model.id), groups=[], parameters=[]))
+
+    async def scan_iter(match, count):
+        yield f"catalog:spec:{model.id}:v:starter"
+
+    client = MagicMock(scan_iter=scan_iter, delete=AsyncMock())
+    with patch("app.domain.catalog.cache.get_async_redis", return_value=client), \
+         patch("app.domain.catalog.cache.get_redis") as sync_redis:
+        await CatalogService(cache=cache).invalidate_model_async(model)
+
+    client.delete.assert_awaited_once_with(f"catalog:spec:{model.id}:v:starter")
+    sync_redis.assert_not_called()
+    assert cache.get_stats()["size"] == 0
+    assert model.schema_version_hash is not None
+
+@pytest.mark.unit
+def test_lru_eviction():
+    cache = SpecCache(max_size=2)
+    for i in range(3):
+        cache.set((str(i), "v", "starter"), ModelUISpec(model_id=str(i), groups=[], parameters=[]))
+
+    assert cache.get(("0", "v", "starter")) is None
+    assert cache.get(("2", "v", "starter")) is not None
+    assert cache.get_stats()["size"] == 2
@@ -0,0 +1,63 @@
+import os
+import pytest
+from unittest.mock import MagicMock, patch
+from botocore.exceptions import ClientError
+from app.core.storage import S3Storage
+
+
+@pytest.fixture
+def storage():
+    with patch("app.core.storage.settings.AWS_BUCKET_NAME", "bucket"), \
+         patch("app.core.storage.settings.AWS_REGION", "eu-west-1"):
+        yield S3Storage()
+
+
+@pytest.mark.unit
+def test_client_is_created_once_per_process(storage):
+    with patch.object(S3Storage, "_create_client", side_effect=lambda: MagicMock()) as create:
+        first = storage.client()
+        assert storage.client() is first
+        assert create.call_count == 1
+
+        # Simulated fork: the child builds its own client
+        storage._pid = os.getpid() + 1
+        assert storage.client() is not first
+        assert create.call_count == 2
+
+
+@pytest.mark.unit
+def test_client_configuration(storage):
+    client = storage._create_client()
+    config = client.meta.config
+    assert config.max_pool_connections > 1
+    assert config.retries["mode"] == "standard"
+    assert client.meta.region_name == "eu-west-1"
+
+
+@pytest.mark.unit
+def test_archive_moves_object_and_tolerates_missing(storage):
+    s3 = MagicMock()
+    storage._client = s3
+    assert storage.archive("generations/a.jpg")
+    s3.copy_object.assert_called_once_with(
+        CopySource={"Bucket": "bucket", "Key": "generations/a.jpg"}, Bucket="bucket", Key="deleted/generations/a.jpg"
+    )
+    s3.delete_object.assert_called_once_with(Bucket="bucket", Key="generations/a.jpg")
+
+    s3.copy_object.side_effect = ClientError({"Error": {"Code": "NoSuchKey"}}, "CopyObject")
+    assert not storage.archive("generations/missing.jpg")
+    assert storage.stats["archived"] == 1 and storage.stats["archive_errors"] == 1
+
+
+@pytest.mark.unit
+def test_urls(storage):
+    assert storage.public_url("generations/a.jpg") == "https://bucket.s3.eu-west-1.amazonaws.com/generations/a.jpg"
+    assert S3Storage.key_from_url("https://bucket.s3.eu-west-1.amazonaws.com/generations/a.jpg") == "generations/a.jpg"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_run_uses_storage_pool(storage):
+    import threading
+    name = await storage.run(lambda: threading.current_thread().name)
+    assert name.startswith("s3")
@@ -0,0 +1,76 @@
+import hashlib
+import pytest
+from unittest.mock import MagicMock, patch
+from app.domain.jobs.transfer import StreamingUpload, MIN_PART_SIZE
+
+MB = 1024 * 1024
+
+
+def _s3():
+    s3 = MagicMock()
+    s3.create_multipart_upload.return_value = {"UploadId": "up-1"}
+    s3.upload_part.side_effect = lambda **kw: {"ETag": f"etag-{kw['PartNumber']}"}
+    return s3
+
+
+def _chunks(total, size=MB):
+    data = bytes(range(256)) * (total // 256)
+    return data, [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.unit
+def test_small_stream_uses_single_put():
+    s3 = _s3()
+    result = StreamingUpload(s3, "b", "k", "video/mp4", part_size=MIN_PART_SIZE, max_memory=20 * MB).upload([b"abc", b"def"])
+    s3.put_object.assert_called_once()
+    s3.create_multipart_upload.assert_not_called()
+    assert result.size == 6 and result.parts == 1
+
+
+@pytest.mark.unit
+def test_large_stream_is_uploaded_in_parts_with_checksum():
+    s3 = _s3()
+    data, chunks = _chunks(12 * MB)
+    upload = StreamingUpload(s3, "b", "k", "video/mp4", part_size=5 * MB, max_memory=15 * MB, checksum=True)
+    result = upload.upload(chunks)
+
+    assert upload.max_in_flight == 2
+    assert result.parts == 3 and result.size == len(data)
+    assert result.sha256 == hashlib.sha256(data).hexdigest()
+    sizes = [len(c.kwargs["Body"]) for c in s3.upload_part.call_args_list]
+    assert sorted(sizes) == [2 * MB, 5 * MB, 5 * MB]
+    parts = s3.complete_multipart_upload.call_args.kwargs["MultipartUpload"]["Parts"]
+    assert [p["PartNumber"] for p in parts] == [1, 2, 3]
+    assert all("ChecksumSHA256" in p for p in parts)
+
+
+@pytest.mark.unit
+def test_failed_part_is_resent():
+    s3 = _s3()
+    calls = {"n": 0}
+
+    def flaky(**kw):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise ConnectionError("reset")
+        return {"ETag": "e"}
+
+    s3.upload_part.side_effect = flaky
+    _, chunks = _chunks(6 * MB)
+    upload = StreamingUpload(s3, "b", "k", "video/mp4", part_size=5 * MB, max_memory=15 * MB)
+    with patch("app.domain.jobs.transfer.time.sleep"):
+        result = upload.upload(chunks)
+    assert result.retried_parts == 1
+    s3.abort_multipart_upload.assert_not_called()
+
+
+@pytest.mark.unit
+def test_unrecoverable_failure_aborts_upload():
+    s3 = _s3()
+    s3.upload_part.side_effect = ConnectionError("down")
+    _, chunks = _chunks(11 * MB)
+    upload = StreamingUpload(s3, "b", "k", "video/mp4", part_size=5 * MB, max_memory=15 * MB, part_retries=0)
+    with pytest.raises(ConnectionError):
+        upload.upload(chunks)
+    s3.abort_multipart_upload.assert_called_once_with(Bucket="b", Key="k", UploadId="up-1")
+    s3.complete_multipart_upload.assert_not_called()
@@ -0,0 +1,107 @@
+import json
+import os
+import subprocess
+import pytest
+from unittest.mock import MagicMock, patch
+from app.domain.jobs import video
+from app.domain.jobs.ingest import ingest_output
+from app.domain.jobs.transfer import TransferResult
+from app.domain.providers.normalization.media_processor import MediaProcessor
+
+PROBE = {
+    "format": {"duration": "5.28"},
+    "streams": [
+        {"codec_type": "video", "codec_name": "h264", "width": 1920, "height": 1080,
+         "side_data_list": [{"rotation": -90}]},
+        {"codec_type": "audio", "codec_name": "aac"},
+    ],
+}
+
+
+@pytest.mark.unit
+def test_probe_reads_duration_and_display_dimensions():
+    done = subprocess.CompletedProcess([], 0, stdout=json.dumps(PROBE).encode())
+    with patch("app.domain.providers.normalization.media_processor.subprocess.run", return_value=done) as run:
+        info = MediaProcessor().probe_video("/tmp/x.mp4")
+    assert run.call_args[0][0][0] == "ffprobe"
+    assert info == {"duration": 5.28, "width": 1080, "height": 1920, "codec": "h264", "has_audio": True}
+
+
+@pytest.mark.unit
+def test_probe_failure_returns_none():
+    error = subprocess.CalledProcessError(1, ["ffprobe"], stderr=b"moov atom not found")
+    with patch("app.domain.providers.normalization.media_processor.subprocess.run", side_effect=error):
+        assert MediaProcessor().probe_video("/tmp/x.mp4") is None
+
+
+def _fake_ffmpeg(cmd, **kwargs):
+    if cmd[0] == "ffprobe":
+        return subprocess.CompletedProcess(cmd, 0, stdout=json.dumps({**PROBE, "format": {"duration": "1.0"}}).encode())
+    with open(cmd[-1], "wb") as f:
+        f.write(b"out")
+    return subprocess.CompletedProcess(cmd, 0, stdout=b"")
+
+
+@pytest.mark.unit
+def test_process_video_uploads_poster_and_preview(tmp_path):
+    storage = MagicMock()
+    storage.upload_fileobj.side_effect = lambda f, key, content_type: f"https://bucket.s3/{key}"
+    with patch("app.domain.providers.normalization.media_processor.subprocess.run", side_effect=_fake_ffmpeg) as run, \
+         patch("app.domain.jobs.video.storage", storage):
+        assets = video.process_video("job-1", "/tmp/source.mp4", str(tmp_path))
+
+    assert (assets.duration, assets.width, assets.height) == (1.0, 1080, 1920)
+    assert assets.poster_url == "https://bucket.s3/renditions/job-1/poster.jpg"
+    assert assets.preview_url == "https://bucket.s3/renditions/job-1/preview.mp4"
+    poster_cmd = run.call_args_list[1][0][0]
+    assert poster_cmd[poster_cmd.index("-ss") + 1] == "0.500"  # Clamped to mid-video
+
+
+@pytest.mark.unit
+def test_process_video_keeps_going_without_preview(tmp_path):
+    def ffmpeg(cmd, **kwargs):
+        if "libx264" in cmd:
+            raise subprocess.CalledProcessError(1, cmd, stderr=b"Unknown encoder")
+        return _fake_ffmpeg(cmd, **kwargs)
+
+    storage = MagicMock()
+    storage.upload_fileobj.return_value = "https://bucket.s3/poster"
+    with patch("app.domain.providers.normalization.media_processor.subprocess.run", side_effect=ffmpeg), \
+         patch("app.domain.jobs.video.storage", storage):
+        assets = video.process_video("job-1", "/tmp/source.mp4", str(tmp_path))
+    assert assets.poster_url == "https://bucket.s3/poster"
+    assert assets.preview_url is None
+
+
+@pytest.mark.unit
+def test_video_ingest_probes_the_streamed_copy_and_cleans_up():
+    resp = MagicMock()
+    client = MagicMock()
+    client.stream.return_value.__enter__.return_value = resp
+    seen = {}
+
+    def stream_to_s3(s3, response, bucket, key, content_type, tee=None):
+        tee.write(b"video-bytes")
+        return TransferResult(key=key, size=11, parts=1)
+
+    def process_video(job_id, path, workdir, info=None):
+        with open(path, "rb") as f:
+            seen["body"] = f.read()  # Flushed before the stage runs
+        seen["workdir"] = workdir
+        return video.VideoAssets(duration=5.28, width=1080, height=1920,
+                                 poster_url="https://b/poster.jpg", preview_url="https://b/preview.mp4")
+
+    storage = MagicMock(bucket="bucket")
+    storage.public_url.side_effect = lambda key: f"https://bucket.s3/{key}"
+    with patch("app.domain.jobs.ingest.get_sync_client", return_value=client), \
+         patch("app.domain.jobs.ingest.storage", storage), \
+         patch("app.domain.jobs.ingest.settings.VIDEO_FASTSTART_ENABLED", False), \
+         patch("app.domain.jobs.ingest.probe", return_value=None), \
+         patch("app.domain.jobs.ingest.stream_to_s3", side_effect=stream_to_s3), \
+         patch("app.domain.jobs.ingest.process_video", side_effect=process_video):
+        result = ingest_output("job-1", "video", "https://r/out.mp4")
+
+    assert seen["body"] == b"video-bytes"
+    assert not os.path.exists(seen["workdir"])
+    assert (result.width, result.height, result.duration) == (1080, 1920, 5.28)
+    assert result.cover_url == "https://b/poster.jpg" and result.preview_url == "https://b/preview.mp4"
@@ -0,0 +1,180 @@
+import os
+import struct
+import subprocess
+import pytest
+from unittest.mock import MagicMock, patch
+from concurrent.futures import Future
+from app.domain.jobs import video
+from app.domain.jobs.ingest import ingest_output
+from app.domain.jobs.models import Job
+from app.domain.jobs.transfer import TransferResult
+from app.domain.providers.normalization.media_processor import MediaProcessor
+
+
+def _box(kind: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I", 8 + len(payload)) + kind + payload
+
+
+def _mp4(path, *boxes):
+    with open(path, "wb") as f:
+        f.write(b"".join(boxes))
+    return str(path)
+
+
+@pytest.mark.unit
+def test_faststart_detection(tmp_path):
+    ftyp = _box(b"ftyp", b"isom0000")
+    assert MediaProcessor.is_faststart(_mp4(tmp_path / "a.mp4", ftyp, _box(b"moov", b"x" * 16), _box(b"mdat", b"y" * 64)))
+    assert MediaProcessor.is_faststart(_mp4(tmp_path / "b.mp4", ftyp, _box(b"free"), _box(b"moov")))
+    assert not MediaProcessor.is_faststart(_mp4(tmp_path / "c.mp4", ftyp, _box(b"mdat", b"y" * 64), _box(b"moov")))
+    # 64-bit box size (skipped correctly to reach what follows)
+    large_free = struct.pack(">I", 1) + b"free" + struct.pack(">Q", 16 + 4) + b"zzzz"
+    assert MediaProcessor.is_faststart(_mp4(tmp_path / "d.mp4", ftyp, large_free, _box(b"moov")))
+    assert not MediaProcessor.is_faststart(str(tmp_path / "missing.mp4"))
+
+
+def _fake_ffmpeg(cmd, **kwargs):
+    out = cmd[-1]
+    if "hls" in cmd:
+        out_dir = os.path.dirname(out)
+        for i in range(3):
+            with open(os.path.join(out_dir, f"seg_{i:05d}.ts"), "wb") as f:
+                f.write(b"s" * 10)
+    with open(out, "wb") as f:
+        f.write(b"remuxed")
+    return subprocess.CompletedProcess(cmd, 0, stdout=b"")
+
+
+@pytest.mark.unit
+def test_trailing_moov_is_remuxed_with_stream_copy(tmp_path):
+    source = _mp4(tmp_path / "source.mp4", _box(b"ftyp"), _box(b"mdat", b"y" * 64), _box(b"moov"))
+    with patch("app.domain.providers.normalization.media_processor.subprocess.run", side_effect=_fake_ffmpeg) as run:
+        playback = video.prepare_playback("job-1", source, str(tmp_path), {"duration": 5.0})
+
+    cmd = run.call_args[0][0]
+    assert cmd[cmd.index("-c") + 1] == "copy" and "+faststart" in cmd
+    assert playback.remuxed and playback.path == str(tmp_path / "faststart.mp4")
+    assert playback.hls is None
+
+
+@pytest.mark.unit
+def test_faststart_files_are_kept_and_remux_failure_falls_back(tmp_path):
+    ordered = _mp4(tmp_path / "ordered.mp4", _box(b"ftyp"), _box(b"moov"), _box(b"mdat"))
+    with patch("app.domain.providers.normalization.media_processor.subprocess.run") as run:
+        assert video.prepare_playback("job-1", ordered, str(tmp_path), None).path == ordered
+    run.assert_not_called()
+
+    trailing = _mp4(tmp_path / "trailing.mp4", _box(b"ftyp"), _box(b"mdat"), _box(b"moov"))
+    error = subprocess.CalledProcessError(1, ["ffmpeg"], stderr=b"broken")
+    with patch("app.domain.providers.normalization.media_processor.subprocess.run", side_effect=error):
+        playback = video.prepare_playback("job-1", trailing, str(tmp_path), None)
+    assert playback.path == trailing and not playback.remuxed
+
+
+@pytest.mark.unit
+def test_hls_thresholds():
+    with patch("app.domain.jobs.video.settings.VIDEO_HLS_ENABLED", True):
+        assert video.use_hls({"duration": 45.0}, 1024)
+        assert video.use_hls({"duration": 5.0}, 80 * 1024 * 1024)
+        assert not video.use_hls({"duration": 5.0}, 1024)
+        assert not video.use_hls(None, 1024)
+    assert not video.use_hls({"duration": 600.0}, 1024)  # Disabled by default
+
+
+@pytest.mark.unit
+def test_long_videos_get_an_hls_playlist(tmp_path):
+    source = _mp4(tmp_path / "source.mp4", _box(b"ftyp"), _box(b"moov"), _box(b"mdat"))
+    storage = MagicMock()
+    uploaded = []
+
+    def upload(f, key, content_type):
+        uploaded.append((key, content_type))
+        return f"https://bucket.s3/{key}"
+
+    def submit(fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    storage.upload_fileobj.side_effect = upload
+    storage.submit.side_effect = submit
+    with patch("app.domain.providers.normalization.media_processor.subprocess.run", side_effect=_fake_ffmpeg), \
+         patch("app.domain.jobs.video.storage", storage), \
+         patch("app.domain.jobs.video.settings.VIDEO_HLS_ENABLED", True):
+        playback = video.prepare_playback("job-1", source, str(tmp_path), {"duration": 120.0, "width": 1280, "height": 720})
+
+    assert playback.hls["url"] == "https://bucket.s3/renditions/job-1/hls/index.m3u8"
+    assert playback.hls["segments"] == 3 and playback.hls["size"] == 30
+    # Playlist goes up after its segments
+    assert uploaded[-1] == ("renditions/job-1/hls/index.m3u8", "application/vnd.apple.mpegurl")
+    assert ("renditions/job-1/hls/seg_00002.ts", "video/mp2t") in uploaded
+
+    job = Job(id="job-1", kind="video", prompt="p", renditions=[playback.hls])
+    assert job.output_urls()[-1] == "https://bucket.s3/renditions/job-1/hls/seg_00002.ts"
+    assert len(job.output_urls()) == 4
+
+
+@pytest.mark.unit
+def test_video_ingest_uploads_the_remuxed_file():
+    resp = MagicMock()
+    resp.iter_bytes.return_value = [b"video-", b"bytes"]
+    client = MagicMock()
+    client.stream.return_value.__enter__.return_value = resp
+    storage = MagicMock(bucket="bucket")
+    storage.public_url.side_effect = lambda key: f"https://bucket.s3/{key}"
+    seen = {}
+
+    def prepare_playback(job_id, path, workdir, info):
+        with open(path, "rb") as f:
+            seen["downloaded"] = f.read()
+        return video.Playback(path=path + ".faststart", remuxed=True)
+
+    def file_to_s3(s3, path, bucket, key, content_type):
+        seen["uploaded"] = path
+        return TransferResult(key=key, size=11, parts=1)
+
+    with patch("app.domain.jobs.ingest.get_sync_client", return_value=client), \
+         patch("app.domain.jobs.ingest.storage", storage), \
+         patch("app.domain.jobs.ingest.probe", return_value={"duration": 3.0, "width": 640, "height": 360}), \
+         patch("app.domain.jobs.ingest.prepare_playback", side_effect=prepare_playback), \
+         patch("app.domain.jobs.ingest.file_to_s3", side_effect=file_to_s3), \
+         patch("app.domain.jobs.ingest.process_video", return_value=video.VideoAssets(duration=3.0)):
+        result = ingest_output("job-1", "video", "https://r/out.mp4")
+
+    assert seen["downloaded"] == b"video-bytes"
+    assert seen["uploaded"].endswith("source.mp4.faststart")
+    assert result.url == "https://bucket.s3/generations/job-1.mp4" and result.hls is None
+
+
+@pytest.mark.unit
+def test_streamed_upload_without_faststart_still_publishes_hls():
+    resp = MagicMock()
+    client = MagicMock()
+    client.stream.return_value.__enter__.return_value = resp
+    storage = MagicMock(bucket="bucket")
+    storage.public_url.side_effect = lambda key: f"https://bucket.s3/{key}"
+    hls = {"format": "hls", "url": "https://bucket.s3/renditions/job-1/hls/index.m3u8", "segments": 20}
+    seen = {}
+
+    def stream_to_s3(s3, response, bucket, key, content_type, tee=None):
+        tee.write(b"video-bytes")
+        return TransferResult(key=key, size=11, parts=1)
+
+    def publish_hls(job_id, path, workdir, info):
+        with open(path, "rb") as f:
+            seen["segmented"] = f.read()
+        return hls
+
+    with patch("app.domain.jobs.ingest.get_sync_client", return_value=client), \
+         patch("app.domain.jobs.ingest.storage", storage), \
+         patch("app.domain.jobs.ingest.settings.VIDEO_FASTSTART_ENABLED", False), \
+         patch("app.domain.jobs.ingest.probe", return_value={"duration": 120.0, "width": 1280, "height": 720}), \
+         patch("app.domain.jobs.ingest.stream_to_s3", side_effect=stream_to_s3), \
+         patch("app.domain.jobs.ingest.prepare_playback") as prepare_playback, \
+         patch("app.domain.jobs.ingest.publish_hls", side_effect=publish_hls), \
+         patch("app.domain.jobs.ingest.process_video", return_value=video.VideoAssets(duration=120.0)):
+        result = ingest_output("job-1", "video", "https://r/out.mp4")
+
+    prepare_playback.assert_not_called()  # No remux: the upload already streamed
+    assert seen["segmented"] == b"video-bytes"
+    assert result.hls == hls